@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arduino机械手模拟器
+在伪终端(pty)上模拟 hand_control_nano_parallel_fixed_v3.ino 的串口协议（包括POSE姿态命令
+和 hand_protocol.py 中的二进制协议），无需硬件即可测试网关的吞吐量和延迟；
+也可以模拟更早的固件，验证网关对老固件的兼容
+
+用法:
+    python3 arduino_simulator.py                  # 实时模式，打印虚拟串口路径
+    python3 arduino_simulator.py --warp 10        # 10倍速运行
+    python3 arduino_simulator.py --firmware v1    # 模拟第一版固件
+
+网关连接方式和真实硬件一样:
+    curl -X POST http://localhost:8081/connect -d '{"port": "/dev/pts/3"}' -H 'Content-Type: application/json'
+"""
+
+import os
+import sys
+import time
+import tty
+import select
+import argparse
+import threading
+
+from hand_protocol import (
+    FrameDecoder, encode_frame, decode_command,
+    FRAME_ACK, FRAME_DONE, FRAME_NAK, FRAME_PING, FRAME_TEXT,
+    STATUS_OK, STATUS_UNKNOWN, STATUS_INVALID, STATUS_TIMEOUT, STATUS_CRC
+)
+
+# 舵机配置，与固件保持一致
+SERVO_COUNT = 6
+PINKY_INDEX = 0
+RING_INDEX = 1
+MIDDLE_INDEX = 2
+INDEX_INDEX = 3
+THUMB_INDEX = 4
+WRIST_INDEX = 5
+SERVO_PINS = [3, 4, 5, 6, 7, 8]
+
+OPEN_ANGLE = 0
+CLOSED_ANGLE = 180
+
+# 时序参数（秒），与固件中的 delay() 对应
+ANIMATION_SPEED = 0.015      # moveAllServosParallel 每步延时
+MOVE_STEP = 2                # 每步移动角度
+MAX_STEPS = 100              # 最大步数
+SERVO_INIT_DELAY = 0.1       # initializeServos 每个舵机的延时
+SETUP_DELAY = 1.0            # setup() 中的 delay(1000)
+BOOTLOADER_DELAY = 0.5       # 复位后bootloader等待时间
+RX_BUFFER_SIZE = 64          # Arduino串口接收缓冲区大小
+
+# 模拟的固件版本：
+# v1 - hand_control_nano_parallel.ino
+# v2 - hand_control_nano_parallel_fixed.ino / hand_control_nano_parallel_fixed_v2.ino（两者只差未知命令的调试输出，按v2模拟）
+# v3 - hand_control_nano_parallel_fixed_v3.ino
+FIRMWARE_VERSIONS = ('v1', 'v2', 'v3')
+
+# 固件通过 CAPS? 声明的能力（只有v3支持能力协商）
+FIRMWARE_FEATURES = ('POSE', 'BIN1', 'SEQ')
+BINARY_BAUDRATE = 57600
+SUPPORTED_BAUDRATES = (9600, 19200, 38400, 57600, 115200)
+
+NUMBER_ACTIONS = {
+    '0': '握拳', '1': '指向', '2': '胜利', '3': '三指', '4': '四指',
+    '5': '张开', '6': '六指', '7': '七指', '8': '八指', '9': '九指'
+}
+# 第一版固件数字手势的输出 "手势: 0 (握拳)"
+V1_NUMBER_LABELS = {'0': '0 (握拳)', '1': '1 (指向)', '2': '2 (胜利)', '5': '5 (张开)'}
+
+
+def arduino_to_int(text):
+    """模拟Arduino String.toInt()：解析开头的整数，失败返回0"""
+    text = text.strip()
+    digits = ''
+    for i, ch in enumerate(text):
+        if ch.isdigit() or (i == 0 and ch in '+-'):
+            digits += ch
+        else:
+            break
+    try:
+        return int(digits)
+    except ValueError:
+        return 0
+
+
+class SimulatedArduino:
+    """
+    模拟的Arduino Nano
+    打开一个伪终端，ArduinoController 可以像连接真实串口一样连接 self.port
+    time_warp 大于1时所有延时按比例缩短
+    firmware 为模拟的固件版本（见 FIRMWARE_VERSIONS），features 为v3固件通过 CAPS? 声明的能力；
+    v1、v2固件先用 toInt() 判断数字手势，所有文字命令（ROCK、RESET、CAPS?、PING……）都被当成数字手势而不执行：
+    v1什么也不输出，动作结束也没有完成提示；v2输出"无效的数字手势"
+    link_latency 模拟USB转串口芯片的延迟（秒），主机写入的数据要经过这段时间才到达固件
+    unresponsive 为True时模拟固件卡死：收到的命令被读走但不处理，也没有任何回复
+    """
+
+    def __init__(self, baudrate=9600, time_warp=1.0, disconnected_servos=(), boot=True,
+                 features=FIRMWARE_FEATURES, link_latency=0.0, firmware='v3'):
+        if firmware not in FIRMWARE_VERSIONS:
+            raise ValueError(f"未知的固件版本: {firmware}")
+        self.baudrate = baudrate
+        self.link_latency = link_latency
+        self.time_warp = time_warp
+        self.disconnected_servos = set(disconnected_servos)
+        self.boot = boot
+        self.firmware = firmware
+        self.features = tuple(features) if firmware == 'v3' else ()
+        self.unresponsive = False
+
+        # 二进制模式下调试输出全部关闭，只发送ACK/DONE帧
+        self.binary_mode = False
+        self.last_status = STATUS_OK
+        self._frame_decoder = FrameDecoder()
+
+        self.current_angle = [0, 0, 0, 0, 0, 90]
+        self.target_angle = [0, 0, 0, 0, 0, 90]
+        # boot=False 表示板子早已启动完成（例如打开串口时没有复位）
+        self.servo_connected = [i not in self.disconnected_servos for i in range(SERVO_COUNT)]
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+
+        # 统计信息
+        self.commands_processed = 0
+        self.moves_executed = 0
+        self.rx_overflow_bytes = 0
+        self.bytes_sent = 0
+        self.frames_received = 0
+
+        self._rx_buffer = bytearray()
+        self._rx_cond = threading.Condition()
+        self._running = False
+        self._threads = []
+
+    # ---------- 生命周期 ----------
+
+    def start(self):
+        """创建伪终端并启动模拟的固件主循环，返回虚拟串口路径"""
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._rx_loop, name="sim-rx", daemon=True),
+            threading.Thread(target=self._main_loop, name="sim-loop", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self.port
+
+    def stop(self):
+        """停止模拟器并关闭伪终端"""
+        self._running = False
+        with self._rx_cond:
+            self._rx_cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        # 线程退出后再关闭，阻塞中的read会让文件描述符无法真正关闭
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master_fd = self.slave_fd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- 底层串口模拟 ----------
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds / self.time_warp)
+
+    def _write(self, data):
+        """按波特率发送数据：每字节10位（起始位+8数据位+停止位）"""
+        self._sleep(len(data) * 10.0 / self.baudrate)
+        try:
+            os.write(self.master_fd, data)
+            self.bytes_sent += len(data)
+        except (OSError, TypeError):
+            self._running = False
+
+    def print(self, text):
+        """对应固件的 logPrint()：二进制模式下不输出"""
+        if not self.binary_mode:
+            self._write(str(text).encode('utf-8'))
+
+    def println(self, text=''):
+        if not self.binary_mode:
+            self._write(f"{text}\r\n".encode('utf-8'))
+
+    def send_frame(self, frame_type, seq, payload=b''):
+        self._write(encode_frame(frame_type, seq, payload))
+
+    def _rx_loop(self):
+        """接收线程：模拟64字节的硬件接收缓冲区，溢出的字节被丢弃"""
+        while self._running:
+            try:
+                readable, _, _ = select.select([self.master_fd], [], [], 0.2)
+                if not readable:
+                    continue
+                data = os.read(self.master_fd, 256)
+            except (OSError, TypeError, ValueError):
+                break
+            if not data:
+                break
+            self._sleep(self.link_latency)
+            with self._rx_cond:
+                room = RX_BUFFER_SIZE - len(self._rx_buffer)
+                if len(data) > room:
+                    self.rx_overflow_bytes += len(data) - room
+                    data = data[:max(room, 0)]
+                self._rx_buffer.extend(data)
+                self._rx_cond.notify_all()
+
+    def _read_line(self):
+        """模拟 Serial.readStringUntil('\\n')"""
+        with self._rx_cond:
+            while self._running and b'\n' not in self._rx_buffer:
+                self._rx_cond.wait(0.5)
+            if not self._running:
+                return None
+            index = self._rx_buffer.index(b'\n')
+            line = bytes(self._rx_buffer[:index])
+            del self._rx_buffer[:index + 1]
+        return line.decode('utf-8', errors='replace')
+
+    def _read_frame(self):
+        """二进制模式下逐字节解析接收缓冲区（和固件一样一次处理一帧），校验失败返回None"""
+        with self._rx_cond:
+            while self._running:
+                while self._rx_buffer:
+                    byte = self._rx_buffer.pop(0)
+                    crc_errors = self._frame_decoder.crc_errors
+                    frames = self._frame_decoder.feed(bytes([byte]))
+                    if self._frame_decoder.crc_errors > crc_errors:
+                        return None
+                    if frames:
+                        return frames[0]
+                self._rx_cond.wait(0.5)
+        return None
+
+    def _main_loop(self):
+        if self.boot:
+            self._sleep(BOOTLOADER_DELAY)
+            self.setup()
+        while self._running:
+            if self.binary_mode:
+                frame = self._read_frame()
+                if self.unresponsive:
+                    continue
+                if frame is None:
+                    if self._running:
+                        self.send_frame(FRAME_NAK, 0, [STATUS_CRC])
+                    continue
+                self.handle_frame(frame)
+                continue
+            command = self._read_line()
+            if command is None:
+                break
+            if not self.unresponsive:
+                self.process_serial_command(command)
+
+    # ---------- 固件逻辑（对应 .ino 中的同名函数） ----------
+
+    def setup(self):
+        if self.firmware == 'v1':
+            self.setup_v1()
+            return
+        self.println("🚀 机械手控制器启动...")
+        self.println("🔧 初始化舵机...")
+        self.initialize_servos()
+        self._sleep(SETUP_DELAY)
+        self.println("✅ 机械手控制器就绪!")
+        self.println("📋 支持命令:")
+        self.println("- 数字手势: 0-9")
+        self.println("- 剪刀石头布: ROCK, PAPER, SCISSORS")
+        self.println("- 重置: RESET")
+        if self.firmware == 'v3':
+            self.println("- 全部张开: OPENMAX")
+            self.println("- 全部握拳: CLOSEMAX")
+        self.println("- 单个舵机: SERVO:index:angle")
+        if self.firmware == 'v3':
+            self.println("- 姿态: POSE:a0,a1,a2,a3,a4,a5")
+        self.println("⏳ 等待命令...")
+
+    def setup_v1(self):
+        """第一版固件的 setup()：初始化舵机时没有输出"""
+        for i in range(SERVO_COUNT):
+            self.servo_connected[i] = True
+            self.current_angle[i] = OPEN_ANGLE if i < 5 else 90
+            self.target_angle[i] = self.current_angle[i]
+        self._sleep(SETUP_DELAY)
+        self.println("机械手控制器就绪!")
+        self.println("支持命令:")
+        self.println("- 数字手势: 0-9")
+        self.println("- 剪刀石头布: ROCK, PAPER, SCISSORS")
+        self.println("- 重置: RESET")
+        self.println("- 全部张开: OPENMAX")
+        self.println("- 全部握拳: CLOSEMAX")
+        self.println("等待命令...")
+
+    def initialize_servos(self):
+        self.println("🔧 初始化舵机...")
+        for i in range(SERVO_COUNT):
+            self.print(f"舵机 {i} (引脚 {SERVO_PINS[i]}): ")
+            if i in self.disconnected_servos:
+                self.servo_connected[i] = False
+                self.println("❌ 连接失败")
+            else:
+                self.servo_connected[i] = True
+                self.println("✅ 已连接")
+            self.current_angle[i] = OPEN_ANGLE if i < 5 else 90
+            self.target_angle[i] = self.current_angle[i]
+            self._sleep(SERVO_INIT_DELAY)
+        self.println("舵机初始化完成")
+
+    def move_all_servos_parallel(self):
+        """按2度/15ms的步进移动，整段移动一次性按总时长休眠"""
+        step_count = 0
+        all_reached = False
+        while not all_reached and step_count < MAX_STEPS:
+            all_reached = True
+            step_count += 1
+            for i in range(SERVO_COUNT):
+                if self.servo_connected[i] and self.current_angle[i] != self.target_angle[i]:
+                    all_reached = False
+                    if self.current_angle[i] < self.target_angle[i]:
+                        self.current_angle[i] = min(self.current_angle[i] + MOVE_STEP, self.target_angle[i])
+                    else:
+                        self.current_angle[i] = max(self.current_angle[i] - MOVE_STEP, self.target_angle[i])
+        self._sleep(step_count * ANIMATION_SPEED)
+        if step_count >= MAX_STEPS:
+            self.last_status = STATUS_TIMEOUT
+            self.println("⚠️ 舵机移动超时")
+
+    def set_servo_target(self, servo_index, angle):
+        if 0 <= servo_index < SERVO_COUNT:
+            self.target_angle[servo_index] = max(0, min(180, angle))
+            if not self.servo_connected[servo_index] and self.firmware != 'v1':
+                self.println(f"⚠️ 舵机 {servo_index} 未连接")
+
+    def set_finger(self, finger_index, is_open):
+        self.set_servo_target(finger_index, OPEN_ANGLE if is_open else CLOSED_ANGLE)
+
+    def set_all_fingers(self, is_open):
+        for i in range(5):
+            self.set_finger(i, is_open)
+
+    def execute_move(self):
+        # 第一版固件的 executeMove() 只移动舵机，前后都没有提示
+        if self.firmware != 'v1':
+            self.println("🚀 执行舵机移动...")
+        self.move_all_servos_parallel()
+        self.moves_executed += 1
+        if self.firmware != 'v1':
+            self.println("✅ 舵机移动完成")
+
+    def _set_fingers(self, pinky, ring, middle, index, thumb, wrist=90):
+        self.set_finger(PINKY_INDEX, pinky)
+        self.set_finger(RING_INDEX, ring)
+        self.set_finger(MIDDLE_INDEX, middle)
+        self.set_finger(INDEX_INDEX, index)
+        self.set_finger(THUMB_INDEX, thumb)
+        self.set_servo_target(WRIST_INDEX, wrist)
+
+    def make_number_gesture(self, number):
+        if self.firmware != 'v1':
+            self.print("手势: ")
+            self.println(number)
+        if number not in NUMBER_ACTIONS:
+            # 第一版固件不匹配任何手势时什么也不做
+            if self.firmware != 'v1':
+                self.last_status = STATUS_INVALID
+                self.println("❌ 无效的数字手势")
+            return
+        if self.firmware == 'v1':
+            self.println(f"手势: {V1_NUMBER_LABELS.get(number, number)}")
+        else:
+            self.println(f"动作: {NUMBER_ACTIONS[number]}")
+        if number == '0':
+            self.set_all_fingers(False)
+            self.set_servo_target(WRIST_INDEX, 90)
+        elif number == '5':
+            self.set_all_fingers(True)
+            self.set_servo_target(WRIST_INDEX, 90)
+        elif number in ('1', '2', '3', '4'):
+            count = int(number)
+            self._set_fingers(count >= 4, count >= 3, count >= 2, True, False)
+        else:
+            wrist = {'6': 90, '7': 60, '8': 30, '9': 0}[number]
+            self._set_fingers(True, True, True, True, True, wrist)
+        self.execute_move()
+
+    def make_rps_gesture(self, gesture):
+        self.print("RPS手势: ")
+        self.println(gesture)
+        if gesture == "ROCK":
+            self.println("动作: 石头 (握拳)")
+            self.set_all_fingers(False)
+            self.set_servo_target(WRIST_INDEX, 90)
+        elif gesture == "PAPER":
+            self.println("动作: 布 (张开)")
+            self.set_all_fingers(True)
+            self.set_servo_target(WRIST_INDEX, 90)
+        elif gesture == "SCISSORS":
+            self.println("动作: 剪刀 (食指中指)")
+            self._set_fingers(False, False, True, True, False)
+        else:
+            self.last_status = STATUS_INVALID
+            self.println("❌ 无效的RPS手势")
+            return
+        self.execute_move()
+
+    def reset_to_open(self):
+        self.println("🔄 重置为张开状态")
+        self.set_all_fingers(True)
+        self.set_servo_target(WRIST_INDEX, 90)
+        self.execute_move()
+
+    def open_hand_max(self):
+        self.println("🖐️ 机械手全部张开到最大")
+        self.set_all_fingers(True)
+        self.set_servo_target(WRIST_INDEX, 90)
+        self.execute_move()
+
+    def close_hand_max(self):
+        self.println("👊 机械手全部握拳")
+        self.set_all_fingers(False)
+        self.set_servo_target(WRIST_INDEX, 90)
+        self.execute_move()
+
+    def parse_pose(self, args):
+        """解析 "a0,a1,a2,a3,a4,a5"，格式不对返回None"""
+        fields = [field.strip() for field in args.split(',')]
+        if len(fields) != SERVO_COUNT or not all(field.isdigit() for field in fields):
+            return None
+        return [arduino_to_int(field) for field in fields]
+
+    def make_pose(self, angles):
+        self.println(f"动作: 姿态 [{','.join(str(angle) for angle in angles)}]")
+        for i, angle in enumerate(angles):
+            self.set_servo_target(i, angle)
+        self.execute_move()
+
+    def process_serial_command(self, command):
+        command = command.strip()
+        # 带序号的命令 "#12 ROCK"：收到时回复 ACK #12，结束时回复 DONE #12 状态码
+        seq = None
+        if command.startswith('#') and 'SEQ' in self.features:
+            head, _, command = command.partition(' ')
+            seq = arduino_to_int(head[1:])
+            command = command.strip()
+        if not command:
+            return
+
+        self.commands_processed += 1
+        self.last_status = STATUS_OK
+        if self.firmware == 'v1':
+            self.print("收到命令: ")
+            self.println(command)
+            self.dispatch_legacy_command(command)
+            return
+        self.print("📥 收到命令: ")
+        self.println(command)
+        if seq is not None:
+            self.println(f"ACK #{seq}")
+
+        if self.firmware == 'v2':
+            self.dispatch_legacy_command(command)
+        else:
+            self.dispatch_command(command)
+
+        if seq is not None:
+            self.println(f"DONE #{seq} {self.last_status}")
+
+    def dispatch_legacy_command(self, command):
+        """
+        v1、v2固件的命令处理，第一个分支是 if (command.toInt() >= 0 && command.toInt() <= 9)：
+        文字命令的 toInt() 为0，全部进了 makeNumberGesture 而不匹配任何手势；
+        后面的 ROCK/RESET/SERVO 等分支只有超出0-9的数字才走得到，数字又不会匹配它们，最后都是未知命令
+        """
+        if 0 <= arduino_to_int(command) <= 9:
+            self.make_number_gesture(command)
+        elif self.firmware == 'v1':
+            self.print("未知命令: ")
+            self.println(command)
+        else:
+            self.unknown_command(command)
+
+    def dispatch_command(self, command):
+        if command.isdigit() and 0 <= arduino_to_int(command) <= 9:
+            self.println("🎯 识别为数字手势")
+            self.make_number_gesture(command)
+        elif command in ("ROCK", "PAPER", "SCISSORS"):
+            self.println("🎯 识别为RPS手势")
+            self.make_rps_gesture(command)
+        elif command == "RESET":
+            self.println("🔄 识别为重置命令")
+            self.reset_to_open()
+        elif command == "OPENMAX":
+            self.open_hand_max()
+        elif command == "CLOSEMAX":
+            self.close_hand_max()
+        elif command.startswith("SERVO:"):
+            first_colon = command.find(':')
+            second_colon = command.find(':', first_colon + 1)
+            if first_colon != -1 and second_colon != -1:
+                servo_index = arduino_to_int(command[first_colon + 1:second_colon])
+                angle = arduino_to_int(command[second_colon + 1:])
+                self.println(f"🎯 舵机 {servo_index} 到 {angle} 度")
+                self.set_servo_target(servo_index, angle)
+                self.execute_move()
+            else:
+                self.last_status = STATUS_INVALID
+                self.println("❌ 无效的舵机命令格式")
+        elif command.startswith("POSE:"):
+            angles = self.parse_pose(command[5:])
+            if angles is not None:
+                self.println("🎯 识别为姿态命令")
+                self.make_pose(angles)
+            else:
+                self.last_status = STATUS_INVALID
+                self.println("❌ 无效的姿态命令格式")
+        elif command == "CAPS?" and self.features:
+            self.println(f"CAPS:{','.join(self.features)},BAUD={BINARY_BAUDRATE}")
+        elif command.startswith("BIN:") and 'BIN1' in self.features:
+            baudrate = arduino_to_int(command[4:])
+            if baudrate in SUPPORTED_BAUDRATES:
+                self.println(f"BIN OK {baudrate}")
+                self.enter_binary_mode(baudrate)
+            else:
+                self.last_status = STATUS_INVALID
+                self.println("❌ 无效的波特率")
+        else:
+            self.unknown_command(command)
+
+    def unknown_command(self, command):
+        self.last_status = STATUS_UNKNOWN
+        self.print("❌ 未知命令: ")
+        self.println(command)
+        self.print("命令长度: ")
+        raw = command.encode('utf-8')
+        self.println(len(raw))
+        # Arduino的char是有符号的，UTF-8多字节字符会打印成负数
+        self.print("命令内容: [")
+        for byte in raw:
+            self.print(byte - 256 if byte > 127 else byte)
+            self.print(" ")
+        self.println("]")
+
+    # ---------- 二进制协议 ----------
+
+    def enter_binary_mode(self, baudrate):
+        """对应固件中的 Serial.end(); Serial.begin(baud)"""
+        self.baudrate = baudrate
+        self.binary_mode = True
+        self._frame_decoder.reset()
+
+    def leave_binary_mode(self):
+        self.baudrate = 9600
+        self.binary_mode = False
+
+    def handle_frame(self, frame):
+        """收到命令帧：先回ACK，执行完成后回DONE（带状态码）"""
+        self.frames_received += 1
+        self.send_frame(FRAME_ACK, frame.seq)
+        if frame.type == FRAME_PING:
+            self.send_frame(FRAME_DONE, frame.seq, [STATUS_OK])
+            return
+        if frame.type == FRAME_TEXT:
+            self.send_frame(FRAME_DONE, frame.seq, [STATUS_OK])
+            self.leave_binary_mode()
+            return
+        command = decode_command(frame)
+        if command is None:
+            self.send_frame(FRAME_DONE, frame.seq, [STATUS_UNKNOWN])
+            return
+        self.process_serial_command(command)
+        self.send_frame(FRAME_DONE, frame.seq, [self.last_status])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arduino机械手串口模拟器")
+    parser.add_argument('--baud', type=int, default=9600, help="模拟的波特率")
+    parser.add_argument('--warp', type=float, default=1.0, help="时间加速倍数")
+    parser.add_argument('--disconnected', type=int, nargs='*', default=[],
+                        help="模拟未连接的舵机编号")
+    parser.add_argument('--firmware', choices=FIRMWARE_VERSIONS, default='v3', help="模拟的固件版本")
+    args = parser.parse_args()
+
+    simulator = SimulatedArduino(
+        baudrate=args.baud,
+        time_warp=args.warp,
+        disconnected_servos=args.disconnected,
+        firmware=args.firmware
+    )
+    port = simulator.start()
+    print(f"🤖 模拟Arduino已启动: {port}")
+    print(f"⚡ 波特率: {args.baud}  ⏩ 时间加速: {args.warp}x")
+    print("按 Ctrl+C 退出")
+
+    try:
+        while True:
+            time.sleep(5)
+            print(f"📊 命令: {simulator.commands_processed}  动作: {simulator.moves_executed}  "
+                  f"溢出字节: {simulator.rx_overflow_bytes}  角度: {simulator.current_angle}")
+    except KeyboardInterrupt:
+        print("\n👋 模拟器已停止")
+    finally:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pytest夹具
+gateway_controller：把Flask网关的全局控制器换成测试自己连接的控制器（通常接在模拟器上）
+"""
+
+import pytest
+
+import gateway_server
+
+
+@pytest.fixture
+def gateway_controller(monkeypatch):
+    """
+    返回 use(controller)：让HTTP接口改用 controller，测试结束时恢复原来的全局控制器
+    controller 的连接和断开由测试自己负责
+    """
+    def use(controller):
+        monkeypatch.setattr(gateway_server, 'arduino_controller', controller)
+        return controller
+
+    return use
@@ -0,0 +1,838 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+机械臂网关服务器 - asyncio版
+路由和JSON响应与 gateway_server.py 相同，串口读写由事件循环的文件描述符就绪通知驱动，
+等待命令结果只是一个挂起的协程，不占用线程；单核即可同时保持上千个手机连接
+
+用法:
+    python3 gateway_async.py                    # 默认监听 0.0.0.0:8081
+    python3 gateway_async.py --port 8082 --no-connect
+
+依赖 starlette 和 uvicorn（见 requirements.txt），只支持 macOS/Linux（需要 add_reader）
+与同步网关共用 hand_serial / hand_recognition / gateway_common，不导入 gateway_server（不会创建Flask应用和全局控制器）；
+手势识别在线程池中执行，不阻塞事件循环
+"""
+
+import os
+import time
+import queue
+import asyncio
+import argparse
+import functools
+import logging
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from hand_protocol import parse_capabilities
+from hand_serial import (
+    ArduinoController, BOOT_POSE, SERIAL_RX_BUFFER_SIZE, probe_port, discover_arduino, save_port_cache
+)
+from hand_recognition import analyze_hand_pose, analyze_compact_hand
+from gateway_common import (
+    GESTURE_MAPPING, MAX_COMMAND_WAIT, command_accepted, command_result,
+    counter_requested, predict_requested, send_counter_gesture, actuation_result
+)
+from hand_landmarks import COMPACT_CONTENT_TYPE
+from hand_batch import analyze_batch_payload
+from hand_session import SESSION_HEADER, HandSessions, session_result
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 每个WebSocket连接最多缓存的串口事件数
+WS_EVENT_QUEUE_SIZE = 64
+
+
+class AsyncArduinoController(ArduinoController):
+    """
+    asyncio版Arduino控制器
+    命令语义（票据、手势合并、紧急命令插队、熔断、舵机状态镜像、序号匹配）沿用 ArduinoController，
+    只把串口I/O换成事件循环上的 add_reader/add_writer，所有方法都必须在事件循环线程中调用
+    端口探测沿用同步实现，只在连接时放到线程池中执行一次
+    不支持二进制协议和自动重连：链路断开后通过 /connect 重新连接
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs['auto_reconnect'] = False
+        kwargs['binary_protocol'] = False
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._fd = None
+        self._out_buffer = bytearray()
+        self._writer_registered = False
+        self._wakeup = None
+        self._writer_task = None
+        self._event_waiters = []
+        self.add_event_listener(self._resolve_waiters)
+
+    # ---------- 连接管理 ----------
+
+    async def connect(self, probe=None):
+        """连接到Arduino并等待固件就绪，probe 为端口探测结果时直接接管已打开的串口"""
+        loop = asyncio.get_running_loop()
+        if self.is_connected:
+            await self.disconnect()
+        start = time.time()
+        if probe is None:
+            probe = await loop.run_in_executor(None, functools.partial(
+                probe_port,
+                self.port,
+                self.baudrate,
+                timeout=self.ready_timeout,
+                reset=self.reset_on_connect,
+                keep_open=True
+            ))
+        if probe is None:
+            logger.error(f"❌ 连接Arduino失败: 无法打开端口 {self.port}")
+            return False
+
+        self.port = probe.port
+        self.serial_connection = probe.serial_connection
+        self._fd = self.serial_connection.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._out_buffer.clear()
+        self.protocol = 'text'
+        self.capabilities = set()
+        self.hand_state.reset(None if probe.identified_by == 'handshake' else BOOT_POSE)
+        self.circuit_breaker.reset()
+        self._ready.clear()
+        self._stop_event.clear()
+        self._decoder = probe.decoder
+        self.is_connected = True
+        self.degraded = False
+        loop.add_reader(self._fd, self._on_readable)
+        for line in probe.lines:
+            self._handle_line(line)
+
+        if probe.identified_by == 'banner' and not self._ready.is_set():
+            remaining = self.ready_timeout - (time.time() - start)
+            if await self.wait_for_event_async('ready', timeout=max(remaining, 0)) is None:
+                logger.warning("⚠️ 等待固件就绪超时，继续发送命令")
+        elif probe.identified_by is None:
+            logger.warning("⚠️ 未检测到固件启动信息或握手回复，继续发送命令")
+        if not self.is_connected:
+            return False
+
+        await self._negotiate_protocol_async()
+        self._ready.set()
+        self.last_error = None
+        self._writer_task = loop.create_task(self._writer_loop_async())
+        logger.info(f"✅ 成功连接到Arduino: {self.port} (耗时 {time.time() - start:.1f}s)")
+        return True
+
+    async def _negotiate_protocol_async(self):
+        """
+        能力协商：固件支持SEQ时命令带序号发送，可以流水线；v2固件回复"无效的数字手势"时命令不带序号，
+        第一版固件没有回复，收到命令的回显就结束命令（见 ArduinoController.reports_completion）
+        """
+        last_seq = self._event_seq
+        self.reports_completion = True
+        self._write(b"CAPS?\n")
+        reply = await self.wait_for_event_async(
+            ('caps', 'invalid'),
+            timeout=self.handshake_timeout,
+            after_seq=last_seq
+        )
+        if reply is None:
+            # 第一版固件：不回复能力查询，也不输出完成提示
+            logger.info("固件没有回复能力查询，收到命令即结束")
+            self.reports_completion = False
+            return
+        if reply.kind == 'invalid':
+            logger.info("固件不支持能力协商，命令不带序号")
+            return
+        self.capabilities, _ = parse_capabilities(reply.detail or '')
+        logger.info(f"🧩 固件能力: {sorted(self.capabilities)}")
+
+    async def disconnect(self):
+        """断开Arduino连接"""
+        self._stop_event.set()
+        self.is_connected = False
+        await self._stop_writer()
+        self._detach()
+        self._drain_queue("Arduino连接已断开")
+        self._fail_in_flight("Arduino连接已断开")
+        self.degraded = False
+        logger.info("已断开Arduino连接")
+
+    async def _stop_writer(self):
+        task, self._writer_task = self._writer_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def _detach(self):
+        """从事件循环注销串口并关闭"""
+        if self._fd is not None and self._loop is not None:
+            self._loop.remove_reader(self._fd)
+            if self._writer_registered:
+                self._loop.remove_writer(self._fd)
+        self._writer_registered = False
+        self._fd = None
+        if self.serial_connection is not None:
+            try:
+                self.serial_connection.close()
+            except Exception:
+                pass
+
+    def _mark_degraded(self, reason):
+        """串口出错：标记降级并让所有未完成的命令失败"""
+        if self.degraded or not self.is_connected:
+            return
+        super()._mark_degraded(reason)
+        self._detach()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            self._writer_task = None
+        self._drain_queue(reason)
+        self._fail_in_flight(reason)
+
+    # ---------- 串口读写（文件描述符就绪回调） ----------
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._mark_degraded(f"读取串口失败: {e}")
+            return
+        if not data:
+            self._mark_degraded("串口已断开")
+            return
+        for line in self._decoder.feed(data):
+            self._handle_line(line)
+
+    def _write(self, data):
+        """写入发送缓冲区，内核缓冲区满时注册可写回调，不会阻塞事件循环"""
+        self._out_buffer.extend(data)
+        self._flush_output()
+
+    def _flush_output(self):
+        while self._out_buffer and self._fd is not None:
+            try:
+                written = os.write(self._fd, self._out_buffer)
+            except (BlockingIOError, InterruptedError):
+                if not self._writer_registered:
+                    self._loop.add_writer(self._fd, self._flush_output)
+                    self._writer_registered = True
+                return
+            except OSError as e:
+                self._mark_degraded(f"写入串口失败: {e}")
+                return
+            del self._out_buffer[:written]
+        if self._writer_registered and self._fd is not None:
+            self._loop.remove_writer(self._fd)
+            self._writer_registered = False
+
+    # ---------- 事件等待 ----------
+
+    def _resolve_waiters(self, event):
+        for predicate, future in list(self._event_waiters):
+            if not future.done() and predicate(event):
+                future.set_result(event)
+
+    async def wait_for_event_async(self, predicate, timeout=None, after_seq=None):
+        """wait_for_event 的协程版本，超时返回None"""
+        if isinstance(predicate, str):
+            predicate = (predicate,)
+        if isinstance(predicate, tuple):
+            kinds = predicate
+            predicate = lambda event: event.kind in kinds
+        if after_seq is not None:
+            for event in self.events:
+                if event.seq > after_seq and predicate(event):
+                    return event
+
+        waiter = (predicate, self._loop.create_future())
+        self._event_waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._event_waiters.remove(waiter)
+
+    # ---------- 命令发送 ----------
+
+    def send_command(self, command):
+        ticket = super().send_command(command)
+        if ticket is not None and self._wakeup is not None:
+            self._wakeup.set()
+        return ticket
+
+    async def _wait_wakeup(self, timeout=0.1):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def _notify_progress(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _track_in_flight(self, event):
+        super()._track_in_flight(event)
+        self._notify_progress()
+
+    async def _writer_loop_async(self):
+        """
+        写协程：固件回显序号时最多pipeline_depth条命令同时在途，结果由读回调按序号匹配；
+        老固件一次只发一条，等待回复的过程只是挂起协程
+        """
+        while self.is_connected:
+            await self._wait_wakeup()
+            with self._pipeline_cond:
+                self._expire_in_flight()
+            while self.is_connected and self._ready.is_set():
+                if self.uses_sequence_ids and len(self._in_flight) >= max(self.pipeline_depth, 1):
+                    break
+                try:
+                    ticket = self.command_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if self.uses_sequence_ids:
+                        await self._send_sequenced(ticket)
+                    else:
+                        self.current_ticket = ticket
+                        await self._execute_ticket_async(ticket)
+                        self._record_result(ticket, ticket.status)
+                except asyncio.CancelledError:
+                    # 断开连接时写协程被取消，正在发送/等待的命令不能一直挂着
+                    if not ticket.done:
+                        ticket.finish('failed', self.last_error or "Arduino连接已断开")
+                    raise
+
+    async def _send_sequenced(self, ticket):
+        """发送带序号的命令，不等待结果"""
+        ticket.status = 'sending'
+        data = self._encode_ticket(ticket)
+        # 固件动作期间不读串口，在途字节超过接收缓冲区会被丢弃
+        while (self.is_connected and self._unacked_bytes
+               and self._unacked_bytes + len(data) > SERIAL_RX_BUFFER_SIZE):
+            await self._wait_wakeup()
+            with self._pipeline_cond:
+                self._expire_in_flight()
+        if not self.is_connected:
+            ticket.finish('failed', "Arduino连接已断开")
+            return
+        with self._pipeline_cond:
+            ticket.wire_size = len(data)
+            ticket.sent_at = time.time()
+            self._unacked_bytes += ticket.wire_size
+            if not self._in_flight:
+                self._last_progress = ticket.sent_at
+            self._in_flight[ticket.seq] = ticket
+        self.current_ticket = ticket
+        self._write(data)
+        if ticket.status == 'sending':
+            ticket.status = 'sent'
+
+    async def _execute_ticket_async(self, ticket):
+        """老固件：发送单条命令并等待"收到命令"和执行结果"""
+        ticket.status = 'sending'
+        last_seq = self._event_seq
+        self._write(self._encode_ticket(ticket))
+        if not self.is_connected:
+            ticket.finish('failed', self.last_error)
+            return
+        ticket.sent_at = time.time()
+        ticket.status = 'sent'
+
+        deadline = ticket.sent_at + self.completion_timeout
+        received = await self.wait_for_event_async(
+            lambda event: event.kind == 'received' and event.detail == ticket.command,
+            timeout=deadline - time.time(),
+            after_seq=last_seq
+        )
+        if received is None:
+            logger.warning(f"未收到命令确认: {ticket.command}")
+            ticket.finish('sent', "未收到固件确认")
+            return
+        ticket.acknowledged = True
+        ticket.acked_at = received.timestamp
+        if not self.reports_completion:
+            ticket.finish('sent')
+            return
+
+        result = await self.wait_for_event_async(
+            lambda event: event.kind in ('completed', 'unknown_command', 'invalid'),
+            timeout=deadline - time.time(),
+            after_seq=received.seq
+        )
+        if result is None:
+            logger.warning(f"等待舵机移动完成超时: {ticket.command}")
+            ticket.finish('sent')
+        elif result.kind == 'completed':
+            ticket.response = result.line
+            ticket.finish('completed')
+        else:
+            ticket.response = result.line
+            ticket.finish('failed', result.line)
+
+
+async def wait_ticket(ticket, timeout):
+    """挂起等待命令结束，超时直接返回"""
+    try:
+        await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket.future)), timeout)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def async_command_result(ticket, data=None):
+    """command_result 的协程版本：请求带 "wait" 时挂起等待，不占用线程"""
+    wait = (data or {}).get('wait', 0)
+    if ticket is not None and wait:
+        await wait_ticket(ticket, min(float(wait), MAX_COMMAND_WAIT))
+    return command_result(ticket)
+
+
+def hand_result(hand_data, compact=False, smooth=None):
+    """识别一帧手部关键点，返回 /analyze_hand 的响应内容；compact 为紧凑格式，smooth 见 analyze_hand_pose"""
+    try:
+        if compact:
+            gesture, confidence = analyze_compact_hand(hand_data, smooth)
+        else:
+            gesture, confidence = analyze_hand_pose(hand_data, smooth)
+    except Exception as e:
+        return hand_error(e)
+    return {
+        "gesture": gesture,
+        "confidence": confidence,
+        "success": True
+    }
+
+
+async def hand_result_async(hand_data, compact=False, smooth=None):
+    """
+    在线程池中识别一帧（见 hand_result）：平滑、特征计算和预测是纯CPU计算，
+    放在事件循环上会让其他连接的串口事件和请求跟着等待
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(hand_result, hand_data, compact, smooth))
+
+
+async def counter_actuation(controller, result, wait=0, sessions=None):
+    """
+    闭环对战（见 gateway_common.send_counter_gesture），返回动作结果，这一帧不需要动作时返回None
+    传入 sessions 时按提前预测的手势出招
+    """
+    try:
+        gesture, ticket = send_counter_gesture(controller, result, sessions)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if gesture is None:
+        return None
+    if ticket is not None and wait:
+        await wait_ticket(ticket, min(float(wait), MAX_COMMAND_WAIT))
+    return actuation_result(gesture, ticket)
+
+
+def hand_error(error):
+    logger.error(f"手势分析错误: {error}")
+    return {
+        "gesture": "未知",
+        "confidence": 0.0,
+        "success": False,
+        "error": str(error)
+    }
+
+
+async def read_json(request, silent=False):
+    """对应Flask的 request.get_json(silent=...)"""
+    try:
+        return await request.json()
+    except Exception:
+        if silent:
+            return None
+        raise
+
+
+async def auto_connect(controller):
+    """自动发现并连接Arduino，端口探测在线程池中进行"""
+    start = time.time()
+    loop = asyncio.get_running_loop()
+    probe = await loop.run_in_executor(None, functools.partial(
+        discover_arduino,
+        baudrate=controller.baudrate,
+        reset=controller.reset_on_connect
+    ))
+    if probe is None:
+        logger.warning("无法自动连接Arduino，请手动连接")
+        return False
+    logger.info(f"🔍 在 {probe.port} 发现机械手，耗时 {time.time() - start:.1f}s")
+    if await controller.connect(probe=probe):
+        save_port_cache(probe.port)
+        return True
+    return False
+
+
+def create_app(controller, connect_on_startup=True):
+    """创建ASGI应用，路由与 gateway_server.py 相同"""
+    sessions = HandSessions()
+
+    async def status(request):
+        """服务器状态检查"""
+        return JSONResponse({
+            "status": "running",
+            "arduino_connected": controller.is_connected,
+            "arduino_ready": controller.is_ready,
+            "arduino_degraded": controller.degraded,
+            "last_error": controller.last_error,
+            "reconnect_count": controller.reconnect_count,
+            "protocol": controller.protocol,
+            "capabilities": sorted(controller.capabilities),
+            "circuit_breaker": controller.circuit_breaker.to_dict(),
+            "queue_depth": controller.command_queue.qsize(),
+            "move_in_flight": controller.move_in_flight,
+            "in_flight": len(controller._in_flight),
+            "pipelining": controller.uses_sequence_ids and controller.pipeline_depth > 1,
+            "pending_gesture": getattr(controller.command_queue.pending('gesture'), 'command', None),
+            "hand_state": controller.hand_state.to_dict(),
+            "sessions": sessions.to_dict(),
+            "timestamp": time.time()
+        })
+
+    async def connect_arduino(request):
+        """连接Arduino"""
+        try:
+            data = await read_json(request, silent=True) or {}
+            port = data.get('port')
+            if 'reset' in data:
+                controller.reset_on_connect = bool(data['reset'])
+            if 'ready_timeout' in data:
+                controller.ready_timeout = float(data['ready_timeout'])
+            if 'pipeline_depth' in data:
+                controller.pipeline_depth = max(int(data['pipeline_depth']), 1)
+
+            if port:
+                controller.port = port
+                success = await controller.connect()
+            else:
+                success = await auto_connect(controller)
+
+            return JSONResponse({
+                "success": success,
+                "message": "Arduino连接成功" if success else "Arduino连接失败"
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"连接错误: {str(e)}"})
+
+    async def send_command(request):
+        """发送通用命令"""
+        try:
+            data = await read_json(request)
+            command = data.get('command', '')
+
+            if not command:
+                return JSONResponse({"success": False, "message": "命令不能为空"})
+
+            ticket = controller.send_command(command)
+            success = command_accepted(ticket)
+            return JSONResponse({
+                "success": success,
+                "message": f"命令 '{command}' 发送{'成功' if success else '失败'}",
+                **await async_command_result(ticket, data)
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"发送命令错误: {str(e)}"})
+
+    async def get_command_status(request):
+        """查询命令执行状态，可通过 ?wait=秒数 等待命令结束"""
+        ticket_id = request.path_params['ticket_id']
+        ticket = controller.get_ticket(ticket_id)
+        if ticket is None:
+            return JSONResponse({"success": False, "message": f"未找到命令票据: {ticket_id}"}, status_code=404)
+
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except ValueError:
+            wait = 0
+        if wait and not ticket.done:
+            await wait_ticket(ticket, min(wait, MAX_COMMAND_WAIT))
+
+        return JSONResponse({"success": True, **ticket.to_dict()})
+
+    async def send_gesture(request):
+        """发送手势命令"""
+        try:
+            data = await read_json(request)
+            gesture = data.get('gesture', '')
+
+            if not gesture:
+                return JSONResponse({"success": False, "message": "手势不能为空"})
+
+            arduino_command = GESTURE_MAPPING.get(gesture, gesture)
+            ticket = controller.send_command(arduino_command)
+            success = command_accepted(ticket)
+            return JSONResponse({
+                "success": success,
+                "message": f"手势 '{gesture}' 发送{'成功' if success else '失败'}",
+                "arduino_command": arduino_command,
+                **await async_command_result(ticket, data)
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"发送手势错误: {str(e)}"})
+
+    async def send_rps_gesture(request):
+        """发送石头剪刀布手势"""
+        try:
+            data = await read_json(request)
+            gesture = data.get('gesture', '')
+
+            if gesture not in ['石头', '剪刀', '布', 'ROCK', 'PAPER', 'SCISSORS']:
+                return JSONResponse({"success": False, "message": "无效的手势"})
+
+            arduino_command = GESTURE_MAPPING.get(gesture, gesture)
+            ticket = controller.send_command(arduino_command)
+            success = command_accepted(ticket)
+            return JSONResponse({
+                "success": success,
+                "message": f"RPS手势 '{gesture}' 发送{'成功' if success else '失败'}",
+                "arduino_command": arduino_command,
+                **await async_command_result(ticket, data)
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"发送RPS手势错误: {str(e)}"})
+
+    async def send_number_gesture(request):
+        """发送数字手势"""
+        try:
+            data = await read_json(request)
+            number = data.get('number', '')
+
+            if not number.isdigit() or int(number) < 0 or int(number) > 9:
+                return JSONResponse({"success": False, "message": "无效的数字手势"})
+
+            ticket = controller.send_command(number)
+            success = command_accepted(ticket)
+            return JSONResponse({
+                "success": success,
+                "message": f"数字手势 '{number}' 发送{'成功' if success else '失败'}",
+                **await async_command_result(ticket, data)
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"发送数字手势错误: {str(e)}"})
+
+    async def send_pose(request):
+        """发送多舵机姿态，angles 为六个舵机的目标角度"""
+        try:
+            data = await read_json(request)
+            angles = data.get('angles')
+
+            try:
+                ticket = controller.set_pose(angles or [])
+            except ValueError as e:
+                return JSONResponse({"success": False, "message": f"无效的姿态: {e}"})
+            success = command_accepted(ticket)
+            return JSONResponse({
+                "success": success,
+                "message": f"姿态 {angles} 发送{'成功' if success else '失败'}",
+                **await async_command_result(ticket, data)
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"发送姿态错误: {str(e)}"})
+
+    def fixed_command(command, success_message, failure_message, error_prefix):
+        """RESET / OPENMAX / CLOSEMAX 这类不带参数的命令"""
+        async def handler(request):
+            try:
+                data = await read_json(request, silent=True)
+                ticket = controller.send_command(command)
+                success = command_accepted(ticket)
+                return JSONResponse({
+                    "success": success,
+                    "message": success_message if success else failure_message,
+                    **await async_command_result(ticket, data)
+                })
+            except Exception as e:
+                return JSONResponse({"success": False, "message": f"{error_prefix}: {str(e)}"})
+        return handler
+
+    async def stop_hand(request):
+        """取消所有排队中的命令，机械手做完当前动作后停下"""
+        try:
+            cancelled = controller.cancel_pending()
+            return JSONResponse({
+                "success": True,
+                "message": f"已取消 {len(cancelled)} 条排队命令",
+                "cancelled": [ticket.ticket_id for ticket in cancelled]
+            })
+        except Exception as e:
+            return JSONResponse({"success": False, "message": f"停止错误: {str(e)}"})
+
+    async def analyze_hand(request):
+        """分析手部关键点数据并识别手势"""
+        try:
+            hand_data = await read_json(request)
+        except Exception as e:
+            return JSONResponse(hand_error(e))
+        content_type = request.headers.get('content-type', '').split(';')[0].strip()
+        session_id = request.headers.get(SESSION_HEADER) or request.query_params.get('session')
+        smooth = functools.partial(sessions.smooth, session_id) if session_id else None
+        result = session_result(
+            await hand_result_async(hand_data, compact=content_type == COMPACT_CONTENT_TYPE, smooth=smooth),
+            sessions, session_id
+        )
+        if counter_requested(request.query_params, request.headers):
+            predict = predict_requested(request.query_params, request.headers)
+            result["actuation"] = await counter_actuation(controller, result, request.query_params.get('wait', 0),
+                                                          sessions if predict else None)
+        return JSONResponse(result)
+
+    async def analyze_hand_batch(request):
+        """批量识别多帧手部关键点，格式见 hand_batch.py"""
+        try:
+            data = await read_json(request)
+            content_type = request.headers.get('content-type', '').split(';')[0].strip()
+            gestures, confidences = await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+                analyze_batch_payload, data, compact=content_type == COMPACT_CONTENT_TYPE
+            ))
+            return JSONResponse({
+                "success": True,
+                "count": len(gestures),
+                "gestures": gestures,
+                "confidences": confidences
+            })
+        except Exception as e:
+            logger.error(f"批量手势分析错误: {e}")
+            return JSONResponse({
+                "success": False,
+                "message": f"批量手势分析错误: {str(e)}",
+                "error": str(e)
+            })
+
+    async def hand_stream(websocket):
+        """
+        手部关键点流：客户端在同一个连接上连续发送帧，服务器按顺序逐帧回复识别结果
+        帧格式 {"frame": 帧序号, "hand": 关键点字典}，也可以直接发送 /analyze_hand 的请求体
+        连接时带 ?events=1 还会推送Arduino串口事件（收到命令、动作完成等）
+        带 ?session=会话ID 时识别前平滑关键点，结果中加入去抖后的稳定手势（见 hand_session.py），
+        再带 &counter=1 时稳定手势一出现就让机械手出克制它的手势，动作结果在 actuation 字段中，
+        再带 &predict=1 时按提前预测的手势出招
+        服务器处理完一帧才读取下一帧，客户端发得太快时由TCP反压，不会在服务器上堆积
+        """
+        await websocket.accept()
+        session_id = websocket.query_params.get('session') or websocket.headers.get(SESSION_HEADER)
+        smooth = functools.partial(sessions.smooth, session_id) if session_id else None
+        counter = counter_requested(websocket.query_params, websocket.headers)
+        counter_sessions = sessions if predict_requested(websocket.query_params, websocket.headers) else None
+        send_lock = asyncio.Lock()
+        event_queue = None
+        event_task = None
+
+        async def send(message):
+            async with send_lock:
+                await websocket.send_json(message)
+
+        if websocket.query_params.get('events') in ('1', 'true'):
+            event_queue = asyncio.Queue(maxsize=WS_EVENT_QUEUE_SIZE)
+
+            def on_event(event):
+                # 客户端读得慢时丢弃最旧的事件，识别结果不受影响
+                if event_queue.full():
+                    event_queue.get_nowait()
+                event_queue.put_nowait(event)
+
+            async def push_events():
+                while True:
+                    event = await event_queue.get()
+                    await send({"type": "event", **event.to_dict()})
+
+            controller.add_event_listener(on_event)
+            event_task = asyncio.create_task(push_events())
+
+        try:
+            while True:
+                try:
+                    message = await websocket.receive_json()
+                except WebSocketDisconnect:
+                    break
+                except Exception as e:
+                    await send({"type": "result", "frame": None, **hand_error(e)})
+                    continue
+                frame = message.get('frame') if isinstance(message, dict) else None
+                hand_data = message.get('hand', message) if isinstance(message, dict) else message
+                result = session_result(await hand_result_async(hand_data, smooth=smooth), sessions, session_id)
+                if counter:
+                    result["actuation"] = await counter_actuation(controller, result, sessions=counter_sessions)
+                await send({"type": "result", "frame": frame, **result})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if event_task is not None:
+                controller.remove_event_listener(on_event)
+                event_task.cancel()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if connect_on_startup:
+            await auto_connect(controller)
+        logger.info("🔧 Arduino连接状态: " + ("已连接" if controller.is_connected else "未连接"))
+        yield
+        if controller.is_connected:
+            await controller.disconnect()
+
+    routes = [
+        Route('/status', status, methods=['GET']),
+        Route('/connect', connect_arduino, methods=['POST']),
+        Route('/command', send_command, methods=['POST']),
+        Route('/command/{ticket_id:int}', get_command_status, methods=['GET']),
+        Route('/gesture', send_gesture, methods=['POST']),
+        Route('/rps', send_rps_gesture, methods=['POST']),
+        Route('/number', send_number_gesture, methods=['POST']),
+        Route('/pose', send_pose, methods=['POST']),
+        Route('/reset', fixed_command("RESET", "机械手重置命令发送成功", "重置命令发送失败", "重置错误"),
+              methods=['POST']),
+        Route('/openmax', fixed_command("OPENMAX", "机械手全部张开到最大命令发送成功", "张开命令发送失败", "张开错误"),
+              methods=['POST']),
+        Route('/closemax', fixed_command("CLOSEMAX", "机械手全部握拳命令发送成功", "握拳命令发送失败", "握拳错误"),
+              methods=['POST']),
+        Route('/stop', stop_hand, methods=['POST']),
+        Route('/analyze_hand', analyze_hand, methods=['POST']),
+        Route('/analyze_hand_batch', analyze_hand_batch, methods=['POST']),
+        WebSocketRoute('/ws/hand', hand_stream),
+    ]
+    middleware = [Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+    app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
+    app.state.controller = controller
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="机械臂网关服务器 (asyncio版)")
+    parser.add_argument('--host', default=os.environ.get('HAND_GATEWAY_HOST', '0.0.0.0'), help="监听地址")
+    parser.add_argument('--port', type=int, default=int(os.environ.get('HAND_GATEWAY_PORT', '8081')),
+                        help="监听端口")
+    parser.add_argument('--pipeline', type=int, default=int(os.environ.get('HAND_GATEWAY_PIPELINE', '1')),
+                        help="同时在途的命令数（需要固件回显序号）")
+    parser.add_argument('--no-connect', action='store_true', help="启动时不自动连接Arduino")
+    args = parser.parse_args(argv)
+
+    controller = AsyncArduinoController(pipeline_depth=args.pipeline)
+    app = create_app(controller, connect_on_startup=not args.no_connect)
+
+    logger.info("🚀 启动机械臂网关服务器 (asyncio)...")
+    logger.info(f"📱 手机端连接地址: http://[你的电脑IP]:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, loop='asyncio', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网关共用的手势映射、闭环对战和命令响应字段
+gateway_server.py 和 gateway_async.py 的路由返回相同的JSON，导入时没有副作用
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 手势映射
+GESTURE_MAPPING = {
+    "石头": "ROCK",
+    "剪刀": "SCISSORS", 
+    "布": "PAPER",
+    "0": "0",  # 握拳
+    "1": "1",  # 指向
+    "2": "2",  # 胜利手势
+    "3": "3",
+    "4": "4", 
+    "5": "5",  # 张开
+    "6": "6",
+    "7": "7",
+    "8": "8",
+    "9": "9"
+}
+
+# 机械手总是获胜：人的手势 -> 克制它的手势
+COUNTER_GESTURES = {
+    "石头": "布",
+    "剪刀": "石头",
+    "布": "剪刀"
+}
+# /analyze_hand 带 ?counter=1（或请求头 X-Hand-Counter: 1）时，稳定手势一出现就直接让机械手出克制它的手势
+COUNTER_HEADER = 'X-Hand-Counter'
+# 再带 &predict=1（或请求头 X-Hand-Predict: 1）时按提前预测的手势出招（见 hand_predict.py）
+PREDICT_HEADER = 'X-Hand-Predict'
+
+# 等待命令执行结果的最长时间（秒）
+MAX_COMMAND_WAIT = 10.0
+
+def command_accepted(ticket):
+    """命令是否被接受（已入队、已合并或无需发送）"""
+    return ticket is not None and ticket.status != 'rejected'
+
+def counter_requested(args, headers):
+    """请求是否开启了闭环对战（查询参数 counter 或 X-Hand-Counter 请求头）"""
+    return (args.get('counter') or headers.get(COUNTER_HEADER) or '').lower() in ('1', 'true')
+
+def predict_requested(args, headers):
+    """闭环对战是否按提前预测的手势出招（查询参数 predict 或 X-Hand-Predict 请求头）"""
+    return (args.get('predict') or headers.get(PREDICT_HEADER) or '').lower() in ('1', 'true')
+
+def counter_target(result, sessions=None):
+    """
+    返回这一帧机械手要克制的人的手势，不需要动作时返回None
+    不传 sessions 时只在稳定手势变化的那一帧返回稳定手势；
+    传入 sessions 时还会按提前预测的手势返回，同一会话在回到没有手势之前针对同一个手势只返回一次
+    （预测对了的话稳定手势出现时不再重复出招，下一局出同样的手势时照样出招）
+    """
+    if result.get('gesture_changed'):
+        human = result.get('stable_gesture')
+    elif sessions is not None:
+        human = result.get('predicted_gesture')
+    else:
+        return None
+    if human not in COUNTER_GESTURES:
+        return None
+    if sessions is not None and not sessions.claim_counter(result['session'], human):
+        return None
+    return human
+
+def counter_gesture(result, sessions=None):
+    """带会话的识别结果需要动作时返回机械手应出的手势（见 counter_target），其余帧返回None"""
+    return COUNTER_GESTURES.get(counter_target(result, sessions))
+
+def actuation_result(gesture, ticket):
+    """闭环对战中机械手动作的响应字段，命令票据字段与 /rps 相同"""
+    success = command_accepted(ticket)
+    return {
+        "success": success,
+        "gesture": gesture,
+        "arduino_command": GESTURE_MAPPING[gesture],
+        "message": f"机械手出 '{gesture}' {'成功' if success else '失败'}",
+        **command_result(ticket)
+    }
+
+def send_counter_gesture(controller, result, sessions=None):
+    """
+    闭环对战：稳定手势刚出现（传入 sessions 时还包括提前预测到手势）时让机械手出克制它的手势
+    返回 (手势, 命令票据)；这一帧不需要动作时返回 (None, None)，识别结果没有会话时抛出ValueError
+    """
+    if 'stable_gesture' not in result:
+        raise ValueError("闭环对战需要会话ID (X-Hand-Session 或 ?session=)")
+    human = counter_target(result, sessions)
+    if human is None:
+        return None, None
+    gesture = COUNTER_GESTURES[human]
+    source = "出" if result.get('gesture_changed') else f"预测出 (p={result['prediction_probability']})"
+    logger.info(f"🎮 人{source} {human}，机械手出 {gesture}")
+    return gesture, controller.send_command(GESTURE_MAPPING[gesture])
+
+def command_result(ticket, data=None):
+    """
+    生成命令票据相关的响应字段
+    请求JSON中带 "wait": 秒数 时，会在该时间内等待命令写入串口
+    """
+    if ticket is None:
+        return {"ticket_id": None, "command_status": "rejected", "coalesced": [], "preempted": []}
+    
+    wait = (data or {}).get('wait', 0)
+    if wait:
+        ticket.wait(min(float(wait), MAX_COMMAND_WAIT))
+    
+    result = {
+        "ticket_id": ticket.ticket_id,
+        "command_status": ticket.status,
+        "coalesced": ticket.coalesced,
+        "preempted": ticket.preempted
+    }
+    if ticket.status == 'rejected':
+        result["error"] = ticket.error
+        result["retry_after"] = ticket.retry_after
+    return result
@@ -5,11 +5,25 @@
 接收手机指令并转发给Arduino机械臂
 """
 
-import serial
-import json
+import os
+import sys
+import signal
+import argparse
 import time
-import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from hand_landmarks import COMPACT_CONTENT_TYPE
+from hand_serial import ArduinoController, discover_arduino, save_port_cache
+from hand_recognition import analyze_hand_pose, analyze_compact_hand, analyze_dense_hand
+from gateway_common import (
+    GESTURE_MAPPING, MAX_COMMAND_WAIT, command_accepted, command_result, actuation_result,
+    counter_requested, predict_requested, send_counter_gesture
+)
+from hand_udp import UdpLandmarkListener
+from hand_batch import analyze_batch_payload
+from hand_session import SESSION_HEADER, HandSessions, session_result
 from flask import Flask, request, jsonify
+from werkzeug.serving import BaseWSGIServer
 from flask_cors import CORS
 import logging
 
@@ -20,79 +34,28 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
-class ArduinoController:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=9600):
-        self.port = port
-        self.baudrate = baudrate
-        self.serial_connection = None
-        self.is_connected = False
-        
-    def connect(self):
-        """连接到Arduino"""
-        try:
-            self.serial_connection = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=1
-            )
-            time.sleep(2)  # 等待Arduino重启
-            self.is_connected = True
-            logger.info(f"✅ 成功连接到Arduino: {self.port}")
-            return True
-        except Exception as e:
-            logger.error(f"❌ 连接Arduino失败: {e}")
-            self.is_connected = False
-            return False
-    
-    def disconnect(self):
-        """断开Arduino连接"""
-        if self.serial_connection and self.serial_connection.is_open:
-            self.serial_connection.close()
-        self.is_connected = False
-        logger.info("已断开Arduino连接")
-    
-    def send_command(self, command):
-        """发送命令到Arduino"""
-        if not self.is_connected or not self.serial_connection:
-            logger.error("Arduino未连接")
-            return False
-        
-        try:
-            # 发送命令并等待响应
-            command_with_newline = f"{command}\n"
-            self.serial_connection.write(command_with_newline.encode('utf-8'))
-            self.serial_connection.flush()
-            
-            # 等待响应
-            time.sleep(0.1)
-            if self.serial_connection.in_waiting:
-                response = self.serial_connection.readline().decode('utf-8').strip()
-                logger.info(f"Arduino响应: {response}")
-            
-            return True
-        except Exception as e:
-            logger.error(f"发送命令失败: {e}")
-            return False
-
-# 全局Arduino控制器
-arduino_controller = ArduinoController()
-
-# 手势映射
-GESTURE_MAPPING = {
-    "石头": "ROCK",
-    "剪刀": "SCISSORS", 
-    "布": "PAPER",
-    "0": "0",  # 握拳
-    "1": "1",  # 指向
-    "2": "2",  # 胜利手势
-    "3": "3",
-    "4": "4", 
-    "5": "5",  # 张开
-    "6": "6",
-    "7": "7",
-    "8": "8",
-    "9": "9"
-}
+# 全局Arduino控制器，HAND_GATEWAY_BINARY=1 时连接后尝试切换到二进制协议
+# HAND_GATEWAY_PIPELINE 为同时在途的命令数（需要固件回显序号）
+arduino_controller = ArduinoController(
+    binary_protocol=os.environ.get('HAND_GATEWAY_BINARY') == '1',
+    pipeline_depth=int(os.environ.get('HAND_GATEWAY_PIPELINE', '1'))
+)
+# UDP关键点监听（--udp-port 启用）
+udp_listener = None
+# 按会话去抖的手势识别结果（请求头 X-Hand-Session，UDP按客户端ID）
+hand_sessions = HandSessions()
+
+def counter_actuation(result, wait=0, predict=False):
+    """通过 arduino_controller 执行闭环对战，返回动作结果，这一帧不需要动作时返回None"""
+    try:
+        gesture, ticket = send_counter_gesture(arduino_controller, result, hand_sessions if predict else None)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if gesture is None:
+        return None
+    if ticket is not None and wait:
+        ticket.wait(min(float(wait), MAX_COMMAND_WAIT))
+    return actuation_result(gesture, ticket)
 
 @app.route('/status', methods=['GET'])
 def status():
@@ -100,6 +63,21 @@ def status():
     return jsonify({
         "status": "running",
         "arduino_connected": arduino_controller.is_connected,
+        "arduino_ready": arduino_controller.is_ready,
+        "arduino_degraded": arduino_controller.degraded,
+        "last_error": arduino_controller.last_error,
+        "reconnect_count": arduino_controller.reconnect_count,
+        "protocol": arduino_controller.protocol,
+        "capabilities": sorted(arduino_controller.capabilities),
+        "circuit_breaker": arduino_controller.circuit_breaker.to_dict(),
+        "queue_depth": arduino_controller.command_queue.qsize(),
+        "move_in_flight": arduino_controller.move_in_flight,
+        "in_flight": len(arduino_controller._in_flight),
+        "pipelining": arduino_controller.pipelining,
+        "pending_gesture": getattr(arduino_controller.command_queue.pending('gesture'), 'command', None),
+        "hand_state": arduino_controller.hand_state.to_dict(),
+        "udp": udp_listener.receiver.to_dict() if udp_listener else None,
+        "sessions": hand_sessions.to_dict(),
         "timestamp": time.time()
     })
 
@@ -107,11 +85,23 @@ def status():
 def connect_arduino():
     """连接Arduino"""
     try:
-        data = request.get_json()
-        port = data.get('port', '/dev/ttyUSB0')
+        data = request.get_json(silent=True) or {}
+        port = data.get('port')
+        if 'reset' in data:
+            arduino_controller.reset_on_connect = bool(data['reset'])
+        if 'ready_timeout' in data:
+            arduino_controller.ready_timeout = float(data['ready_timeout'])
+        if 'binary' in data:
+            arduino_controller.binary_protocol = bool(data['binary'])
+        if 'pipeline_depth' in data:
+            arduino_controller.pipeline_depth = max(int(data['pipeline_depth']), 1)
         
-        arduino_controller.port = port
-        success = arduino_controller.connect()
+        if port:
+            arduino_controller.port = port
+            success = arduino_controller.connect()
+        else:
+            # 没有指定端口时自动发现
+            success = auto_connect_arduino()
         
         return jsonify({
             "success": success,
@@ -133,10 +123,12 @@ def send_command():
         if not command:
             return jsonify({"success": False, "message": "命令不能为空"})
         
-        success = arduino_controller.send_command(command)
+        ticket = arduino_controller.send_command(command)
+        success = command_accepted(ticket)
         return jsonify({
             "success": success,
-            "message": f"命令 '{command}' 发送{'成功' if success else '失败'}"
+            "message": f"命令 '{command}' 发送{'成功' if success else '失败'}",
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -144,6 +136,19 @@ def send_command():
             "message": f"发送命令错误: {str(e)}"
         })
 
+@app.route('/command/<int:ticket_id>', methods=['GET'])
+def get_command_status(ticket_id):
+    """查询命令执行状态，可通过 ?wait=秒数 等待命令结束"""
+    ticket = arduino_controller.get_ticket(ticket_id)
+    if ticket is None:
+        return jsonify({"success": False, "message": f"未找到命令票据: {ticket_id}"}), 404
+    
+    wait = request.args.get('wait', 0, type=float)
+    if wait and not ticket.done:
+        ticket.wait(min(wait, MAX_COMMAND_WAIT))
+    
+    return jsonify({"success": True, **ticket.to_dict()})
+
 @app.route('/gesture', methods=['POST'])
 def send_gesture():
     """发送手势命令"""
@@ -156,12 +161,14 @@ def send_gesture():
         
         # 映射手势到Arduino命令
         arduino_command = GESTURE_MAPPING.get(gesture, gesture)
-        success = arduino_controller.send_command(arduino_command)
+        ticket = arduino_controller.send_command(arduino_command)
+        success = command_accepted(ticket)
         
         return jsonify({
             "success": success,
             "message": f"手势 '{gesture}' 发送{'成功' if success else '失败'}",
-            "arduino_command": arduino_command
+            "arduino_command": arduino_command,
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -181,12 +188,14 @@ def send_rps_gesture():
         
         # 映射到Arduino命令
         arduino_command = GESTURE_MAPPING.get(gesture, gesture)
-        success = arduino_controller.send_command(arduino_command)
+        ticket = arduino_controller.send_command(arduino_command)
+        success = command_accepted(ticket)
         
         return jsonify({
             "success": success,
             "message": f"RPS手势 '{gesture}' 发送{'成功' if success else '失败'}",
-            "arduino_command": arduino_command
+            "arduino_command": arduino_command,
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -204,11 +213,13 @@ def send_number_gesture():
         if not number.isdigit() or int(number) < 0 or int(number) > 9:
             return jsonify({"success": False, "message": "无效的数字手势"})
         
-        success = arduino_controller.send_command(number)
+        ticket = arduino_controller.send_command(number)
+        success = command_accepted(ticket)
         
         return jsonify({
             "success": success,
-            "message": f"数字手势 '{number}' 发送{'成功' if success else '失败'}"
+            "message": f"数字手势 '{number}' 发送{'成功' if success else '失败'}",
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -216,14 +227,41 @@ def send_number_gesture():
             "message": f"发送数字手势错误: {str(e)}"
         })
 
+@app.route('/pose', methods=['POST'])
+def send_pose():
+    """发送多舵机姿态，angles 为六个舵机的目标角度"""
+    try:
+        data = request.get_json()
+        angles = data.get('angles')
+        
+        try:
+            ticket = arduino_controller.set_pose(angles or [])
+        except ValueError as e:
+            return jsonify({"success": False, "message": f"无效的姿态: {e}"})
+        success = command_accepted(ticket)
+        
+        return jsonify({
+            "success": success,
+            "message": f"姿态 {angles} 发送{'成功' if success else '失败'}",
+            **command_result(ticket, data)
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"发送姿态错误: {str(e)}"
+        })
+
 @app.route('/reset', methods=['POST'])
 def reset_hand():
     """重置机械手"""
     try:
-        success = arduino_controller.send_command("RESET")
+        data = request.get_json(silent=True)
+        ticket = arduino_controller.send_command("RESET")
+        success = command_accepted(ticket)
         return jsonify({
             "success": success,
-            "message": "机械手重置命令发送成功" if success else "重置命令发送失败"
+            "message": "机械手重置命令发送成功" if success else "重置命令发送失败",
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -235,10 +273,13 @@ def reset_hand():
 def open_hand_max():
     """机械手全部张开到最大"""
     try:
-        success = arduino_controller.send_command("OPENMAX")
+        data = request.get_json(silent=True)
+        ticket = arduino_controller.send_command("OPENMAX")
+        success = command_accepted(ticket)
         return jsonify({
             "success": success,
-            "message": "机械手全部张开到最大命令发送成功" if success else "张开命令发送失败"
+            "message": "机械手全部张开到最大命令发送成功" if success else "张开命令发送失败",
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -250,10 +291,13 @@ def open_hand_max():
 def close_hand_max():
     """机械手全部握拳"""
     try:
-        success = arduino_controller.send_command("CLOSEMAX")
+        data = request.get_json(silent=True)
+        ticket = arduino_controller.send_command("CLOSEMAX")
+        success = command_accepted(ticket)
         return jsonify({
             "success": success,
-            "message": "机械手全部握拳命令发送成功" if success else "握拳命令发送失败"
+            "message": "机械手全部握拳命令发送成功" if success else "握拳命令发送失败",
+            **command_result(ticket, data)
         })
     except Exception as e:
         return jsonify({
@@ -261,21 +305,48 @@ def close_hand_max():
             "message": f"握拳错误: {str(e)}"
         })
 
+@app.route('/stop', methods=['POST'])
+def stop_hand():
+    """取消所有排队中的命令，机械手做完当前动作后停下"""
+    try:
+        cancelled = arduino_controller.cancel_pending()
+        return jsonify({
+            "success": True,
+            "message": f"已取消 {len(cancelled)} 条排队命令",
+            "cancelled": [ticket.ticket_id for ticket in cancelled]
+        })
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "message": f"停止错误: {str(e)}"
+        })
+
 @app.route('/analyze_hand', methods=['POST'])
 def analyze_hand():
     """分析手部关键点数据并识别手势"""
     try:
         hand_data = request.get_json()
+        # 带会话ID时识别前先平滑关键点，并同时返回去抖后的稳定手势
+        session_id = request.headers.get(SESSION_HEADER) or request.args.get('session')
+        smooth = functools.partial(hand_sessions.smooth, session_id) if session_id else None
         
-        # 这里实现手势识别逻辑
         # 基于手部关键点数据判断是石头、剪刀还是布
-        gesture, confidence = analyze_hand_pose(hand_data)
+        # Content-Type 为紧凑格式时按固定关节顺序解析，否则是Vision关节名作为键的字典
+        if request.mimetype == COMPACT_CONTENT_TYPE:
+            gesture, confidence = analyze_compact_hand(hand_data, smooth)
+        else:
+            gesture, confidence = analyze_hand_pose(hand_data, smooth)
         
-        return jsonify({
+        result = session_result({
             "gesture": gesture,
             "confidence": confidence,
             "success": True
-        })
+        }, hand_sessions, session_id)
+        # 闭环对战：不需要手机再调用 /rps，动作结果在同一个响应中返回
+        if counter_requested(request.args, request.headers):
+            result["actuation"] = counter_actuation(result, request.args.get('wait', 0),
+                                                    predict_requested(request.args, request.headers))
+        return jsonify(result)
     except Exception as e:
         logger.error(f"手势分析错误: {e}")
         return jsonify({
@@ -285,155 +356,158 @@ def analyze_hand():
             "error": str(e)
         })
 
-def analyze_hand_pose(hand_data):
-    """
-    基于手部关键点数据识别手势 - 优化版本
-    返回: (手势, 置信度)
-    """
+@app.route('/analyze_hand_batch', methods=['POST'])
+def analyze_hand_batch():
+    """批量识别多帧手部关键点，格式见 hand_batch.py"""
     try:
-        logger.info(f"收到手部数据: {hand_data}")
-        
-        # 从iOS发送的数据中提取关键点
-        # iOS使用Vision框架的VNHumanHandPoseObservationJointName
-        thumb_tip = None
-        index_tip = None
-        middle_tip = None
-        ring_tip = None
-        pinky_tip = None
-        
-        # 查找对应的关键点
-        for key, value in hand_data.items():
-            if 'thumbTip' in str(key) or 'VNHumanHandPoseObservationJointName(_rawValue: VNHLKTTIP)' in str(key):
-                thumb_tip = value
-            elif 'indexTip' in str(key) or 'VNHumanHandPoseObservationJointName(_rawValue: VNHLKITIP)' in str(key):
-                index_tip = value
-            elif 'middleTip' in str(key) or 'VNHumanHandPoseObservationJointName(_rawValue: VNHLKMTIP)' in str(key):
-                middle_tip = value
-            elif 'ringTip' in str(key) or 'VNHumanHandPoseObservationJointName(_rawValue: VNHLKRTIP)' in str(key):
-                ring_tip = value
-            elif 'pinkyTip' in str(key) or 'VNHumanHandPoseObservationJointName(_rawValue: VNHLKPTIP)' in str(key):
-                pinky_tip = value
-        
-        # 检查关键点是否存在
-        if not all([thumb_tip, index_tip, middle_tip, ring_tip, pinky_tip]):
-            logger.warning("关键点数据不完整")
-            return "等待识别...", 0.0
-        
-        # 优化后的手指伸直判断
-        fingers_info = []
-        
-        # 检查每个手指是否伸直（更精确的判断）
-        for i, finger_tip in enumerate([thumb_tip, index_tip, middle_tip, ring_tip, pinky_tip]):
-            confidence = finger_tip.get('confidence', 0)
-            y_pos = finger_tip.get('y', 0.5)
-            x_pos = finger_tip.get('x', 0.5)
-            
-            logger.info(f"手指{i}: Y={y_pos}, X={x_pos}, 置信度={confidence}")
-            
-            if confidence > 0.4:  # 提高置信度阈值，确保数据质量
-                # 优化判断逻辑：考虑手指的相对位置和Y坐标
-                is_extended = False
-                
-                if i == 0:  # 拇指 - 特殊处理
-                    # 拇指的判断更复杂，需要结合X和Y坐标
-                    is_extended = y_pos < 0.6 and x_pos > 0.3
-                elif i == 4:  # 小拇指 - 特殊处理
-                    # 小拇指通常比其他手指短，需要更宽松的阈值
-                    is_extended = y_pos < 0.95  # 大幅放宽阈值，让小拇指初始状态为180度伸直
-                else:  # 其他手指（食指、中指、无名指）
-                    # 其他手指主要看Y坐标，但阈值更精确
-                    is_extended = y_pos < 0.45  # 降低阈值，更严格
-                
-                fingers_info.append({
-                    'extended': is_extended,
-                    'confidence': confidence,
-                    'y_pos': y_pos,
-                    'x_pos': x_pos
-                })
-                logger.info(f"手指{i} {'伸直' if is_extended else '弯曲'}")
-            else:
-                fingers_info.append({
-                    'extended': False,
-                    'confidence': confidence,
-                    'y_pos': y_pos,
-                    'x_pos': x_pos
-                })
-                logger.info(f"手指{i} 置信度太低")
-        
-        extended_count = sum(1 for finger in fingers_info if finger['extended'])
-        extended_fingers = [i for i, finger in enumerate(fingers_info) if finger['extended']]
-        
-        logger.info(f"伸直的手指数量: {extended_count}")
-        logger.info(f"伸直的手指索引: {extended_fingers}")
-        logger.info(f"手指状态: {[finger['extended'] for finger in fingers_info]}")
-        
-        # 优化后的手势识别逻辑
-        if extended_count == 0:
-            # 所有手指都弯曲 - 石头
-            logger.info("识别为: 石头")
-            return "石头", 0.9
-        elif extended_count == 2:
-            # 两个手指伸直 - 剪刀
-            # 检查是否是食指和中指（典型的剪刀手势）
-            if 1 in extended_fingers and 2 in extended_fingers:
-                logger.info("识别为: 剪刀 (食指+中指)")
-                return "剪刀", 0.95
-            elif 0 in extended_fingers and 1 in extended_fingers:
-                logger.info("识别为: 剪刀 (拇指+食指)")
-                return "剪刀", 0.9
-            else:
-                logger.info("识别为: 剪刀 (其他两个手指)")
-                return "剪刀", 0.85
-        elif extended_count == 1:
-            # 只有一个手指伸直 - 可能是剪刀的开始或石头的变化
-            if 1 in extended_fingers:  # 只有食指伸直
-                logger.info("识别为: 剪刀 (只有食指)")
-                return "剪刀", 0.7
-            else:
-                logger.info("识别为: 石头 (变化中)")
-                return "石头", 0.6
-        elif extended_count >= 3:
-            # 三个或更多手指伸直 - 布
-            logger.info("识别为: 布")
-            return "布", 0.9
-        else:
-            logger.info(f"无法识别手势，伸直手指数: {extended_count}")
-            return "未知", 0.3
-            
+        data = request.get_json()
+        gestures, confidences = analyze_batch_payload(data, compact=request.mimetype == COMPACT_CONTENT_TYPE)
+        return jsonify({
+            "success": True,
+            "count": len(gestures),
+            "gestures": gestures,
+            "confidences": confidences
+        })
     except Exception as e:
-        logger.error(f"手势分析失败: {e}")
-        return "未知", 0.0
+        logger.error(f"批量手势分析错误: {e}")
+        return jsonify({
+            "success": False,
+            "message": f"批量手势分析错误: {str(e)}",
+            "error": str(e)
+        })
 
 def auto_connect_arduino():
-    """自动尝试连接Arduino"""
-    common_ports = [
-        '/dev/tty.usbserial-210',  # 你的Arduino设备
-        '/dev/ttyUSB0',
-        '/dev/ttyUSB1', 
-        '/dev/ttyACM0',
-        '/dev/ttyACM1',
-        'COM1',
-        'COM2',
-        'COM3',
-        'COM4'
-    ]
-    
-    for port in common_ports:
-        logger.info(f"尝试连接端口: {port}")
-        arduino_controller.port = port
-        if arduino_controller.connect():
-            return True
-    
-    logger.warning("无法自动连接Arduino，请手动连接")
+    """自动发现并连接Arduino"""
+    start = time.time()
+    probe = discover_arduino(
+        baudrate=arduino_controller.baudrate,
+        reset=arduino_controller.reset_on_connect
+    )
+    if probe is None:
+        logger.warning("无法自动连接Arduino，请手动连接")
+        return False
+
+    logger.info(f"🔍 在 {probe.port} 发现机械手 (通过{'启动信息' if probe.identified_by == 'banner' else '握手'}识别)，"
+                f"耗时 {time.time() - start:.1f}s")
+    if arduino_controller.connect(probe=probe):
+        save_port_cache(probe.port)
+        return True
     return False
 
+# 服务器配置，命令行参数优先于环境变量
+DEFAULT_HOST = os.environ.get('HAND_GATEWAY_HOST', '0.0.0.0')
+DEFAULT_PORT = int(os.environ.get('HAND_GATEWAY_PORT', '8081'))
+DEFAULT_THREADS = int(os.environ.get('HAND_GATEWAY_THREADS', '8'))
+# 默认生产模式：开发模式的自动重载会多一个进程，直接运行脚本时容易误用
+DEFAULT_MODE = os.environ.get('HAND_GATEWAY_MODE', 'production')
+DEFAULT_UDP_PORT = int(os.environ.get('HAND_GATEWAY_UDP_PORT', '0'))
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    没有安装waitress时使用的生产服务器：固定大小的线程池处理请求
+    使用HTTP/1.0（每个请求后关闭连接），避免空闲的长连接占住工作线程
+    """
+
+    def __init__(self, host, port, wsgi_app, threads):
+        super().__init__(host, port, wsgi_app)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="http-worker")
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request_in_pool, request, client_address)
+
+    def _process_request_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
+def serve_production(host, port, threads):
+    """生产模式：多线程WSGI服务器，没有调试器和自动重载"""
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+
+    if serve is not None:
+        logger.info(f"🏭 WSGI服务器: waitress ({threads} 个工作线程)")
+        serve(app, host=host, port=port, threads=threads, ident='hand-gateway')
+        return
+
+    logger.info(f"🏭 WSGI服务器: 内置线程池 ({threads} 个工作线程，安装waitress可获得更好的性能)")
+    server = PooledWSGIServer(host, port, app, threads)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="机械臂网关服务器")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--production', dest='mode', action='store_const', const='production',
+                      help="生产模式（默认）：多线程WSGI服务器 (环境变量 HAND_GATEWAY_MODE)")
+    mode.add_argument('--dev', dest='mode', action='store_const', const='development',
+                      help="开发模式：Flask调试服务器，修改代码自动重载 (HAND_GATEWAY_MODE=development)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="监听地址 (HAND_GATEWAY_HOST)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口 (HAND_GATEWAY_PORT)")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help="生产模式的工作线程数 (HAND_GATEWAY_THREADS)")
+    parser.add_argument('--udp-port', type=int, default=DEFAULT_UDP_PORT,
+                        help="UDP关键点监听端口，0表示不启用 (HAND_GATEWAY_UDP_PORT)")
+    parser.set_defaults(mode=DEFAULT_MODE)
+    args = parser.parse_args(argv)
+    if args.mode not in ('development', 'production'):
+        parser.error(f"未知的运行模式: {args.mode}")
+    return args
+
+
+def main(argv=None):
+    global udp_listener
+    args = parse_args(argv)
+    production = args.mode == 'production'
+    # 开发模式的自动重载会多启动一个监视进程，只有真正提供服务的子进程才连接Arduino，
+    # 否则两个进程会争抢同一个串口
+    owns_serial = production or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+    if owns_serial:
+        # 把SIGTERM转换为正常退出，保证断开前让固件回到文本协议
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        # 启动时尝试连接Arduino
+        auto_connect_arduino()
+        if args.udp_port:
+            udp_listener = UdpLandmarkListener(analyze_dense_hand, args.host, args.udp_port,
+                                               sessions=hand_sessions).start()
+
+        logger.info("🚀 启动机械臂网关服务器...")
+        logger.info(f"⚙️ 运行模式: {'生产' if production else '开发'}  监听: {args.host}:{args.port}")
+        logger.info(f"📱 手机端连接地址: http://[你的电脑IP]:{args.port}")
+        logger.info("🔧 Arduino连接状态: " + (
+            f"已连接 {arduino_controller.port} ({arduino_controller.protocol}协议)"
+            if arduino_controller.is_connected else "未连接"))
+
+    try:
+        if production:
+            serve_production(args.host, args.port, args.threads)
+        else:
+            app.run(host=args.host, port=args.port, debug=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if owns_serial:
+            if udp_listener is not None:
+                udp_listener.stop()
+            arduino_controller.disconnect()
+            logger.info("👋 网关服务器已停止")
+
+
 if __name__ == '__main__':
-    # 启动时尝试连接Arduino
-    auto_connect_arduino()
-    
-    # 启动Flask服务器
-    logger.info("🚀 启动机械臂网关服务器...")
-    logger.info("📱 手机端连接地址: http://[你的电脑IP]:8081")
-    logger.info("🔧 Arduino连接状态: " + ("已连接" if arduino_controller.is_connected else "未连接"))
-    
-    app.run(host='0.0.0.0', port=8081, debug=True)
+    main()
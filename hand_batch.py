@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量手势识别
+把N帧关键点堆叠成 (N, 21, 3) 的数组（x, y, 置信度），用NumPy一次判断所有帧，
+结果与逐帧的 analyze_hand_pose 完全相同；用于回放录制的会话和汇总多台手机的帧
+
+批量请求格式 (/analyze_hand_batch):
+    application/json:               {"frames": [关键点字典, ...]}
+    application/vnd.hand.v1+json:   {"x": [[21个x], ...], "y": [...], "conf": [...]}
+                                    或 {"f32": base64(N x 63个小端float32，每帧为21个x、21个y、21个置信度)}
+"""
+
+import base64
+
+import numpy as np
+
+from hand_landmarks import JOINT_COUNT, normalize_hand
+from hand_features import fingers_extended
+
+# 手势编号 -> (手势, 置信度)，顺序与 classify_extended 的判断分支相同
+GESTURE_RESULTS = (
+    ("等待识别...", 0.0),
+    ("石头", 0.9),
+    ("剪刀", 0.95),      # 食指+中指
+    ("剪刀", 0.9),       # 拇指+食指
+    ("剪刀", 0.85),      # 其他两个手指
+    ("剪刀", 0.7),       # 只有食指
+    ("石头", 0.6),       # 只有一个其他手指
+    ("布", 0.9),
+    ("未知", 0.0),       # 数据无法解析
+)
+GESTURE_LABELS = np.array([gesture for gesture, _ in GESTURE_RESULTS], dtype=object)
+GESTURE_CONFIDENCES = np.array([confidence for _, confidence in GESTURE_RESULTS])
+INVALID = len(GESTURE_RESULTS) - 1
+
+
+def stack_hands(frames):
+    """
+    把关键点字典列表堆叠为 (N, 21, 3) 数组和 (N, 21) 的关节存在标记
+    无法解析的帧返回在 invalid 标记中，识别结果为"未知"
+    """
+    count = len(frames)
+    points = np.zeros((count, JOINT_COUNT, 3))
+    present = np.zeros((count, JOINT_COUNT), dtype=bool)
+    invalid = np.zeros(count, dtype=bool)
+    for i, hand_data in enumerate(frames):
+        try:
+            hand = normalize_hand(hand_data)
+            points[i] = np.array([hand.xs, hand.ys, hand.confs], dtype=float).T
+        except Exception:
+            invalid[i] = True
+            continue
+        present[i] = hand.present
+    return points, present, invalid
+
+
+def parse_compact_batch(payload):
+    """解析紧凑格式的批量请求，返回 (points, present)，格式错误时抛出ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("紧凑格式必须是JSON对象")
+    if 'f32' in payload:
+        try:
+            raw = base64.b64decode(payload['f32'], validate=True)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"f32数据错误: {e}")
+        frame_size = JOINT_COUNT * 3 * 4
+        if not raw or len(raw) % frame_size:
+            raise ValueError(f"f32数据长度必须是{frame_size}字节的整数倍")
+        planes = np.frombuffer(raw, dtype='<f4').reshape(-1, 3, JOINT_COUNT).astype(float)
+    else:
+        try:
+            planes = np.stack([np.asarray(payload[field], dtype=float) for field in ('x', 'y', 'conf')], axis=1)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"x/y/conf 必须是每帧{JOINT_COUNT}个数字的数组: {e}")
+        if planes.ndim != 3 or planes.shape[2] != JOINT_COUNT:
+            raise ValueError(f"x/y/conf 必须是每帧{JOINT_COUNT}个数字的数组")
+    points = planes.transpose(0, 2, 1)
+    return points, points[:, :, 2] > 0
+
+
+def classify_batch(points, present, invalid=None):
+    """
+    批量判断手势，返回 (手势数组, 置信度数组)
+    points: (N, 21, 3)；present: (N, 21)；invalid: (N,) 无法解析的帧
+    """
+    extended, complete, _ = fingers_extended(points, present)
+    extended_count = extended.sum(axis=1)
+
+    codes = np.select(
+        [
+            ~complete,
+            extended_count == 0,
+            (extended_count == 2) & extended[:, 1] & extended[:, 2],
+            (extended_count == 2) & extended[:, 0] & extended[:, 1],
+            extended_count == 2,
+            (extended_count == 1) & extended[:, 1],
+            extended_count == 1,
+        ],
+        [0, 1, 2, 3, 4, 5, 6],
+        default=7
+    )
+    if invalid is not None:
+        codes[invalid] = INVALID
+    return GESTURE_LABELS[codes], GESTURE_CONFIDENCES[codes]
+
+
+def analyze_hands(frames):
+    """批量识别关键点字典列表，返回 (手势列表, 置信度列表)"""
+    gestures, confidences = classify_batch(*stack_hands(frames))
+    return gestures.tolist(), confidences.tolist()
+
+
+def analyze_batch_payload(payload, compact=False):
+    """解析 /analyze_hand_batch 的请求体并识别，返回 (手势列表, 置信度列表)，格式错误时抛出ValueError"""
+    if compact:
+        gestures, confidences = classify_batch(*parse_compact_batch(payload))
+        return gestures.tolist(), confidences.tolist()
+    frames = payload.get('frames') if isinstance(payload, dict) else None
+    if not isinstance(frames, list):
+        raise ValueError("frames 必须是关键点字典的数组")
+    return analyze_hands(frames)
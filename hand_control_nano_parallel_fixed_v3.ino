@@ -13,7 +13,10 @@
  * 功能:
  * - 数字手势 0-9
  * - 剪刀石头布手势
+ * - 多舵机姿态 (POSE:a0,a1,a2,a3,a4,a5)
  * - 串口控制
+ * - 二进制协议 (CAPS? 查询能力, BIN:波特率 切换，帧格式见 hand_protocol.py)
+ * - 带序号的命令 (#序号 命令)，收到时回复 "ACK #序号"，结束时回复 "DONE #序号 状态码"
  */
 
 #include <Servo.h>
@@ -49,6 +52,50 @@ const int ANIMATION_SPEED = 15;
 // 舵机连接状态
 bool servoConnected[6] = {false, false, false, false, false, false};
 
+// 二进制协议配置，与 hand_protocol.py 保持一致
+// 帧格式: 0xA5 | LEN | SEQ | TYPE | PAYLOAD | CRC8(LEN..PAYLOAD)
+const uint8_t FRAME_SYNC = 0xA5;
+const int FRAME_MAX_PAYLOAD = 16;
+const uint8_t FRAME_GESTURE = 0x01;
+const uint8_t FRAME_SERVO = 0x02;
+const uint8_t FRAME_POSE = 0x03;
+const uint8_t FRAME_PING = 0x04;
+const uint8_t FRAME_TEXT = 0x05;
+const uint8_t FRAME_ACK = 0x81;
+const uint8_t FRAME_DONE = 0x82;
+const uint8_t FRAME_NAK = 0x83;
+
+const uint8_t STATUS_OK = 0;
+const uint8_t STATUS_UNKNOWN = 1;
+const uint8_t STATUS_INVALID = 2;
+const uint8_t STATUS_TIMEOUT = 3;
+const uint8_t STATUS_CRC = 4;
+
+const long TEXT_BAUDRATE = 9600;
+const long BINARY_BAUDRATE = 57600;
+
+// 手势编号 -> 命令
+const char* GESTURE_NAMES[] = {
+  "0", "1", "2", "3", "4", "5", "6", "7", "8", "9",
+  "ROCK", "PAPER", "SCISSORS", "RESET", "OPENMAX", "CLOSEMAX"
+};
+const int GESTURE_NAME_COUNT = 16;
+
+// 二进制模式下关闭所有调试输出，只发送ACK/DONE帧
+bool binaryMode = false;
+uint8_t lastCommandStatus = STATUS_OK;
+uint8_t frameBuffer[FRAME_MAX_PAYLOAD + 5];
+int frameLength = 0;
+
+// 调试输出，二进制模式下不输出
+template <typename T> void logPrint(T value) {
+  if (!binaryMode) Serial.print(value);
+}
+
+template <typename T> void logPrintln(T value) {
+  if (!binaryMode) Serial.println(value);
+}
+
 // 初始化舵机
 void initializeServos() {
   Serial.println("🔧 初始化舵机...");
@@ -114,7 +161,8 @@ void moveAllServosParallel() {
   }
   
   if (stepCount >= maxSteps) {
-    Serial.println("⚠️ 舵机移动超时");
+    lastCommandStatus = STATUS_TIMEOUT;
+    logPrintln("⚠️ 舵机移动超时");
   }
 }
 
@@ -124,9 +172,9 @@ void setServoTarget(int servoIndex, int angle) {
     targetAngle[servoIndex] = constrain(angle, 0, 180);
     
     if (!servoConnected[servoIndex]) {
-      Serial.print("⚠️ 舵机 ");
-      Serial.print(servoIndex);
-      Serial.println(" 未连接");
+      logPrint("⚠️ 舵机 ");
+      logPrint(servoIndex);
+      logPrintln(" 未连接");
     }
   }
 }
@@ -146,26 +194,26 @@ void setAllFingers(bool isOpen) {
 
 // 执行移动
 void executeMove() {
-  Serial.println("🚀 执行舵机移动...");
+  logPrintln("🚀 执行舵机移动...");
   moveAllServosParallel();
-  Serial.println("✅ 舵机移动完成");
+  logPrintln("✅ 舵机移动完成");
 }
 
 // 数字手势 0-9
 void makeNumberGesture(String number) {
-  Serial.print("手势: ");
-  Serial.println(number);
+  logPrint("手势: ");
+  logPrintln(number);
   
   if (number == "0") {
     // 握拳
-    Serial.println("动作: 握拳");
+    logPrintln("动作: 握拳");
     setAllFingers(false);
     setServoTarget(WRIST_INDEX, 90);
     executeMove();
   }
   else if (number == "1") {
     // 指向手势
-    Serial.println("动作: 指向");
+    logPrintln("动作: 指向");
     setFinger(PINKY_INDEX, false);
     setFinger(RING_INDEX, false);
     setFinger(MIDDLE_INDEX, false);
@@ -176,7 +224,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "2") {
     // 胜利手势
-    Serial.println("动作: 胜利");
+    logPrintln("动作: 胜利");
     setFinger(PINKY_INDEX, false);
     setFinger(RING_INDEX, false);
     setFinger(MIDDLE_INDEX, true);
@@ -187,7 +235,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "3") {
     // 三指手势
-    Serial.println("动作: 三指");
+    logPrintln("动作: 三指");
     setFinger(PINKY_INDEX, false);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -198,7 +246,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "4") {
     // 四指手势
-    Serial.println("动作: 四指");
+    logPrintln("动作: 四指");
     setFinger(PINKY_INDEX, true);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -209,14 +257,14 @@ void makeNumberGesture(String number) {
   }
   else if (number == "5") {
     // 张开手势
-    Serial.println("动作: 张开");
+    logPrintln("动作: 张开");
     setAllFingers(true);
     setServoTarget(WRIST_INDEX, 90);
     executeMove();
   }
   else if (number == "6") {
     // 六指手势
-    Serial.println("动作: 六指");
+    logPrintln("动作: 六指");
     setFinger(PINKY_INDEX, true);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -227,7 +275,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "7") {
     // 七指手势
-    Serial.println("动作: 七指");
+    logPrintln("动作: 七指");
     setFinger(PINKY_INDEX, true);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -238,7 +286,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "8") {
     // 八指手势
-    Serial.println("动作: 八指");
+    logPrintln("动作: 八指");
     setFinger(PINKY_INDEX, true);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -249,7 +297,7 @@ void makeNumberGesture(String number) {
   }
   else if (number == "9") {
     // 九指手势
-    Serial.println("动作: 九指");
+    logPrintln("动作: 九指");
     setFinger(PINKY_INDEX, true);
     setFinger(RING_INDEX, true);
     setFinger(MIDDLE_INDEX, true);
@@ -259,32 +307,33 @@ void makeNumberGesture(String number) {
     executeMove();
   }
   else {
-    Serial.println("❌ 无效的数字手势");
+    lastCommandStatus = STATUS_INVALID;
+    logPrintln("❌ 无效的数字手势");
   }
 }
 
 // 剪刀石头布手势
 void makeRPSGesture(String gesture) {
-  Serial.print("RPS手势: ");
-  Serial.println(gesture);
+  logPrint("RPS手势: ");
+  logPrintln(gesture);
   
   if (gesture == "ROCK") {
     // 石头 - 握拳
-    Serial.println("动作: 石头 (握拳)");
+    logPrintln("动作: 石头 (握拳)");
     setAllFingers(false);
     setServoTarget(WRIST_INDEX, 90);
     executeMove();
   }
   else if (gesture == "PAPER") {
     // 布 - 张开手掌
-    Serial.println("动作: 布 (张开)");
+    logPrintln("动作: 布 (张开)");
     setAllFingers(true);
     setServoTarget(WRIST_INDEX, 90);
     executeMove();
   }
   else if (gesture == "SCISSORS") {
     // 剪刀 - 食指和中指张开，其他收拢
-    Serial.println("动作: 剪刀 (食指中指)");
+    logPrintln("动作: 剪刀 (食指中指)");
     setFinger(PINKY_INDEX, false);
     setFinger(RING_INDEX, false);
     setFinger(MIDDLE_INDEX, true);
@@ -294,18 +343,35 @@ void makeRPSGesture(String gesture) {
     executeMove();
   }
   else {
-    Serial.println("❌ 无效的RPS手势");
+    lastCommandStatus = STATUS_INVALID;
+    logPrintln("❌ 无效的RPS手势");
   }
 }
 
 // 重置为张开状态
 void resetToOpen() {
-  Serial.println("🔄 重置为张开状态");
+  logPrintln("🔄 重置为张开状态");
+  setAllFingers(true);
+  setServoTarget(WRIST_INDEX, 90);
+  executeMove();
+}
+
+// 机械手全部张开到最大
+void openHandMax() {
+  logPrintln("🖐️ 机械手全部张开到最大");
   setAllFingers(true);
   setServoTarget(WRIST_INDEX, 90);
   executeMove();
 }
 
+// 机械手全部握拳
+void closeHandMax() {
+  logPrintln("👊 机械手全部握拳");
+  setAllFingers(false);
+  setServoTarget(WRIST_INDEX, 90);
+  executeMove();
+}
+
 // 检查是否是数字
 bool isNumber(String str) {
   for (int i = 0; i < str.length(); i++) {
@@ -316,30 +382,102 @@ bool isNumber(String str) {
   return str.length() > 0;
 }
 
+// 解析姿态参数 "a0,a1,a2,a3,a4,a5"，必须正好6个数字
+bool parsePose(String args, int angles[]) {
+  int start = 0;
+  for (int i = 0; i < SERVO_COUNT; i++) {
+    int comma = args.indexOf(',', start);
+    bool isLast = (i == SERVO_COUNT - 1);
+    if (isLast != (comma == -1)) {
+      return false;
+    }
+    String field = isLast ? args.substring(start) : args.substring(start, comma);
+    field.trim();
+    if (!isNumber(field)) {
+      return false;
+    }
+    angles[i] = field.toInt();
+    start = comma + 1;
+  }
+  return true;
+}
+
+// 多舵机姿态：一次设置全部目标角度，只执行一次并行移动
+void makePose(int angles[]) {
+  logPrint("动作: 姿态 [");
+  for (int i = 0; i < SERVO_COUNT; i++) {
+    logPrint(angles[i]);
+    if (i < SERVO_COUNT - 1) {
+      logPrint(",");
+    }
+  }
+  logPrintln("]");
+  
+  for (int i = 0; i < SERVO_COUNT; i++) {
+    setServoTarget(i, angles[i]);
+  }
+  executeMove();
+}
+
 // 串口命令处理
 void processSerialCommand(String command) {
   command.trim();
   
+  // 带序号的命令: #序号 命令
+  int seq = -1;
+  if (command.startsWith("#")) {
+    int space = command.indexOf(' ');
+    if (space == -1) return;
+    seq = command.substring(1, space).toInt();
+    command = command.substring(space + 1);
+    command.trim();
+  }
+  
   if (command.length() == 0) return;
   
-  Serial.print("📥 收到命令: ");
-  Serial.println(command);
+  lastCommandStatus = STATUS_OK;
+  logPrint("📥 收到命令: ");
+  logPrintln(command);
+  if (seq >= 0) {
+    logPrint("ACK #");
+    logPrintln(seq);
+  }
+  
+  dispatchCommand(command);
   
+  if (seq >= 0) {
+    logPrint("DONE #");
+    logPrint(seq);
+    logPrint(" ");
+    logPrintln(lastCommandStatus);
+  }
+}
+
+// 按命令类型分发
+void dispatchCommand(String command) {
   // 首先检查是否是数字手势 0-9
   if (isNumber(command) && command.toInt() >= 0 && command.toInt() <= 9) {
-    Serial.println("🎯 识别为数字手势");
+    logPrintln("🎯 识别为数字手势");
     makeNumberGesture(command);
   }
   // 检查是否是剪刀石头布手势
   else if (command == "ROCK" || command == "PAPER" || command == "SCISSORS") {
-    Serial.println("🎯 识别为RPS手势");
+    logPrintln("🎯 识别为RPS手势");
     makeRPSGesture(command);
   }
   // 重置命令
   else if (command == "RESET") {
-    Serial.println("🔄 识别为重置命令");
+    logPrintln("🔄 识别为重置命令");
     resetToOpen();
   }
+  // 机械手全部张开到最大
+  else if (command == "OPENMAX") {
+    openHandMax();
+  }
+  // 机械手全部握拳
+  else if (command == "CLOSEMAX") {
+    closeHandMax();
+  }
   // 单个舵机控制命令
   else if (command.startsWith("SERVO:")) {
     // 格式: SERVO:index:angle
@@ -350,30 +488,169 @@ void processSerialCommand(String command) {
       int servoIndex = command.substring(firstColon + 1, secondColon).toInt();
       int angle = command.substring(secondColon + 1).toInt();
       
-      Serial.print("🎯 舵机 ");
-      Serial.print(servoIndex);
-      Serial.print(" 到 ");
-      Serial.print(angle);
-      Serial.println(" 度");
+      logPrint("🎯 舵机 ");
+      logPrint(servoIndex);
+      logPrint(" 到 ");
+      logPrint(angle);
+      logPrintln(" 度");
       
       setServoTarget(servoIndex, angle);
       executeMove();
     } else {
-      Serial.println("❌ 无效的舵机命令格式");
+      lastCommandStatus = STATUS_INVALID;
+      logPrintln("❌ 无效的舵机命令格式");
+    }
+  }
+  // 多舵机姿态命令
+  else if (command.startsWith("POSE:")) {
+    // 格式: POSE:a0,a1,a2,a3,a4,a5 （小拇指,无名指,中指,食指,大拇指,手腕）
+    int angles[SERVO_COUNT];
+    if (parsePose(command.substring(5), angles)) {
+      logPrintln("🎯 识别为姿态命令");
+      makePose(angles);
+    } else {
+      lastCommandStatus = STATUS_INVALID;
+      logPrintln("❌ 无效的姿态命令格式");
+    }
+  }
+  // 能力查询
+  else if (command == "CAPS?") {
+    logPrint("CAPS:POSE,BIN1,SEQ,BAUD=");
+    logPrintln(BINARY_BAUDRATE);
+  }
+  // 切换到二进制协议，格式: BIN:波特率
+  else if (command.startsWith("BIN:")) {
+    long baudrate = command.substring(4).toInt();
+    if (baudrate == 9600 || baudrate == 19200 || baudrate == 38400 || baudrate == 57600 || baudrate == 115200) {
+      logPrint("BIN OK ");
+      logPrintln(baudrate);
+      enterBinaryMode(baudrate);
+    } else {
+      lastCommandStatus = STATUS_INVALID;
+      logPrintln("❌ 无效的波特率");
     }
   }
   // 未知命令
   else {
-    Serial.print("❌ 未知命令: ");
-    Serial.println(command);
-    Serial.print("命令长度: ");
-    Serial.println(command.length());
-    Serial.print("命令内容: [");
+    lastCommandStatus = STATUS_UNKNOWN;
+    logPrint("❌ 未知命令: ");
+    logPrintln(command);
+    logPrint("命令长度: ");
+    logPrintln(command.length());
+    logPrint("命令内容: [");
     for (int i = 0; i < command.length(); i++) {
-      Serial.print((int)command.charAt(i));
-      Serial.print(" ");
+      logPrint((int)command.charAt(i));
+      logPrint(" ");
+    }
+    logPrintln("]");
+  }
+}
+
+// CRC-8（多项式0x07），覆盖 LEN 到 PAYLOAD 末尾
+uint8_t crc8(const uint8_t* data, int length) {
+  uint8_t crc = 0;
+  for (int i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : (crc << 1);
+    }
+  }
+  return crc;
+}
+
+// 发送一个回复帧
+void sendFrame(uint8_t type, uint8_t seq, uint8_t status, bool withStatus) {
+  uint8_t frame[4] = {(uint8_t)(withStatus ? 1 : 0), seq, type, status};
+  int bodyLength = withStatus ? 4 : 3;
+  Serial.write(FRAME_SYNC);
+  Serial.write(frame, bodyLength);
+  Serial.write(crc8(frame, bodyLength));
+}
+
+// 切换到二进制协议（先把 "BIN OK" 发完再换波特率）
+void enterBinaryMode(long baudrate) {
+  Serial.flush();
+  Serial.end();
+  Serial.begin(baudrate);
+  binaryMode = true;
+  frameLength = 0;
+}
+
+// 回到文本协议
+void leaveBinaryMode() {
+  Serial.flush();
+  Serial.end();
+  Serial.begin(TEXT_BAUDRATE);
+  binaryMode = false;
+}
+
+// 处理一个完整的命令帧：先回ACK，执行完成后回DONE（带状态码）
+void handleFrame() {
+  int payloadLength = frameBuffer[1];
+  uint8_t seq = frameBuffer[2];
+  uint8_t type = frameBuffer[3];
+  uint8_t* payload = frameBuffer + 4;
+  
+  if (crc8(frameBuffer + 1, payloadLength + 3) != frameBuffer[payloadLength + 4]) {
+    sendFrame(FRAME_NAK, seq, STATUS_CRC, true);
+    return;
+  }
+  sendFrame(FRAME_ACK, seq, 0, false);
+  
+  if (type == FRAME_PING) {
+    sendFrame(FRAME_DONE, seq, STATUS_OK, true);
+    return;
+  }
+  if (type == FRAME_TEXT) {
+    sendFrame(FRAME_DONE, seq, STATUS_OK, true);
+    leaveBinaryMode();
+    return;
+  }
+  
+  // 还原为文本命令，复用 processSerialCommand 的处理逻辑
+  String command = "";
+  if (type == FRAME_GESTURE && payloadLength == 1 && payload[0] < GESTURE_NAME_COUNT) {
+    command = GESTURE_NAMES[payload[0]];
+  }
+  else if (type == FRAME_SERVO && payloadLength == 2) {
+    command = "SERVO:" + String(payload[0]) + ":" + String(payload[1]);
+  }
+  else if (type == FRAME_POSE && payloadLength == SERVO_COUNT) {
+    command = "POSE:";
+    for (int i = 0; i < SERVO_COUNT; i++) {
+      command += String(payload[i]);
+      if (i < SERVO_COUNT - 1) {
+        command += ",";
+      }
+    }
+  }
+  
+  if (command.length() == 0) {
+    sendFrame(FRAME_DONE, seq, STATUS_UNKNOWN, true);
+    return;
+  }
+  processSerialCommand(command);
+  sendFrame(FRAME_DONE, seq, lastCommandStatus, true);
+}
+
+// 二进制模式下逐字节接收，凑齐一帧就处理
+void readBinaryFrames() {
+  while (Serial.available()) {
+    uint8_t value = Serial.read();
+    if (frameLength == 0 && value != FRAME_SYNC) {
+      continue;
+    }
+    frameBuffer[frameLength++] = value;
+    if (frameLength >= 2) {
+      int payloadLength = frameBuffer[1];
+      if (payloadLength > FRAME_MAX_PAYLOAD) {
+        frameLength = 0;
+      }
+      else if (frameLength == payloadLength + 5) {
+        handleFrame();
+        frameLength = 0;
+      }
     }
-    Serial.println("]");
   }
 }
 
@@ -394,13 +671,19 @@ void setup() {
   Serial.println("- 数字手势: 0-9");
   Serial.println("- 剪刀石头布: ROCK, PAPER, SCISSORS");
   Serial.println("- 重置: RESET");
+  Serial.println("- 全部张开: OPENMAX");
+  Serial.println("- 全部握拳: CLOSEMAX");
   Serial.println("- 单个舵机: SERVO:index:angle");
+  Serial.println("- 姿态: POSE:a0,a1,a2,a3,a4,a5");
   Serial.println("⏳ 等待命令...");
 }
 
 // 主循环
 void loop() {
-  if (Serial.available()) {
+  if (binaryMode) {
+    readBinaryFrames();
+  }
+  else if (Serial.available()) {
     String command = Serial.readStringUntil('\n');
     processSerialCommand(command);
   }
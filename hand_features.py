@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手部几何特征
+原来的识别只看指尖的绝对Y坐标（0.45 / 0.6 / 0.95），手旋转、离摄像头远或在画面下方时就会判断错误。
+21个关节齐全时，改用与位置、大小和旋转无关的几何特征判断每根手指是否伸直：
+
+    坐标以手腕为原点，除以手掌长度（手腕到中指MCP的距离）
+    弯曲角度: 手指各关节处相邻骨节方向的夹角之和（拇指从MP开始），伸直约为0
+    伸展距离: 指尖到手掌中心（手腕和四个MCP的平均位置）的距离
+    拇指张开: 拇指指尖到小指MCP的距离，拇指收在手掌上时很小
+
+只有指尖（或手掌关节置信度太低）时仍然按指尖坐标判断。
+得到的伸直手指再交给原来的石头/剪刀/布判断逻辑，所有计算都是 (N, 21, 3) 数组上的NumPy运算
+"""
+
+import numpy as np
+
+from hand_landmarks import FINGERTIP_INDICES
+
+# 指尖坐标判断的阈值（与 classify_fingertips 相同）
+MIN_TIP_CONFIDENCE = 0.4
+THUMB_MAX_Y = 0.6
+THUMB_MIN_X = 0.3
+PINKY_MAX_Y = 0.95
+FINGER_MAX_Y = 0.45
+
+# 几何特征判断的阈值
+MIN_JOINT_CONFIDENCE = 0.3      # 手腕和指节的置信度都超过这个值才使用几何特征
+MIN_PALM_SCALE = 0.02           # 手掌长度小于画面的2%时关键点不可靠
+FINGER_MAX_CURL = 90.0          # 度
+FINGER_MIN_REACH = 0.8          # 手掌长度的倍数
+THUMB_MAX_CURL = 60.0
+THUMB_MIN_SPREAD = 1.2
+
+WRIST = 0
+MIDDLE_MCP = 9
+PINKY_MCP = 17
+PALM_INDICES = (0, 5, 9, 13, 17)
+# 每根手指从手腕到指尖的关节链
+FINGER_CHAINS = np.array([
+    (0, 1, 2, 3, 4),
+    (0, 5, 6, 7, 8),
+    (0, 9, 10, 11, 12),
+    (0, 13, 14, 15, 16),
+    (0, 17, 18, 19, 20),
+])
+# 除指尖外的关节
+PALM_JOINTS = np.setdiff1d(np.arange(21), FINGERTIP_INDICES)
+
+
+def hand_features(points):
+    """
+    计算几何特征，points: (N, 21, 3) 的 x, y, 置信度
+    返回 (弯曲角度 (N, 5), 伸展距离 (N, 5), 拇指张开 (N,), 手掌长度 (N,))
+    手掌长度太小的帧特征为NaN
+    """
+    xy = points[..., :2]
+    relative = xy - xy[:, WRIST:WRIST + 1]
+    scale = np.linalg.norm(relative[:, MIDDLE_MCP], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = relative / np.where(scale > MIN_PALM_SCALE, scale, np.nan)[:, None, None]
+
+        bones = np.diff(relative[:, FINGER_CHAINS], axis=2)             # (N, 5, 4, 2)
+        before, after = bones[:, :, :-1], bones[:, :, 1:]
+        lengths = np.linalg.norm(before, axis=-1) * np.linalg.norm(after, axis=-1)
+        cosines = (before * after).sum(axis=-1) / np.maximum(lengths, 1e-9)
+        bends = np.degrees(np.arccos(np.clip(cosines, -1.0, 1.0)))      # (N, 5, 3)
+    # 拇指CMC处的夹角是手掌的形状，不算弯曲
+    bends[:, 0, 0] = 0.0
+    curl = bends.sum(axis=-1)
+
+    palm_center = relative[:, PALM_INDICES].mean(axis=1)
+    tips = relative[:, FINGERTIP_INDICES]
+    reach = np.linalg.norm(tips - palm_center[:, None], axis=-1)
+    thumb_spread = np.linalg.norm(tips[:, 0] - relative[:, PINKY_MCP], axis=-1)
+    return curl, reach, thumb_spread, scale
+
+
+def skeleton_usable(points, present):
+    """21个关节都有、手掌关节置信度足够且手掌长度正常的帧，(N,) 布尔数组"""
+    confident = (points[:, PALM_JOINTS, 2] > MIN_JOINT_CONFIDENCE).all(axis=1)
+    scale = np.linalg.norm(points[:, MIDDLE_MCP, :2] - points[:, WRIST, :2], axis=-1)
+    return present.all(axis=1) & confident & (scale > MIN_PALM_SCALE)
+
+
+def extended_from_tips(points):
+    """原来的指尖坐标判断，(N, 5) 布尔数组（不含置信度）"""
+    tips = points[:, FINGERTIP_INDICES]
+    x, y = tips[..., 0], tips[..., 1]
+    extended = np.empty(x.shape, dtype=bool)
+    extended[:, 0] = (y[:, 0] < THUMB_MAX_Y) & (x[:, 0] > THUMB_MIN_X)
+    extended[:, 1:4] = y[:, 1:4] < FINGER_MAX_Y
+    extended[:, 4] = y[:, 4] < PINKY_MAX_Y
+    return extended
+
+
+def extended_from_features(points, features=None):
+    """几何特征判断，(N, 5) 布尔数组（不含置信度）；特征为NaN时为False"""
+    curl, reach, thumb_spread, _ = hand_features(points) if features is None else features
+    extended = np.empty(curl.shape, dtype=bool)
+    extended[:, 0] = (curl[:, 0] < THUMB_MAX_CURL) & (thumb_spread > THUMB_MIN_SPREAD)
+    extended[:, 1:] = (curl[:, 1:] < FINGER_MAX_CURL) & (reach[:, 1:] > FINGER_MIN_REACH)
+    return extended
+
+
+def fingers_extended(points, present):
+    """
+    每根手指是否伸直，返回 (伸直 (N, 5), 指尖齐全 (N,), 使用几何特征 (N,))
+    骨架完整的帧用几何特征，其余用指尖坐标；指尖置信度不超过0.4的手指都算弯曲
+    """
+    geometric = skeleton_usable(points, present)
+    extended = extended_from_tips(points)
+    if geometric.any():
+        extended[geometric] = extended_from_features(points[geometric])
+    extended &= points[:, FINGERTIP_INDICES, 2] > MIN_TIP_CONFIDENCE
+    complete = present[:, FINGERTIP_INDICES].all(axis=1)
+    return extended, complete, geometric
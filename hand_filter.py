@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+关键点平滑（One-Euro滤波）
+Vision的关键点每帧抖动几个百分点，指尖就会在伸直/弯曲的阈值附近来回跳。
+识别前按会话对21个关节的坐标做One-Euro滤波：手静止时截止频率低、抖动被滤掉，
+手快速移动时截止频率随速度升高、延迟很小
+
+    dx' = 低通(dx/dt, d_cutoff)
+    cutoff = min_cutoff + beta * |dx'|
+    x' = 低通(x, cutoff)            低通系数 alpha = 1 / (1 + 1 / (2π * cutoff * dt))
+
+所有会话的滤波状态放在预先分配的 (容量, 21, 2) 数组中，每个会话占一个槽位，
+会话被清理时槽位归还；本帧没有检测到的关节不更新状态，输出原始值
+"""
+
+import math
+
+import numpy as np
+
+from hand_landmarks import JOINT_COUNT, DenseHand
+
+MIN_CUTOFF = 1.0        # Hz，手静止时的截止频率
+BETA = 10.0             # 截止频率随速度（画面宽度/秒）升高的比例
+D_CUTOFF = 1.0          # Hz，速度估计的截止频率
+MIN_DT = 1.0 / 240
+# 两帧间隔超过这个时间（手离开画面、客户端暂停）时从头开始滤波
+MAX_GAP = 0.5
+
+
+def smoothing_alpha(cutoff, dt):
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+
+class LandmarkFilterBank:
+    """预先分配的One-Euro滤波状态，acquire/release 分配槽位，不是线程安全的（由 HandSessions 加锁）"""
+
+    def __init__(self, capacity, min_cutoff=MIN_CUTOFF, beta=BETA, d_cutoff=D_CUTOFF):
+        self.capacity = capacity
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.values = np.zeros((capacity, JOINT_COUNT, 2))
+        self.speeds = np.zeros((capacity, JOINT_COUNT, 2))
+        self.initialized = np.zeros((capacity, JOINT_COUNT), dtype=bool)
+        self.timestamps = np.zeros(capacity)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    @property
+    def in_use(self):
+        return self.capacity - len(self._free)
+
+    def acquire(self):
+        slot = self._free.pop()
+        self.reset(slot)
+        return slot
+
+    def release(self, slot):
+        self._free.append(slot)
+
+    def reset(self, slot):
+        self.initialized[slot] = False
+
+    def filter(self, slot, points, mask, now):
+        """
+        滤波一帧，points: (21, 2) 坐标；mask: (21,) 本帧检测到的关节
+        返回滤波后的 (21, 2) 数组
+        """
+        dt = now - self.timestamps[slot]
+        if dt > MAX_GAP:
+            self.initialized[slot] = False
+        dt = max(dt, MIN_DT)
+        self.timestamps[slot] = now
+
+        values = self.values[slot]
+        speeds = self.speeds[slot]
+        initialized = self.initialized[slot]
+        update = mask & initialized
+        start = mask & ~initialized
+
+        speed = (points - values) / dt
+        speeds[update] += smoothing_alpha(self.d_cutoff, dt) * (speed[update] - speeds[update])
+        cutoff = self.min_cutoff + self.beta * np.abs(speeds[update])
+        values[update] += smoothing_alpha(cutoff, dt) * (points[update] - values[update])
+
+        values[start] = points[start]
+        speeds[start] = 0.0
+        initialized |= mask
+
+        return np.where(mask[:, None], values, points)
+
+    def smooth_hand(self, slot, hand, now):
+        """滤波 DenseHand 的坐标，置信度和关节是否存在不变"""
+        points = np.array([hand.xs, hand.ys], dtype=float).T
+        filtered = self.filter(slot, points, np.array(hand.present, dtype=bool), now)
+        return DenseHand(filtered[:, 0].tolist(), filtered[:, 1].tolist(), hand.confs, hand.present,
+                         hand.unknown_keys)
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "min_cutoff": self.min_cutoff,
+            "beta": self.beta
+        }
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手部关键点格式
+iOS端默认把Vision的关节名作为JSON键发送（每个键约60字节，21个关节重复21次）；
+紧凑格式按固定的关节顺序发送数组，请求体约为原来的1/5，服务器也不需要匹配键名
+
+两种格式都先转换为 DenseHand：按 JOINT_NAMES 顺序排列的21个关节数组，
+键名通过预先生成的 JOINT_INDEX 一次字典查找得到关节索引，不认识的键只计数
+
+紧凑格式 (Content-Type: application/vnd.hand.v1+json):
+    {"x": [21个x], "y": [21个y], "conf": [21个置信度]}
+    或 {"f32": base64(63个小端float32: 21个x, 21个y, 21个置信度)}
+    置信度为0表示该关节未检测到
+"""
+
+import base64
+import struct
+
+# 关节的固定顺序（Vision的原始关节名），UDP数据报和紧凑格式都使用这个顺序
+JOINT_NAMES = (
+    'VNHLKWRI',
+    'VNHLKTCMC', 'VNHLKTMP', 'VNHLKTIP', 'VNHLKTTIP',
+    'VNHLKIMCP', 'VNHLKIPIP', 'VNHLKIDIP', 'VNHLKITIP',
+    'VNHLKMMCP', 'VNHLKMPIP', 'VNHLKMDIP', 'VNHLKMTIP',
+    'VNHLKRMCP', 'VNHLKRPIP', 'VNHLKRDIP', 'VNHLKRTIP',
+    'VNHLKPMCP', 'VNHLKPPIP', 'VNHLKPDIP', 'VNHLKPTIP',
+)
+JOINT_COUNT = len(JOINT_NAMES)
+# 与iOS端 String(describing: jointName) 得到的键相同
+JOINT_KEYS = tuple(f"VNHumanHandPoseObservationJointName(_rawValue: {name})" for name in JOINT_NAMES)
+# Vision的Swift短名称，与 JOINT_NAMES 顺序相同
+JOINT_SHORT_NAMES = (
+    'wrist',
+    'thumbCMC', 'thumbMP', 'thumbIP', 'thumbTip',
+    'indexMCP', 'indexPIP', 'indexDIP', 'indexTip',
+    'middleMCP', 'middlePIP', 'middleDIP', 'middleTip',
+    'ringMCP', 'ringPIP', 'ringDIP', 'ringTip',
+    'littleMCP', 'littlePIP', 'littleDIP', 'littleTip',
+)
+
+
+def _build_joint_index():
+    index = {}
+    for i, (name, key, short_name) in enumerate(zip(JOINT_NAMES, JOINT_KEYS, JOINT_SHORT_NAMES)):
+        index[name] = i
+        index[key] = i
+        index[short_name] = i
+        if short_name.startswith('little'):
+            # 旧版客户端用pinky称呼小指
+            index['pinky' + short_name[len('little'):]] = i
+    return index
+
+
+# 键名 -> 关节索引
+JOINT_INDEX = _build_joint_index()
+
+# 拇指、食指、中指、无名指、小指指尖的索引
+FINGERTIP_INDICES = (4, 8, 12, 16, 20)
+
+COMPACT_CONTENT_TYPE = 'application/vnd.hand.v1+json'
+COMPACT_F32 = struct.Struct(f'<{JOINT_COUNT * 3}f')
+
+
+class DenseHand:
+    """
+    一帧手部关键点，按 JOINT_NAMES 顺序排列
+    present 标记请求中是否有该关节，unknown_keys 为不认识的键的数量
+    """
+
+    __slots__ = ('xs', 'ys', 'confs', 'present', 'unknown_keys')
+
+    def __init__(self, xs, ys, confs, present, unknown_keys=0):
+        self.xs = xs
+        self.ys = ys
+        self.confs = confs
+        self.present = present
+        self.unknown_keys = unknown_keys
+
+    def fingertips(self):
+        """取出五个指尖，缺失的指尖为None"""
+        return [
+            {"x": self.xs[i], "y": self.ys[i], "confidence": self.confs[i]} if self.present[i] else None
+            for i in FINGERTIP_INDICES
+        ]
+
+
+def normalize_hand(hand_data):
+    """
+    把以关节名为键的字典（Vision原始名、完整键或短名称）转换为 DenseHand
+    缺少x/y时按0.5、缺少置信度时按0处理，与原来逐个取值的默认值相同
+    """
+    xs = [0.5] * JOINT_COUNT
+    ys = [0.5] * JOINT_COUNT
+    confs = [0.0] * JOINT_COUNT
+    present = [False] * JOINT_COUNT
+    unknown_keys = 0
+    joint_index = JOINT_INDEX
+    for key, point in hand_data.items():
+        index = joint_index.get(key)
+        if index is None:
+            unknown_keys += 1
+            continue
+        if point:
+            xs[index] = point.get('x', 0.5)
+            ys[index] = point.get('y', 0.5)
+            confs[index] = point.get('confidence', 0)
+            present[index] = True
+    return DenseHand(xs, ys, confs, present, unknown_keys)
+
+
+def parse_compact_payload(payload):
+    """解析紧凑格式的请求体（已解析的JSON对象）为 DenseHand，格式错误时抛出ValueError"""
+    if not isinstance(payload, dict):
+        raise ValueError("紧凑格式必须是JSON对象")
+    if 'f32' in payload:
+        try:
+            values = COMPACT_F32.unpack(base64.b64decode(payload['f32'], validate=True))
+        except (TypeError, ValueError, struct.error) as e:
+            raise ValueError(f"f32数据错误: {e}")
+        xs = list(values[:JOINT_COUNT])
+        ys = list(values[JOINT_COUNT:JOINT_COUNT * 2])
+        confs = list(values[JOINT_COUNT * 2:])
+    else:
+        arrays = []
+        for field in ('x', 'y', 'conf'):
+            values = payload.get(field)
+            if not isinstance(values, list) or len(values) != JOINT_COUNT:
+                raise ValueError(f"{field} 必须是{JOINT_COUNT}个数字")
+            try:
+                arrays.append([float(value) for value in values])
+            except (TypeError, ValueError):
+                raise ValueError(f"{field} 必须是{JOINT_COUNT}个数字")
+        xs, ys, confs = arrays
+    return DenseHand(xs, ys, confs, [conf > 0 for conf in confs])
+
+
+def encode_compact_payload(hand_data, packed=False):
+    """把以关节名为键的字典转换为紧凑格式（测试和客户端使用）"""
+    hand = normalize_hand(hand_data)
+    xs = [float(x) if present else 0.0 for x, present in zip(hand.xs, hand.present)]
+    ys = [float(y) if present else 0.0 for y, present in zip(hand.ys, hand.present)]
+    confs = [float(conf) if present else 0.0 for conf, present in zip(hand.confs, hand.present)]
+    if packed:
+        return {"f32": base64.b64encode(COMPACT_F32.pack(*xs, *ys, *confs)).decode('ascii')}
+    return {"x": xs, "y": ys, "conf": confs}
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提前预测手势
+等人完全做出剪刀或布、再花约1.5秒转动舵机，机械手的反应明显偏晚。
+按会话记录最近几帧每根手指的伸展程度（由 hand_features 的伸展距离得到，0弯曲-1伸直），
+用最小二乘估计变化速度，外推 horizon 秒后的手型，再与石头/剪刀/布的模板比较得到各手势的概率；
+最大概率超过 min_probability 时给出提前预测
+
+    horizon 越大、min_probability 越小，预测越早，但猜错的次数越多（用 predict_replay.py 在录制序列上测量）
+"""
+
+import numpy as np
+
+from hand_features import hand_features, skeleton_usable
+
+PREDICTION_HISTORY = 6          # 用于估计速度的帧数
+MIN_SAMPLES = 3
+PREDICTION_HORIZON = 0.2        # 秒
+MIN_PROBABILITY = 0.9
+MAX_GAP = 0.5                   # 两帧间隔超过这个时间时重新开始记录
+
+# 伸展程度的换算：伸展距离0.3-1.1倍手掌长度，拇指张开0.4-1.4倍手掌长度
+# （弯曲角度在画面投影里会在折叠时从180度跳到0度，不适合估计速度，这里只用距离）
+CURLED_REACH, EXTENDED_REACH = 0.3, 1.1
+CURLED_SPREAD, EXTENDED_SPREAD = 0.4, 1.4
+
+# 各手势的手型模板（拇指、食指、中指、无名指、小指的伸展程度），拇指的权重较低
+PREDICTED_GESTURES = ("石头", "剪刀", "布")
+GESTURE_TEMPLATES = np.array([
+    (0, 0, 0, 0, 0),
+    (0, 1, 1, 0, 0),
+    (1, 1, 1, 1, 1),
+], dtype=float)
+FINGER_WEIGHTS = np.array([0.5, 1, 1, 1, 1])
+TEMPLATE_SPREAD = 0.2
+
+
+def extension_scores(points):
+    """(N, 21, 3) 关节数组 -> (N, 5) 每根手指的伸展程度（0弯曲-1伸直）"""
+    _, reach, thumb_spread, _ = hand_features(points)
+    extension = np.clip((reach - CURLED_REACH) / (EXTENDED_REACH - CURLED_REACH), 0, 1)
+    extension[:, 0] = np.clip((thumb_spread - CURLED_SPREAD) / (EXTENDED_SPREAD - CURLED_SPREAD), 0, 1)
+    return extension
+
+
+def gesture_probabilities(extension):
+    """(N, 5) 伸展程度 -> (N, 3) 石头/剪刀/布的概率"""
+    distance = ((extension[:, None] - GESTURE_TEMPLATES) ** 2 * FINGER_WEIGHTS).sum(axis=-1) / FINGER_WEIGHTS.sum()
+    logits = -distance / (2 * TEMPLATE_SPREAD ** 2)
+    logits -= logits.max(axis=1, keepdims=True)
+    weights = np.exp(logits)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def hand_extension(hand):
+    """DenseHand -> (5,) 伸展程度；骨架不完整或不可靠时返回None"""
+    if not all(hand.present):
+        return None
+    points = np.array([[hand.xs, hand.ys, hand.confs]], dtype=float).transpose(0, 2, 1)
+    if not skeleton_usable(points, np.ones(points.shape[:2], dtype=bool))[0]:
+        return None
+    return extension_scores(points)[0]
+
+
+class GesturePredictor:
+    """一个会话的手指伸展轨迹，保存在预先分配的环形数组中"""
+
+    def __init__(self, history=PREDICTION_HISTORY, horizon=PREDICTION_HORIZON, min_probability=MIN_PROBABILITY):
+        self.horizon = horizon
+        self.min_probability = min_probability
+        self.extensions = np.zeros((history, 5))
+        self.times = np.zeros(history)
+        self.count = 0
+        self._next = 0
+
+    def observe(self, extension, now):
+        if self.count and now - self.times[self._next - 1] > MAX_GAP:
+            self.reset()
+        self.extensions[self._next] = extension
+        self.times[self._next] = now
+        self._next = (self._next + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    def reset(self):
+        self.count = 0
+        self._next = 0
+
+    def predict(self, now=None):
+        """返回 (预测的手势或None, 概率)；now 距最后一帧超过 MAX_GAP 时轨迹已经过时（手离开了画面），不预测"""
+        if self.count < MIN_SAMPLES:
+            return None, 0.0
+        if now is not None and now - self.times[self._next - 1] > MAX_GAP:
+            return None, 0.0
+        order = (np.arange(self.count) + self._next - self.count) % len(self.times)
+        times = self.times[order]
+        extensions = self.extensions[order]
+        elapsed = times - times.mean()
+        spread = (elapsed ** 2).sum()
+        if spread > 0:
+            slope = (elapsed[:, None] * (extensions - extensions.mean(axis=0))).sum(axis=0) / spread
+        else:
+            slope = np.zeros(5)
+        predicted = np.clip(extensions[-1] + slope * self.horizon, 0, 1)
+        probabilities = gesture_probabilities(predicted[None])[0]
+        best = int(probabilities.argmax())
+        if probabilities[best] >= self.min_probability:
+            return PREDICTED_GESTURES[best], float(probabilities[best])
+        return None, float(probabilities[best])
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+机械手二进制串口协议
+文本协议每条手势要来回传输上百字节（带emoji的调试输出），9600波特率下超过100ms；
+二进制模式下每条命令只有几个字节，并且固件只回复简短的ACK/DONE帧
+
+帧格式:
+    0xA5 | LEN | SEQ | TYPE | PAYLOAD (LEN字节) | CRC8
+    CRC8 多项式0x07，初值0，覆盖 LEN 到 PAYLOAD 末尾
+
+协商流程（文本模式下进行，老版本固件回复"未知命令"时保持文本协议）:
+    主机: CAPS?          固件: CAPS:POSE,BIN1,BAUD=57600
+    主机: BIN:57600      固件: BIN OK 57600 （之后切换到二进制模式和新的波特率）
+"""
+
+FRAME_SYNC = 0xA5
+FRAME_OVERHEAD = 5          # SYNC + LEN + SEQ + TYPE + CRC
+FRAME_MAX_PAYLOAD = 16
+
+# 主机 -> 固件
+FRAME_GESTURE = 0x01        # payload: [手势编号]
+FRAME_SERVO = 0x02          # payload: [舵机编号, 角度]
+FRAME_POSE = 0x03           # payload: [6个角度]
+FRAME_PING = 0x04           # payload: 空
+FRAME_TEXT = 0x05           # 回到文本协议（9600波特率）
+
+# 固件 -> 主机
+FRAME_ACK = 0x81            # 已收到命令
+FRAME_DONE = 0x82           # 命令执行结束，payload: [状态]
+FRAME_NAK = 0x83            # 帧校验失败，payload: [状态]
+
+# DONE / NAK 的状态码
+STATUS_OK = 0
+STATUS_UNKNOWN = 1
+STATUS_INVALID = 2
+STATUS_TIMEOUT = 3          # 舵机移动超时（动作仍然结束了）
+STATUS_CRC = 4
+
+STATUS_NAMES = {
+    STATUS_OK: '完成',
+    STATUS_UNKNOWN: '未知命令',
+    STATUS_INVALID: '无效命令',
+    STATUS_TIMEOUT: '舵机移动超时',
+    STATUS_CRC: '校验失败',
+}
+
+# 手势编号，与固件中的 GESTURE_NAMES 顺序一致
+GESTURE_CODES = {
+    '0': 0, '1': 1, '2': 2, '3': 3, '4': 4,
+    '5': 5, '6': 6, '7': 7, '8': 8, '9': 9,
+    'ROCK': 10, 'PAPER': 11, 'SCISSORS': 12,
+    'RESET': 13, 'OPENMAX': 14, 'CLOSEMAX': 15,
+}
+GESTURE_NAMES = {code: name for name, code in GESTURE_CODES.items()}
+
+SERVO_COUNT = 6
+
+
+def crc8(data):
+    """CRC-8（多项式0x07），固件中的 crc8() 使用同样的算法"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+class Frame:
+    """一个二进制帧"""
+
+    def __init__(self, frame_type, seq, payload=b''):
+        self.type = frame_type
+        self.seq = seq
+        self.payload = bytes(payload)
+
+    @property
+    def status(self):
+        """DONE/NAK帧的状态码"""
+        return self.payload[0] if self.payload else STATUS_OK
+
+    def __eq__(self, other):
+        return (isinstance(other, Frame) and self.type == other.type
+                and self.seq == other.seq and self.payload == other.payload)
+
+    def __repr__(self):
+        return f"Frame(type=0x{self.type:02X}, seq={self.seq}, payload={self.payload.hex()})"
+
+
+def encode_frame(frame_type, seq, payload=b''):
+    """编码一个帧"""
+    payload = bytes(payload)
+    if len(payload) > FRAME_MAX_PAYLOAD:
+        raise ValueError(f"帧数据过长: {len(payload)}")
+    body = bytes([len(payload), seq & 0xFF, frame_type]) + payload
+    return bytes([FRAME_SYNC]) + body + bytes([crc8(body)])
+
+
+class FrameDecoder:
+    """
+    增量帧解码器
+    串口数据可能在帧中间被切断；遇到校验失败时丢弃同步字节重新寻找帧头
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.crc_errors = 0
+
+    def feed(self, data):
+        """输入一段原始字节，返回已经完整解析出的帧列表"""
+        self._buffer.extend(data)
+        frames = []
+        while True:
+            start = self._buffer.find(FRAME_SYNC)
+            if start < 0:
+                self._buffer.clear()
+                break
+            if start:
+                del self._buffer[:start]
+            if len(self._buffer) < 2:
+                break
+            length = self._buffer[1]
+            if length > FRAME_MAX_PAYLOAD:
+                del self._buffer[0]
+                continue
+            total = length + FRAME_OVERHEAD
+            if len(self._buffer) < total:
+                break
+            body = bytes(self._buffer[1:total - 1])
+            if crc8(body) != self._buffer[total - 1]:
+                self.crc_errors += 1
+                del self._buffer[0]
+                continue
+            frames.append(Frame(body[2], body[1], body[3:]))
+            del self._buffer[:total]
+        return frames
+
+    def reset(self):
+        self._buffer.clear()
+
+
+def encode_command(command, seq):
+    """
+    把文本命令编码为二进制帧
+    支持手势/RESET等、SERVO:i:a、POSE:a0,...,a5 和 PING，其他命令抛出ValueError
+    """
+    if command in GESTURE_CODES:
+        return encode_frame(FRAME_GESTURE, seq, [GESTURE_CODES[command]])
+    if command == 'PING':
+        return encode_frame(FRAME_PING, seq)
+    if command.startswith('SERVO:'):
+        parts = command.split(':')
+        if len(parts) == 3:
+            try:
+                index, angle = int(parts[1]), int(parts[2])
+            except ValueError:
+                index = angle = -1
+            if 0 <= index < SERVO_COUNT and 0 <= angle <= 180:
+                return encode_frame(FRAME_SERVO, seq, [index, angle])
+    if command.startswith('POSE:'):
+        try:
+            angles = [int(field) for field in command[5:].split(',')]
+        except ValueError:
+            angles = []
+        if len(angles) == SERVO_COUNT and all(0 <= angle <= 180 for angle in angles):
+            return encode_frame(FRAME_POSE, seq, angles)
+    raise ValueError(f"二进制协议不支持该命令: {command}")
+
+
+def decode_command(frame):
+    """把主机发来的命令帧还原为文本命令（固件/模拟器使用），无法识别时返回None"""
+    if frame.type == FRAME_GESTURE and len(frame.payload) == 1:
+        return GESTURE_NAMES.get(frame.payload[0])
+    if frame.type == FRAME_SERVO and len(frame.payload) == 2:
+        return f"SERVO:{frame.payload[0]}:{frame.payload[1]}"
+    if frame.type == FRAME_POSE and len(frame.payload) == SERVO_COUNT:
+        return "POSE:" + ",".join(str(angle) for angle in frame.payload)
+    if frame.type == FRAME_PING and not frame.payload:
+        return 'PING'
+    return None
+
+
+def parse_capabilities(text):
+    """
+    解析能力声明 "POSE,BIN1,BAUD=57600"
+    返回 (能力集合, 参数字典)
+    """
+    capabilities = set()
+    params = {}
+    for token in text.replace(' ', '').split(','):
+        if not token:
+            continue
+        if '=' in token:
+            key, value = token.split('=', 1)
+            params[key] = value
+        else:
+            capabilities.add(token)
+    return capabilities, params
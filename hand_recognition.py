@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手势识别
+把手部关键点（关节名字典、紧凑格式或 DenseHand）识别为手势，不依赖Flask和串口，
+同步网关、asyncio网关和回放工具共用
+"""
+
+import numpy as np
+from hand_landmarks import FINGERTIP_INDICES, normalize_hand, parse_compact_payload
+from hand_features import MIN_TIP_CONFIDENCE, hand_features, extended_from_features, skeleton_usable
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def analyze_hand_pose(hand_data, smooth=None):
+    """
+    基于手部关键点数据识别手势 - 优化版本
+    smooth: 识别前对关键点（DenseHand）做平滑的函数，见 HandSessions.smooth
+    返回: (手势, 置信度)
+    """
+    try:
+        logger.info(f"收到手部数据: {hand_data}")
+        
+        # 从iOS发送的数据中提取关键点
+        # iOS使用Vision框架的VNHumanHandPoseObservationJointName，关节名通过预先生成的索引一次查找
+        hand = normalize_hand(hand_data)
+        if hand.unknown_keys:
+            logger.debug(f"忽略 {hand.unknown_keys} 个未知的关键点")
+        if smooth is not None:
+            hand = smooth(hand)
+    except Exception as e:
+        logger.error(f"手势分析失败: {e}")
+        return "未知", 0.0
+    return classify_hand(hand)
+
+
+def analyze_compact_hand(payload, smooth=None):
+    """
+    识别紧凑格式（hand_landmarks.COMPACT_CONTENT_TYPE）的手部关键点，按固定索引取关节，不需要匹配键名
+    格式错误时抛出ValueError
+    返回: (手势, 置信度)
+    """
+    hand = parse_compact_payload(payload)
+    if smooth is not None:
+        hand = smooth(hand)
+    return classify_hand(hand)
+
+
+def analyze_dense_hand(hand, smooth=None):
+    """
+    识别已经按关节顺序排列的 DenseHand（UDP数据报还原的关节，见 hand_udp.dequantize_dense）
+    返回: (手势, 置信度)
+    """
+    if smooth is not None:
+        hand = smooth(hand)
+    return classify_hand(hand)
+
+
+def classify_hand(hand):
+    """
+    识别一帧 DenseHand：21个关节齐全且可靠时按几何特征（见 hand_features.py），
+    否则按指尖坐标
+    返回: (手势, 置信度)
+    """
+    if all(hand.present):
+        try:
+            points = np.array([[hand.xs, hand.ys, hand.confs]], dtype=float).transpose(0, 2, 1)
+        except (TypeError, ValueError) as e:
+            logger.error(f"手势分析失败: {e}")
+            return "未知", 0.0
+        if skeleton_usable(points, np.ones(points.shape[:2], dtype=bool))[0]:
+            return classify_skeleton(points)
+    return classify_fingertips(hand.fingertips())
+
+
+def classify_skeleton(points):
+    """
+    根据 (1, 21, 3) 的完整关节数组判断手势，每根手指按弯曲角度和伸展距离判断是否伸直
+    返回: (手势, 置信度)
+    """
+    features = hand_features(points)
+    curl, reach, thumb_spread, _ = features
+    extended = extended_from_features(points, features)[0]
+    extended &= points[0, FINGERTIP_INDICES, 2] > MIN_TIP_CONFIDENCE
+    for i, tip in enumerate(FINGERTIP_INDICES):
+        logger.debug(f"手指{i}: 弯曲={curl[0, i]:.0f}°, 伸展={reach[0, i]:.2f}, "
+                    f"置信度={points[0, tip, 2]}, {'伸直' if extended[i] else '弯曲'}")
+    logger.debug(f"拇指张开: {thumb_spread[0]:.2f}")
+    return classify_extended(extended.tolist())
+
+
+def classify_fingertips(tips):
+    """
+    根据五个指尖（拇指、食指、中指、无名指、小指，未检测到为None）判断手势
+    返回: (手势, 置信度)
+    """
+    try:
+        # 检查关键点是否存在
+        if not all(tips):
+            logger.warning("关键点数据不完整")
+            return "等待识别...", 0.0
+        
+        # 优化后的手指伸直判断
+        fingers_info = []
+        
+        # 检查每个手指是否伸直（更精确的判断）
+        for i, finger_tip in enumerate(tips):
+            confidence = finger_tip.get('confidence', 0)
+            y_pos = finger_tip.get('y', 0.5)
+            x_pos = finger_tip.get('x', 0.5)
+            
+            logger.info(f"手指{i}: Y={y_pos}, X={x_pos}, 置信度={confidence}")
+            
+            if confidence > 0.4:  # 提高置信度阈值，确保数据质量
+                # 优化判断逻辑：考虑手指的相对位置和Y坐标
+                is_extended = False
+                
+                if i == 0:  # 拇指 - 特殊处理
+                    # 拇指的判断更复杂，需要结合X和Y坐标
+                    is_extended = y_pos < 0.6 and x_pos > 0.3
+                elif i == 4:  # 小拇指 - 特殊处理
+                    # 小拇指通常比其他手指短，需要更宽松的阈值
+                    is_extended = y_pos < 0.95  # 大幅放宽阈值，让小拇指初始状态为180度伸直
+                else:  # 其他手指（食指、中指、无名指）
+                    # 其他手指主要看Y坐标，但阈值更精确
+                    is_extended = y_pos < 0.45  # 降低阈值，更严格
+                
+                fingers_info.append({
+                    'extended': is_extended,
+                    'confidence': confidence,
+                    'y_pos': y_pos,
+                    'x_pos': x_pos
+                })
+                logger.info(f"手指{i} {'伸直' if is_extended else '弯曲'}")
+            else:
+                fingers_info.append({
+                    'extended': False,
+                    'confidence': confidence,
+                    'y_pos': y_pos,
+                    'x_pos': x_pos
+                })
+                logger.info(f"手指{i} 置信度太低")
+        
+        return classify_extended([finger['extended'] for finger in fingers_info])
+            
+    except Exception as e:
+        logger.error(f"手势分析失败: {e}")
+        return "未知", 0.0
+
+
+def classify_extended(extended):
+    """
+    根据五根手指是否伸直（拇指、食指、中指、无名指、小指）判断石头/剪刀/布
+    返回: (手势, 置信度)
+    """
+    extended_count = sum(1 for finger in extended if finger)
+    extended_fingers = [i for i, finger in enumerate(extended) if finger]
+    
+    logger.debug(f"伸直的手指数量: {extended_count}")
+    logger.debug(f"伸直的手指索引: {extended_fingers}")
+    logger.debug(f"手指状态: {list(extended)}")
+    
+    # 优化后的手势识别逻辑
+    if extended_count == 0:
+        # 所有手指都弯曲 - 石头
+        logger.info("识别为: 石头")
+        return "石头", 0.9
+    elif extended_count == 2:
+        # 两个手指伸直 - 剪刀
+        # 检查是否是食指和中指（典型的剪刀手势）
+        if 1 in extended_fingers and 2 in extended_fingers:
+            logger.info("识别为: 剪刀 (食指+中指)")
+            return "剪刀", 0.95
+        elif 0 in extended_fingers and 1 in extended_fingers:
+            logger.info("识别为: 剪刀 (拇指+食指)")
+            return "剪刀", 0.9
+        else:
+            logger.info("识别为: 剪刀 (其他两个手指)")
+            return "剪刀", 0.85
+    elif extended_count == 1:
+        # 只有一个手指伸直 - 可能是剪刀的开始或石头的变化
+        if 1 in extended_fingers:  # 只有食指伸直
+            logger.info("识别为: 剪刀 (只有食指)")
+            return "剪刀", 0.7
+        else:
+            logger.info("识别为: 石头 (变化中)")
+            return "石头", 0.6
+    elif extended_count >= 3:
+        # 三个或更多手指伸直 - 布
+        logger.info("识别为: 布")
+        return "布", 0.9
+    else:
+        logger.info(f"无法识别手势，伸直手指数: {extended_count}")
+        return "未知", 0.3
@@ -0,0 +1,1600 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Arduino机械手串口控制
+固件输出解析、命令姿态、舵机状态镜像、命令队列、熔断、ArduinoController 和端口自动发现；
+同步网关（gateway_server.py）和asyncio网关（gateway_async.py）共用，导入时没有副作用
+"""
+
+import os
+import re
+import serial
+import json
+import time
+import codecs
+import queue
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from serial.tools import list_ports
+from hand_protocol import (
+    FrameDecoder, encode_frame, encode_command, parse_capabilities,
+    FRAME_ACK, FRAME_DONE, FRAME_NAK, FRAME_PING, FRAME_TEXT,
+    STATUS_OK, STATUS_UNKNOWN, STATUS_TIMEOUT, STATUS_NAMES
+)
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 固件输出行 -> 事件类型（按顺序匹配，先匹配先得）
+SERIAL_EVENT_PATTERNS = [
+    ('received', '收到命令'),
+    ('executing', '执行舵机移动'),
+    ('timeout', '舵机移动超时'),
+    ('completed', '舵机移动完成'),
+    ('completed', '机械手已全部'),  # 第一版固件 OPENMAX/CLOSEMAX 的完成提示
+    ('unknown_command', '未知命令'),
+    ('servo_disconnected', '未连接'),
+    ('servo_disconnected', '连接失败'),
+    ('invalid', '无效'),
+    ('boot', '控制器启动'),
+    ('ready', '等待命令'),
+    ('caps', 'CAPS:'),           # 能力协商回复，老版本固件没有
+    ('binary_ok', 'BIN OK'),     # 固件即将切换到二进制协议
+]
+
+# 表示一条命令处理结束的事件
+TERMINAL_EVENTS = ('completed', 'unknown_command', 'invalid')
+
+# 带序号命令的回复 "ACK #12" / "DONE #12 0"，状态码与二进制协议相同
+SEQ_REPLY_PATTERN = re.compile(r'^(ACK|DONE) #(\d+)(?: (\d+))?$')
+
+# Arduino Nano 串口接收缓冲区大小，流水线发送时未被固件读走的字节不能超过它
+SERIAL_RX_BUFFER_SIZE = 64
+
+# 二进制协议 DONE 帧状态码 -> 事件类型
+FRAME_STATUS_EVENTS = {
+    STATUS_OK: 'completed',
+    STATUS_TIMEOUT: 'completed',
+    STATUS_UNKNOWN: 'unknown_command',
+}
+
+
+class SerialEvent:
+    """从固件输出中解析出的结构化事件"""
+
+    def __init__(self, kind, line, detail=None, timestamp=None, command_seq=None):
+        self.kind = kind
+        self.line = line
+        self.detail = detail
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        self.seq = 0
+        # 固件回显的命令序号，没有序号的回复为None
+        self.command_seq = command_seq
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "line": self.line,
+            "detail": self.detail,
+            "command_seq": self.command_seq,
+            "timestamp": self.timestamp
+        }
+
+
+def parse_serial_line(line):
+    """把固件输出的一行文本解析为SerialEvent，无法识别时类型为other"""
+    match = SEQ_REPLY_PATTERN.match(line)
+    if match:
+        command_seq = int(match.group(2))
+        if match.group(1) == 'ACK':
+            return SerialEvent('received', line, command_seq=command_seq)
+        status = int(match.group(3) or STATUS_OK)
+        kind = FRAME_STATUS_EVENTS.get(status, 'invalid')
+        return SerialEvent(kind, line, STATUS_NAMES.get(status), command_seq=command_seq)
+    for kind, marker in SERIAL_EVENT_PATTERNS:
+        if marker in line:
+            detail = None
+            if kind in ('received', 'unknown_command', 'caps') and ':' in line:
+                detail = line.split(':', 1)[1].strip()
+            return SerialEvent(kind, line, detail)
+    return SerialEvent('other', line)
+
+
+class SerialLineDecoder:
+    """
+    增量UTF-8行解码器
+    串口数据可能在多字节字符中间被切断，这里保留不完整的字节直到下一次读取
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ''
+
+    def feed(self, data):
+        """输入一段原始字节，返回已经完整的行列表"""
+        self._buffer += self._decoder.decode(data)
+        if '\n' not in self._buffer:
+            return []
+        *lines, self._buffer = self._buffer.split('\n')
+        return [line.strip() for line in lines if line.strip()]
+
+    def reset(self):
+        self._decoder.reset()
+        self._buffer = ''
+
+
+# 舵机配置，与固件 hand_control_nano_parallel_fixed_v3.ino 保持一致
+SERVO_COUNT = 6
+PINKY_INDEX = 0      # 小拇指 - 接口3
+RING_INDEX = 1       # 无名指 - 接口4
+MIDDLE_INDEX = 2     # 中指 - 接口5
+INDEX_INDEX = 3      # 食指 - 接口6
+THUMB_INDEX = 4      # 大拇指 - 接口7
+WRIST_INDEX = 5      # 手腕 - 接口8
+
+OPEN_ANGLE = 0       # 手指完全张开角度
+CLOSED_ANGLE = 180   # 手指完全收拢角度
+
+
+def make_pose(pinky, ring, middle, index, thumb, wrist=90):
+    """按手指张开(True)/收拢(False)生成六个舵机的目标角度"""
+    fingers = [pinky, ring, middle, index, thumb]
+    return tuple(OPEN_ANGLE if is_open else CLOSED_ANGLE for is_open in fingers) + (wrist,)
+
+
+# 命令 -> 目标姿态，对应固件中的 makeNumberGesture / makeRPSGesture / resetToOpen
+COMMAND_POSES = {
+    '0': make_pose(False, False, False, False, False),   # 握拳
+    '1': make_pose(False, False, False, True, False),    # 指向
+    '2': make_pose(False, False, True, True, False),     # 胜利
+    '3': make_pose(False, True, True, True, False),      # 三指
+    '4': make_pose(True, True, True, True, False),       # 四指
+    '5': make_pose(True, True, True, True, True),        # 张开
+    '6': make_pose(True, True, True, True, True),        # 六指
+    '7': make_pose(True, True, True, True, True, 60),    # 七指
+    '8': make_pose(True, True, True, True, True, 30),    # 八指
+    '9': make_pose(True, True, True, True, True, 0),     # 九指
+    'ROCK': make_pose(False, False, False, False, False),
+    'PAPER': make_pose(True, True, True, True, True),
+    'SCISSORS': make_pose(False, False, True, True, False),
+    'RESET': make_pose(True, True, True, True, True),
+    'OPENMAX': make_pose(True, True, True, True, True),
+    'CLOSEMAX': make_pose(False, False, False, False, False),
+}
+
+# 固件启动后的初始姿态：手指张开，手腕90度
+BOOT_POSE = make_pose(True, True, True, True, True)
+
+# 会让机械手摆出完整手势的命令，手还在动时只保留最新的一条
+GESTURE_COMMANDS = {'0', '1', '2', '3', '4', '5', '6', '7', '8', '9', 'ROCK', 'PAPER', 'SCISSORS'}
+
+# 安全类命令：插队到所有排队命令之前，并清空排队中的普通命令
+EMERGENCY_COMMANDS = {'RESET', 'OPENMAX', 'CLOSEMAX'}
+
+
+def resolve_command_pose(command, base_pose):
+    """
+    计算命令执行后的目标姿态
+    base_pose 为执行前的目标角度，无法预测结果的命令返回None
+    """
+    if command in COMMAND_POSES:
+        return COMMAND_POSES[command]
+    
+    if command.startswith('POSE:'):
+        # 格式: POSE:a0,a1,a2,a3,a4,a5
+        fields = command[5:].split(',')
+        if len(fields) != SERVO_COUNT:
+            return None
+        try:
+            return tuple(max(0, min(180, int(field))) for field in fields)
+        except ValueError:
+            return None
+    
+    if command.startswith('SERVO:') and base_pose is not None:
+        # 格式: SERVO:index:angle
+        parts = command.split(':')
+        if len(parts) != 3:
+            return None
+        try:
+            servo_index = int(parts[1])
+            angle = int(parts[2])
+        except ValueError:
+            return None
+        if not 0 <= servo_index < SERVO_COUNT:
+            return tuple(base_pose)
+        pose = list(base_pose)
+        pose[servo_index] = max(0, min(180, angle))
+        return tuple(pose)
+    
+    return None
+
+
+def make_pose_command(angles):
+    """生成多舵机姿态命令 POSE:a0,a1,a2,a3,a4,a5，角度不合法时抛出ValueError"""
+    angles = list(angles)
+    if len(angles) != SERVO_COUNT:
+        raise ValueError(f"姿态需要{SERVO_COUNT}个角度")
+    for angle in angles:
+        if isinstance(angle, bool) or not isinstance(angle, int) or not 0 <= angle <= 180:
+            raise ValueError(f"无效的角度: {angle}")
+    return "POSE:" + ",".join(str(angle) for angle in angles)
+
+
+def is_gesture_command(command):
+    """完整姿态类命令（手势或POSE），手还在动时只保留最新的一条"""
+    return command in GESTURE_COMMANDS or command.startswith('POSE:')
+
+
+def pose_to_commands(pose, base_pose=None):
+    """
+    生成把机械手带到pose的命令列表
+    优先使用同样效果的手势命令，否则用一条POSE命令一次到位
+    """
+    pose = tuple(pose)
+    for command, command_pose in COMMAND_POSES.items():
+        if command_pose == pose and (command in GESTURE_COMMANDS or command == 'RESET'):
+            return [command]
+    if base_pose is not None and tuple(base_pose) == pose:
+        return []
+    return [make_pose_command(pose)]
+
+
+class HandState:
+    """
+    主机端的舵机状态镜像，对应固件中的 currentAngle / targetAngle
+    current 为最近一次确认执行完成的姿态，target 为已接受的所有命令执行完之后的姿态
+    姿态未知（例如未复位的板子）时为None
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = None
+        self.target = None
+        self.updated_at = None
+
+    def reset(self, pose=BOOT_POSE):
+        """固件重启或刚连接时回到初始姿态"""
+        with self._lock:
+            self.current = tuple(pose) if pose is not None else None
+            self.target = self.current
+            self.updated_at = time.time()
+
+    def plan(self, command):
+        """
+        计算命令的目标姿态，返回 (目标姿态, 是否与当前姿态相同)
+        相同时命令可以跳过，前提是没有排队或正在执行的命令（由调用者判断）
+        """
+        with self._lock:
+            pose = resolve_command_pose(command, self.target)
+            unchanged = (pose is not None and self.current is not None
+                         and pose == self.target == self.current)
+            return pose, unchanged
+
+    def accept(self, pose):
+        """命令入队后更新目标姿态，无法预测结果的命令不改变目标"""
+        with self._lock:
+            if pose is not None:
+                self.target = pose
+
+    def complete(self, pose):
+        """命令确认执行完成后更新当前姿态"""
+        with self._lock:
+            if pose is not None:
+                self.current = pose
+            self.updated_at = time.time()
+
+    def invalidate(self):
+        """固件收到了命令但没有确认执行完成，舵机停在哪里未知"""
+        with self._lock:
+            self.current = None
+            self.updated_at = time.time()
+
+    def rollback(self):
+        """命令执行失败时目标姿态回退到当前姿态"""
+        with self._lock:
+            self.target = self.current
+
+    def to_dict(self):
+        with self._lock:
+            pose_name = None
+            for name, pose in COMMAND_POSES.items():
+                if pose == self.current and name in GESTURE_COMMANDS:
+                    pose_name = name
+                    break
+            return {
+                "current_angles": list(self.current) if self.current is not None else None,
+                "target_angles": list(self.target) if self.target is not None else None,
+                "pose": pose_name,
+                "known": self.current is not None,
+                "updated_at": self.updated_at
+            }
+
+
+
+class CommandQueue:
+    """
+    有界优先级命令队列，写线程是串口唯一的使用者
+    - 紧急通道：RESET / OPENMAX / CLOSEMAX 等安全命令，排在所有普通命令之前，入队时清空排队中的普通命令
+    - 普通通道：FIFO，同一个coalesce_key只保留最新入队的命令（latest-wins）
+    被替换的命令标记为coalesced，被紧急命令清掉的命令标记为preempted
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._emergency = deque()
+        self._normal = deque()
+        self._cond = threading.Condition()
+
+    def put(self, ticket, coalesce_key=None, emergency=False):
+        """
+        命令入队，返回因此被丢弃的旧命令列表（状态为coalesced或preempted）
+        队列已满时抛出queue.Full
+        """
+        with self._cond:
+            if emergency:
+                if len(self._emergency) >= self.maxsize:
+                    raise queue.Full
+                dropped = list(self._normal)
+                self._normal.clear()
+                ticket.priority = 'emergency'
+                self._emergency.append(ticket)
+            else:
+                dropped = []
+                if coalesce_key is not None:
+                    dropped = [item for item in self._normal if item.coalesce_key == coalesce_key]
+                    for old in dropped:
+                        self._normal.remove(old)
+                if len(self._emergency) + len(self._normal) >= self.maxsize:
+                    self._normal.extend(dropped)
+                    raise queue.Full
+                ticket.priority = 'normal'
+                self._normal.append(ticket)
+            ticket.coalesce_key = coalesce_key
+            self._cond.notify()
+        
+        for old in dropped:
+            old.superseded_by = ticket.ticket_id
+            old.finish('preempted' if emergency else 'coalesced')
+        return dropped
+
+    def get(self, timeout=None):
+        """取出下一条命令（紧急通道优先），超时抛出queue.Empty"""
+        with self._cond:
+            if not self._emergency and not self._normal:
+                self._cond.wait(timeout)
+            if self._emergency:
+                return self._emergency.popleft()
+            if self._normal:
+                return self._normal.popleft()
+            raise queue.Empty
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def clear(self):
+        """清空普通通道，返回被清掉的命令"""
+        with self._cond:
+            dropped = list(self._normal)
+            self._normal.clear()
+        return dropped
+
+    def pending(self, coalesce_key):
+        """返回某个key下尚未发送的命令"""
+        with self._cond:
+            for item in self._normal:
+                if item.coalesce_key == coalesce_key:
+                    return item
+        return None
+
+    def qsize(self):
+        with self._cond:
+            return len(self._emergency) + len(self._normal)
+
+
+class CircuitBreaker:
+    """
+    串口熔断器
+    连续失败 failure_threshold 次后熔断(open)，reset_timeout 秒内的命令直接失败；
+    之后进入半开(half_open)状态放行一条试探命令，成功则恢复(closed)，失败则重新熔断
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_timeout=5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.trip_count = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许发送命令"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.time()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_started_at = None
+            # 半开状态只放行一条试探命令；试探命令迟迟没有结果时允许再试一次
+            if self.trial_started_at is None or now - self.trial_started_at >= self.reset_timeout:
+                self.trial_started_at = now
+                return True
+            return False
+
+    def retry_after(self):
+        """距离下一次可以尝试还有多少秒"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return max(0.0, self.reset_timeout - (time.time() - self.opened_at))
+            if self.state == self.HALF_OPEN and self.trial_started_at is not None:
+                return max(0.0, self.reset_timeout - (time.time() - self.trial_started_at))
+            return 0.0
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ 串口熔断器恢复")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trip_count += 1
+                    logger.error(f"⛔ 串口连续失败{self.consecutive_failures}次，熔断{self.reset_timeout}秒")
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self.trial_started_at = None
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def to_dict(self):
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "trip_count": self.trip_count,
+                "retry_after": retry_after
+            }
+
+
+class CommandTicket:
+    """
+    串口命令票据
+    HTTP请求入队后立即返回ticket_id，客户端可以轮询或带超时等待执行结果
+    """
+
+    def __init__(self, ticket_id, command):
+        self.ticket_id = ticket_id
+        self.command = command
+        self.status = 'queued'  # queued -> sending -> sent -> completed / failed
+        self.error = None
+        self.response = None
+        self.acknowledged = False  # 固件是否回显了"收到命令"
+        self.retry_after = None  # 被熔断器拒绝时，建议多少秒后重试
+        self.coalesce_key = None
+        self.priority = 'normal'
+        self.preempted = []  # 本命令（紧急命令）入队时清掉的排队命令ID
+        self.target_pose = None  # 命令执行后的预期姿态
+        self.superseded_by = None  # 被哪条更新的命令合并掉
+        self.coalesced = []  # 本命令入队时合并掉的旧命令ID
+        self.seq = None  # 发送时分配的命令序号，固件在ACK/DONE中回显
+        self.wire_size = 0  # 已写入串口但固件还没读走的字节数
+        self.created_at = time.time()
+        self.sent_at = None
+        self.acked_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self.future = Future()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def finish(self, status, error=None):
+        """标记命令结束并唤醒所有等待者"""
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+        if not self.future.done():
+            self.future.set_result(self)
+
+    @property
+    def service_time(self):
+        """固件从读到命令到执行结束的时间（需要固件回显序号）"""
+        if self.acked_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.acked_at
+
+    def wait(self, timeout=None):
+        """等待命令结束，超时返回False"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "ticket_id": self.ticket_id,
+            "command": self.command,
+            "status": self.status,
+            "priority": self.priority,
+            "error": self.error,
+            "response": self.response,
+            "superseded_by": self.superseded_by,
+            "retry_after": self.retry_after,
+            "seq": self.seq,
+            "created_at": self.created_at,
+            "sent_at": self.sent_at,
+            "acked_at": self.acked_at,
+            "finished_at": self.finished_at,
+            "service_time": self.service_time
+        }
+
+
+class ArduinoController:
+    def __init__(self, port='/dev/ttyUSB0', baudrate=9600, queue_size=32, ticket_history=256,
+                 completion_timeout=3.0, event_history=200, ready_timeout=5.0, reset_on_connect=True,
+                 auto_reconnect=True, candidate_ports=None, failure_threshold=3, breaker_reset_timeout=5.0,
+                 binary_protocol=False, binary_baudrate=57600, pipeline_depth=1):
+        self.port = port
+        self.baudrate = baudrate
+        self.serial_connection = None
+        self.is_connected = False
+        # 等待固件输出"等待命令..."的最长时间
+        self.ready_timeout = ready_timeout
+        # 为False时打开串口不拉DTR，网关重启不会让板子复位
+        self.reset_on_connect = reset_on_connect
+        # 固件就绪前写线程不会发送命令，避免命令在启动过程中丢失
+        self._ready = threading.Event()
+
+        # 自动重连：监督线程发现串口异常或设备被拔出后按指数退避重连，并恢复之前的姿态
+        self.auto_reconnect = auto_reconnect
+        self.candidate_ports = candidate_ports
+        self.health_check_interval = 0.5
+        self.reconnect_initial_delay = 0.1
+        self.reconnect_max_delay = 5.0
+        self.degraded = False
+        self.last_error = None
+        self.reconnect_attempts = 0
+        self.reconnect_count = 0
+        self._resume_pose = None
+        self._supervising = False
+        self._supervisor_thread = None
+        self._supervisor_wakeup = threading.Event()
+        # 等待固件回复"舵机移动完成"的最长时间
+        self.completion_timeout = completion_timeout
+        # 固件执行完动作后是否输出完成提示；第一版固件（hand_control_nano_parallel.ino）只回显"收到命令"，
+        # 连接时按能力协商的结果判断，为False时收到回显就结束命令，不等到超时
+        self.reports_completion = True
+
+        # 有界命令队列，由专门的写线程消费，HTTP线程只负责入队
+        self.command_queue = CommandQueue(maxsize=queue_size)
+        # 正在执行的手势命令，手还在动时新手势只在队列里保留最新一条
+        self.current_ticket = None
+        # 舵机状态镜像，用于跳过重复命令
+        self.hand_state = HandState()
+        # 串口连续超时或出错时熔断，命令快速失败而不是堆积
+        self.circuit_breaker = CircuitBreaker(failure_threshold, breaker_reset_timeout)
+        self.ticket_history = ticket_history
+        self.tickets = OrderedDict()
+        self._ticket_lock = threading.Lock()
+        self._ticket_ids = itertools.count(1)
+        self._writer_thread = None
+        self._stop_event = threading.Event()
+        # 串口写锁：保证每条命令作为完整的一行写出，不会与其他写操作交错
+        self._write_lock = threading.Lock()
+
+        # 串口读线程持续解析固件输出，事件按序号保存在环形缓冲区中
+        self.events = deque(maxlen=event_history)
+        self._event_cond = threading.Condition()
+        self._event_seq = 0
+        self._event_listeners = []
+        self._decoder = SerialLineDecoder()
+        self._reader_thread = None
+
+        # 二进制协议：连接时通过 CAPS? 协商，固件支持BIN1才切换，否则继续使用文本协议
+        self.binary_protocol = binary_protocol
+        self.binary_baudrate = binary_baudrate
+        self.handshake_timeout = 1.0
+        self.protocol = 'text'
+        self.capabilities = set()
+        self._frame_decoder = FrameDecoder()
+
+        # 命令序号（0-255循环）：二进制协议和支持SEQ的固件会在ACK/DONE中回显
+        self._command_seqs = itertools.count(1)
+        self._seq_commands = {}
+        # 流水线：固件回显序号时最多同时有pipeline_depth条命令在途，前一个动作还没做完就发送下一条
+        self.pipeline_depth = pipeline_depth
+        self._in_flight = OrderedDict()
+        self._unacked_bytes = 0
+        self._last_progress = 0.0
+        self._pipeline_cond = threading.Condition()
+        
+    def connect(self, probe=None):
+        """
+        连接到Arduino，并等待固件就绪
+        probe 为端口探测(PortProbe)的结果时直接接管探测时打开的串口，不再重新打开
+        """
+        if self.is_connected:
+            self._close_link()
+        start = time.time()
+        try:
+            if probe is None:
+                probe = probe_port(
+                    self.port,
+                    self.baudrate,
+                    timeout=self.ready_timeout,
+                    reset=self.reset_on_connect,
+                    keep_open=True
+                )
+            if probe is None:
+                raise serial.SerialException(f"无法打开端口 {self.port}")
+            
+            self.port = probe.port
+            self.serial_connection = probe.serial_connection
+            self.protocol = 'text'
+            self.capabilities = set()
+            self.serial_connection.timeout = 0.5
+            # 串口卡死时写操作也不能无限阻塞
+            self.serial_connection.write_timeout = 1.0
+            if probe.identified_by == 'handshake':
+                # 板子没有复位，无法知道当前姿态
+                self.hand_state.reset(None)
+            else:
+                self.hand_state.reset()
+            
+            self._ready.clear()
+            self.circuit_breaker.reset()
+            self.is_connected = True
+            self._start_workers(probe)
+        except Exception as e:
+            logger.error(f"❌ 连接Arduino失败: {e}")
+            self.is_connected = False
+            return False
+        
+        if probe.identified_by == 'banner':
+            # 板子正在启动，等待setup()输出结束
+            remaining = self.ready_timeout - (time.time() - start)
+            if not self._ready.wait(max(remaining, 0)):
+                logger.warning("⚠️ 等待固件就绪超时，继续发送命令")
+        elif probe.identified_by is None:
+            logger.warning("⚠️ 未检测到固件启动信息或握手回复，继续发送命令")
+        self._negotiate_protocol()
+        self._ready.set()
+        self.degraded = False
+        self.last_error = None
+        if self.auto_reconnect:
+            self._start_supervisor()
+        
+        logger.info(f"✅ 成功连接到Arduino: {self.port} ({self.protocol}协议, 耗时 {time.time() - start:.1f}s)")
+        return True
+
+    def _negotiate_protocol(self):
+        """
+        能力协商：发送 CAPS? 查询固件支持的功能
+        v2固件（fixed/fixed_v2）把 CAPS? 当成数字手势，回复"无效的数字手势"，保持文本协议，动作结束有完成提示；
+        第一版固件没有回复，同时记录它不会输出完成提示；
+        固件支持BIN1且启用了binary_protocol时切换到二进制协议
+        协商期间持有写锁，写线程不会插入命令
+        """
+        with self._write_lock:
+            self.reports_completion = True
+            try:
+                reply = self._text_request("CAPS?", ('caps', 'invalid'))
+                if reply is None:
+                    # 第一版固件对不认识的文字命令没有任何输出，也不输出"舵机移动完成"
+                    logger.info("固件没有回复能力查询，按第一版固件处理：收到命令即结束")
+                    self.reports_completion = False
+                    return
+                if reply.kind == 'invalid':
+                    logger.info("固件不支持能力协商，使用文本协议")
+                    return
+                self.capabilities, params = parse_capabilities(reply.detail or '')
+                logger.info(f"🧩 固件能力: {sorted(self.capabilities)}")
+                if not self.binary_protocol or 'BIN1' not in self.capabilities:
+                    return
+
+                baudrate = min(self.binary_baudrate, int(params.get('BAUD', self.baudrate)))
+                reply = self._text_request(f"BIN:{baudrate}", ('binary_ok', 'invalid', 'unknown_command'))
+                if reply is None or reply.kind != 'binary_ok':
+                    logger.warning("⚠️ 固件拒绝切换二进制协议，使用文本协议")
+                    return
+                self._switch_protocol('binary', baudrate)
+                if self._frame_request(FRAME_PING):
+                    logger.info(f"⚡ 已切换到二进制协议 ({baudrate} 波特率)")
+                    return
+                # 二进制链路不通：尽量让固件回到文本协议
+                logger.warning("⚠️ 二进制协议确认失败，回退到文本协议")
+                self.serial_connection.write(encode_frame(FRAME_TEXT, self._next_command_seq('TEXT')))
+                self.serial_connection.flush()
+                self._switch_protocol('text', self.baudrate)
+            except Exception as e:
+                logger.warning(f"⚠️ 协议协商失败，使用文本协议: {e}")
+                self._switch_protocol('text', self.baudrate)
+
+    def _text_request(self, command, kinds):
+        """协商阶段：写一行文本命令并等待指定类型的回复"""
+        last_seq = self._event_seq
+        self.serial_connection.write(f"{command}\n".encode('utf-8'))
+        self.serial_connection.flush()
+        return self.wait_for_event(kinds, timeout=self.handshake_timeout, after_seq=last_seq)
+
+    def _frame_request(self, frame_type):
+        """协商阶段：写一个不带数据的控制帧并等待对应的DONE"""
+        last_seq = self._event_seq
+        command_seq = self._next_command_seq(hex(frame_type))
+        self.serial_connection.write(encode_frame(frame_type, command_seq))
+        self.serial_connection.flush()
+        return self.wait_for_event(
+            lambda event: event.kind == 'completed' and event.command_seq == command_seq,
+            timeout=self.handshake_timeout,
+            after_seq=last_seq
+        )
+
+    def _switch_protocol(self, protocol, baudrate):
+        self._frame_decoder.reset()
+        self._decoder.reset()
+        self._seq_commands.clear()
+        self.protocol = protocol
+        if self.serial_connection.baudrate != baudrate:
+            self.serial_connection.baudrate = baudrate
+
+    def _next_command_seq(self, command):
+        """分配命令序号（0-255循环）并记录对应的命令"""
+        seq = next(self._command_seqs) & 0xFF
+        self._seq_commands[seq] = command
+        return seq
+
+    @property
+    def uses_sequence_ids(self):
+        """固件是否会回显命令序号"""
+        return self.protocol == 'binary' or 'SEQ' in self.capabilities
+
+    @property
+    def pipelining(self):
+        return self.pipeline_depth > 1 and self.uses_sequence_ids
+
+    def _encode_ticket(self, ticket):
+        """按当前协议编码命令，支持序号时给票据分配序号"""
+        if self.protocol == 'binary':
+            ticket.seq = self._next_command_seq(ticket.command)
+            return encode_command(ticket.command, ticket.seq)
+        if 'SEQ' in self.capabilities:
+            ticket.seq = self._next_command_seq(ticket.command)
+            return f"#{ticket.seq} {ticket.command}\n".encode('utf-8')
+        return f"{ticket.command}\n".encode('utf-8')
+
+    @property
+    def is_ready(self):
+        """固件是否已就绪，可以接收命令"""
+        return self.is_connected and self._ready.is_set()
+    
+    def disconnect(self):
+        """断开Arduino连接（主动断开，不会自动重连）"""
+        self._stop_supervisor()
+        if self.is_connected and self.protocol == 'binary':
+            # 让固件回到文本协议，下次不复位连接时仍然可以握手
+            try:
+                with self._write_lock:
+                    self._frame_request(FRAME_TEXT)
+            except Exception:
+                pass
+        self.protocol = 'text'
+        self._close_link()
+        self.degraded = False
+        logger.info("已断开Arduino连接")
+
+    def _close_link(self):
+        """停止读写线程并关闭串口"""
+        self.is_connected = False
+        self._stop_workers()
+        if self.serial_connection is not None:
+            try:
+                self.serial_connection.close()
+            except Exception:
+                pass
+
+    def _mark_degraded(self, reason):
+        """串口出错或设备消失：标记为降级状态，由监督线程负责重连"""
+        if self._stop_event.is_set() or self.degraded:
+            return
+        logger.error(f"⚠️ Arduino连接异常: {reason}")
+        self._resume_pose = self.hand_state.target
+        self.degraded = True
+        self.is_connected = False
+        self.last_error = reason
+        self._ready.clear()
+        self._supervisor_wakeup.set()
+
+    def _start_supervisor(self):
+        if self._supervisor_thread is not None and self._supervisor_thread.is_alive():
+            return
+        self._supervising = True
+        self._supervisor_wakeup.clear()
+        self._supervisor_thread = threading.Thread(
+            target=self._supervisor_loop,
+            name="arduino-supervisor",
+            daemon=True
+        )
+        self._supervisor_thread.start()
+
+    def _stop_supervisor(self):
+        self._supervising = False
+        self._supervisor_wakeup.set()
+        if self._supervisor_thread and self._supervisor_thread is not threading.current_thread():
+            self._supervisor_thread.join(timeout=2)
+        self._supervisor_thread = None
+
+    def _port_present(self):
+        """检查设备是否还在（USB串口被拔出后设备文件会消失）"""
+        if self.port.startswith('/dev/'):
+            return os.path.exists(self.port)
+        try:
+            return any(port_info.device == self.port for port_info in list_ports.comports())
+        except Exception:
+            return True
+
+    def _supervisor_loop(self):
+        """监督线程：定期检查连接健康状况，异常时自动重连"""
+        while self._supervising:
+            self._supervisor_wakeup.wait(self.health_check_interval)
+            self._supervisor_wakeup.clear()
+            if not self._supervising:
+                break
+            if not self.degraded:
+                if not self.is_connected:
+                    continue
+                if not self._port_present():
+                    self._mark_degraded(f"设备已移除: {self.port}")
+                elif self._reader_thread is not None and not self._reader_thread.is_alive():
+                    self._mark_degraded("串口读线程已退出")
+                else:
+                    continue
+            self._recover()
+
+    def _recover(self):
+        """按指数退避重连，成功后恢复断线前的姿态"""
+        pose = self._resume_pose
+        self._close_link()
+        delay = self.reconnect_initial_delay
+        while self._supervising:
+            self.reconnect_attempts += 1
+            logger.info(f"🔄 尝试重新连接Arduino (第{self.reconnect_attempts}次)")
+            probe = self._find_device()
+            if probe is not None and self.connect(probe=probe):
+                self.reconnect_attempts = 0
+                logger.info("✅ Arduino已重新连接")
+                self._replay_pose(pose)
+                self.reconnect_count += 1
+                return
+            self._supervisor_wakeup.wait(delay)
+            self._supervisor_wakeup.clear()
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def _find_device(self):
+        """先尝试原来的端口，找不到再重新发现"""
+        if self._port_present():
+            probe = probe_port(
+                self.port,
+                self.baudrate,
+                timeout=self.ready_timeout,
+                reset=self.reset_on_connect
+            )
+            if probe is not None:
+                return probe
+        return discover_arduino(
+            candidates=self.candidate_ports,
+            baudrate=self.baudrate,
+            reset=self.reset_on_connect
+        )
+
+    def _replay_pose(self, pose):
+        """重连后恢复断线前的姿态"""
+        if pose is None:
+            return
+        commands = pose_to_commands(pose, self.hand_state.current)
+        if commands:
+            logger.info(f"↩️ 恢复断线前的姿态: {commands}")
+        for command in commands:
+            self.send_command(command)
+
+    def _start_workers(self, probe=None):
+        """启动串口读线程和写线程"""
+        self._stop_event.clear()
+        self._decoder.reset()
+        if probe is not None:
+            # 接着探测时的解码状态继续读，并补发探测期间读到的固件输出
+            self._decoder = probe.decoder
+            for line in probe.lines:
+                self._handle_line(line)
+        self._reader_thread = threading.Thread(
+            target=self._reader_loop,
+            name="arduino-reader",
+            daemon=True
+        )
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop,
+            name="arduino-writer",
+            daemon=True
+        )
+        self._reader_thread.start()
+        self._writer_thread.start()
+
+    def _stop_workers(self):
+        """停止读写线程，并让队列中未发送的命令失败"""
+        self._stop_event.set()
+        with self._event_cond:
+            self._event_cond.notify_all()
+        for thread in (self._writer_thread, self._reader_thread):
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self._writer_thread = None
+        self._reader_thread = None
+        self._drain_queue("Arduino连接已断开")
+        self._fail_in_flight("Arduino连接已断开")
+
+    def _drain_queue(self, reason):
+        while True:
+            try:
+                ticket = self.command_queue.get_nowait()
+            except queue.Empty:
+                break
+            ticket.finish('failed', reason)
+
+    def _writer_loop(self):
+        """写线程主循环：固件就绪后按顺序把队列中的命令写入串口"""
+        while not self._stop_event.is_set():
+            if not self._ready.wait(0.5):
+                continue
+            if self.pipelining:
+                self._pipeline_step()
+                continue
+            try:
+                ticket = self.command_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._write_ticket(ticket)
+
+    @property
+    def move_in_flight(self):
+        """机械手是否正在执行动作"""
+        ticket = self.current_ticket
+        return bool(self._in_flight) or (ticket is not None and not ticket.done)
+
+    def _write_ticket(self, ticket):
+        """在写线程中发送单条命令，并根据执行结果更新舵机状态镜像"""
+        self.current_ticket = ticket
+        self._execute_ticket(ticket)
+        self._record_result(ticket, ticket.status)
+
+    def _record_result(self, ticket, status):
+        """
+        根据命令执行结果更新熔断器和舵机状态镜像
+        只有固件确认执行完成(completed)才更新当前姿态；收到回显但没有完成提示时当前姿态未知；
+        失败或没有回显（固件很可能没有收到）时目标姿态回退
+        """
+        # 固件有回应（即使是"未知命令"）说明链路正常，写失败或没有回显才算失败
+        if ticket.acknowledged:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+        if status == 'completed':
+            self.hand_state.complete(ticket.target_pose)
+        elif status == 'sent' and ticket.acknowledged:
+            self.hand_state.invalidate()
+        elif self.command_queue.qsize() == 0 and not self._in_flight:
+            self.hand_state.rollback()
+
+    def _settle_ticket(self, ticket, status, error=None):
+        """流水线命令结束：先更新状态镜像再唤醒等待者"""
+        self._record_result(ticket, status)
+        ticket.finish(status, error)
+
+    def _pipeline_step(self):
+        """
+        流水线发送：在途命令未满pipeline_depth、且固件接收缓冲区放得下时发送下一条
+        命令结果由读线程按回显的序号匹配（见 _track_in_flight）
+        """
+        with self._pipeline_cond:
+            self._expire_in_flight()
+            if len(self._in_flight) >= self.pipeline_depth:
+                self._pipeline_cond.wait(0.05)
+                return
+        try:
+            ticket = self.command_queue.get(timeout=0.05)
+        except queue.Empty:
+            return
+
+        ticket.status = 'sending'
+        try:
+            data = self._encode_ticket(ticket)
+        except ValueError as e:
+            ticket.acknowledged = True  # 本地拒绝，不算链路故障
+            self._settle_ticket(ticket, 'failed', str(e))
+            return
+        with self._pipeline_cond:
+            # 固件动作期间不读串口，在途字节超过接收缓冲区会被丢弃
+            while (self._unacked_bytes and self._unacked_bytes + len(data) > SERIAL_RX_BUFFER_SIZE
+                   and not self._stop_event.is_set()):
+                self._pipeline_cond.wait(0.05)
+                self._expire_in_flight()
+            ticket.wire_size = len(data)
+            ticket.sent_at = time.time()
+            self._unacked_bytes += ticket.wire_size
+            if not self._in_flight:
+                self._last_progress = ticket.sent_at
+            self._in_flight[ticket.seq] = ticket
+        self.current_ticket = ticket
+        try:
+            with self._write_lock:
+                self.serial_connection.write(data)
+                self.serial_connection.flush()
+            if ticket.status == 'sending':
+                ticket.status = 'sent'
+        except Exception as e:
+            logger.error(f"发送命令失败: {e}")
+            with self._pipeline_cond:
+                self._in_flight.pop(ticket.seq, None)
+                self._release_bytes(ticket)
+            self._settle_ticket(ticket, 'failed', str(e))
+            self._mark_degraded(f"写入串口失败: {e}")
+
+    def _release_bytes(self, ticket):
+        self._unacked_bytes = max(self._unacked_bytes - ticket.wire_size, 0)
+        ticket.wire_size = 0
+
+    def _track_in_flight(self, event):
+        """读线程中调用：按回显的序号更新在途命令"""
+        settled = []
+        with self._pipeline_cond:
+            ticket = self._in_flight.get(event.command_seq)
+            if ticket is None:
+                return
+            if event.kind == 'received':
+                ticket.acknowledged = True
+                ticket.acked_at = event.timestamp
+                self._release_bytes(ticket)
+            elif event.kind in TERMINAL_EVENTS:
+                # 固件按顺序执行命令，排在前面还没有结果的命令，回复已经丢失
+                while self._in_flight:
+                    seq, earlier = self._in_flight.popitem(last=False)
+                    self._release_bytes(earlier)
+                    settled.append(earlier)
+                    if seq == event.command_seq:
+                        break
+                self._last_progress = event.timestamp
+            self._pipeline_cond.notify_all()
+
+        for earlier in settled[:-1]:
+            logger.warning(f"未收到命令结果: {earlier.command}")
+            self._settle_ticket(earlier, 'sent', "未收到固件确认")
+        if settled:
+            ticket.response = event.line
+            if event.kind == 'completed':
+                self._settle_ticket(ticket, 'completed')
+            else:
+                self._settle_ticket(ticket, 'failed', event.line)
+
+    def _expire_in_flight(self):
+        """持有_pipeline_cond时调用：最早的在途命令超过completion_timeout没有进展时按超时结束"""
+        while self._in_flight:
+            seq, ticket = next(iter(self._in_flight.items()))
+            started = max(ticket.sent_at, self._last_progress)
+            if time.time() - started <= self.completion_timeout:
+                return
+            del self._in_flight[seq]
+            self._release_bytes(ticket)
+            self._last_progress = time.time()
+            if ticket.acknowledged:
+                logger.warning(f"等待舵机移动完成超时: {ticket.command}")
+                self._settle_ticket(ticket, 'sent')
+            else:
+                logger.warning(f"未收到命令确认: {ticket.command}")
+                self._settle_ticket(ticket, 'sent', "未收到固件确认")
+
+    def _fail_in_flight(self, reason):
+        with self._pipeline_cond:
+            tickets = list(self._in_flight.values())
+            self._in_flight.clear()
+            self._unacked_bytes = 0
+        for ticket in tickets:
+            ticket.finish('failed', reason)
+
+    def _execute_ticket(self, ticket):
+        """发送单条命令，并等待固件报告执行结果"""
+        ticket.status = 'sending'
+        try:
+            last_seq = self._event_seq
+            with self._write_lock:
+                data = self._encode_ticket(ticket)
+                self.serial_connection.write(data)
+                self.serial_connection.flush()
+            ticket.sent_at = time.time()
+            ticket.status = 'sent'
+        except Exception as e:
+            logger.error(f"发送命令失败: {e}")
+            ticket.finish('failed', str(e))
+            self._mark_degraded(f"写入串口失败: {e}")
+            return
+        
+        # 先等固件确认收到的是这条命令，避免把上一条命令迟到的回复算到这条头上
+        # 固件回显序号时按序号匹配，否则只能按命令文本匹配
+        if ticket.seq is not None:
+            is_reply = lambda event: event.command_seq == ticket.seq
+        else:
+            is_reply = lambda event: event.detail == ticket.command
+        deadline = ticket.sent_at + self.completion_timeout
+        received = self.wait_for_event(
+            lambda event: event.kind == 'received' and is_reply(event),
+            timeout=deadline - time.time(),
+            after_seq=last_seq
+        )
+        if received is None:
+            logger.warning(f"未收到命令确认: {ticket.command}")
+            ticket.finish('sent', "未收到固件确认")
+            return
+        ticket.acknowledged = True
+        ticket.acked_at = received.timestamp
+        if not self.reports_completion:
+            # 固件读完这条命令才会做动作，下一条命令的回显自然排在动作之后，不必占着写线程等待
+            ticket.finish('sent')
+            return
+        
+        result = self.wait_for_event(
+            lambda event: event.kind in TERMINAL_EVENTS and (ticket.seq is None or is_reply(event)),
+            timeout=deadline - time.time(),
+            after_seq=received.seq
+        )
+        if result is None:
+            logger.warning(f"等待舵机移动完成超时: {ticket.command}")
+            ticket.finish('sent')
+        elif result.kind == 'completed':
+            ticket.response = result.line
+            ticket.finish('completed')
+        else:
+            ticket.response = result.line
+            ticket.finish('failed', result.line)
+
+    def _reader_loop(self):
+        """读线程主循环：持续读取串口输出并转换为事件"""
+        while not self._stop_event.is_set():
+            try:
+                data = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+            except Exception as e:
+                self._mark_degraded(f"读取串口失败: {e}")
+                break
+            if not data:
+                continue
+            if self.protocol == 'binary':
+                for frame in self._frame_decoder.feed(data):
+                    self._handle_frame(frame)
+            else:
+                for line in self._decoder.feed(data):
+                    self._handle_line(line)
+
+    def _handle_line(self, line):
+        """处理固件输出的一行：跟踪启动/就绪状态并发布事件"""
+        event = parse_serial_line(line)
+        if event.kind == 'boot':
+            # 固件重新启动，舵机回到初始姿态，就绪前暂停发送
+            self._ready.clear()
+            self.hand_state.reset()
+        elif event.kind == 'ready':
+            self._ready.set()
+        self._publish_event(event)
+
+    def _handle_frame(self, frame):
+        """处理二进制协议的回复帧，转换为与文本协议相同的事件"""
+        command = self._seq_commands.get(frame.seq)
+        if frame.type == FRAME_ACK:
+            event = SerialEvent('received', f"ACK #{frame.seq} {command}", command, command_seq=frame.seq)
+        elif frame.type == FRAME_DONE:
+            self._seq_commands.pop(frame.seq, None)
+            line = f"DONE #{frame.seq} {command}: {STATUS_NAMES.get(frame.status, frame.status)}"
+            if frame.status == STATUS_TIMEOUT:
+                self._publish_event(SerialEvent('timeout', line, command))
+            event = SerialEvent(FRAME_STATUS_EVENTS.get(frame.status, 'invalid'), line, command,
+                                command_seq=frame.seq)
+        elif frame.type == FRAME_NAK:
+            event = SerialEvent('invalid', f"NAK #{frame.seq}: {STATUS_NAMES.get(frame.status, frame.status)}",
+                                command_seq=frame.seq)
+        else:
+            event = SerialEvent('other', repr(frame))
+        self._publish_event(event)
+
+    def _publish_event(self, event):
+        """保存事件并通知等待者和监听器"""
+        logger.info(f"Arduino响应: {event.line}")
+        with self._event_cond:
+            self._event_seq += 1
+            event.seq = self._event_seq
+            self.events.append(event)
+            self._event_cond.notify_all()
+        if event.command_seq is not None and self._in_flight:
+            self._track_in_flight(event)
+        for listener in list(self._event_listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"事件监听器出错: {e}")
+
+    def add_event_listener(self, listener):
+        """注册串口事件监听器，监听器在读线程中被调用"""
+        self._event_listeners.append(listener)
+
+    def remove_event_listener(self, listener):
+        if listener in self._event_listeners:
+            self._event_listeners.remove(listener)
+
+    def wait_for_event(self, predicate, timeout=None, after_seq=None):
+        """
+        等待满足条件的事件
+        predicate 可以是事件类型字符串、类型元组或函数；只检查序号大于after_seq的事件
+        超时返回None
+        """
+        if isinstance(predicate, str):
+            predicate = (predicate,)
+        if isinstance(predicate, tuple):
+            kinds = predicate
+            predicate = lambda event: event.kind in kinds
+        if after_seq is None:
+            after_seq = self._event_seq
+        
+        deadline = None if timeout is None else time.time() + timeout
+        with self._event_cond:
+            while True:
+                for event in self.events:
+                    if event.seq > after_seq and predicate(event):
+                        return event
+                if self.events:
+                    after_seq = max(after_seq, self.events[-1].seq)
+                if self._stop_event.is_set():
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._event_cond.wait(remaining)
+
+    def wait_for_move_completed(self, timeout=None):
+        """等待下一次"舵机移动完成"事件"""
+        return self.wait_for_event('completed', timeout=timeout)
+    
+    def send_command(self, command):
+        """
+        发送命令到Arduino
+        命令放入队列后立即返回CommandTicket，队列已满或未连接时返回None
+        手势命令采用latest-wins：尚未发送的旧手势会被新手势替换，ID记录在ticket.coalesced中
+        安全命令(EMERGENCY_COMMANDS)插队到最前，并清空排队中的普通命令，ID记录在ticket.preempted中
+        没有排队或正在执行的命令、且目标姿态与确认的当前姿态相同时，命令不会发送，直接返回状态为skipped的票据；
+        安全命令总是发送
+        熔断期间命令直接返回状态为rejected的票据，retry_after 为建议的重试等待时间
+        二进制协议下无法编码的命令同样返回rejected的票据
+        """
+        if not self.is_connected or not self.serial_connection:
+            logger.error("Arduino未连接")
+            return None
+
+        ticket = CommandTicket(next(self._ticket_ids), command)
+        if self.protocol == 'binary':
+            try:
+                encode_command(command, 0)
+            except ValueError as e:
+                ticket.finish('rejected', str(e))
+                self._remember_ticket(ticket)
+                return ticket
+        target_pose, unchanged = self.hand_state.plan(command)
+        ticket.target_pose = target_pose
+        emergency = command in EMERGENCY_COMMANDS
+        # 还有命令没执行完时目标姿态随时可能被合并、插队或取消改变，不能跳过
+        if unchanged and not emergency and not self.has_pending_commands():
+            logger.info(f"姿态未变化，跳过命令: {command}")
+            ticket.finish('skipped')
+            self._remember_ticket(ticket)
+            return ticket
+        
+        if not self.circuit_breaker.allow():
+            ticket.retry_after = round(self.circuit_breaker.retry_after(), 2)
+            ticket.finish('rejected', f"串口连续失败，已熔断，请{ticket.retry_after}秒后重试")
+            self._remember_ticket(ticket)
+            return ticket
+        
+        coalesce_key = 'gesture' if is_gesture_command(command) else None
+        try:
+            dropped = self.command_queue.put(ticket, coalesce_key=coalesce_key, emergency=emergency)
+        except queue.Full:
+            logger.error(f"命令队列已满，丢弃命令: {command}")
+            return None
+        self.hand_state.accept(target_pose)
+        
+        if emergency and dropped:
+            ticket.preempted = [old.ticket_id for old in dropped]
+            logger.info(f"⛔ {command} 插队，清除排队命令: {[old.command for old in dropped]}")
+        elif dropped:
+            ticket.coalesced = [old.ticket_id for old in dropped]
+            logger.info(f"手势合并: {[old.command for old in dropped]} -> {command}")
+
+        self._remember_ticket(ticket)
+        return ticket
+
+    def submit(self, command):
+        """
+        发送命令并返回 concurrent.futures.Future，结果为执行结束的CommandTicket
+        pipeline_depth大于1且固件回显序号时，多条命令可以同时在途
+        未连接或队列已满时Future带有RuntimeError
+        """
+        ticket = self.send_command(command)
+        if ticket is None:
+            future = Future()
+            future.set_exception(RuntimeError(f"命令未能入队: {command}"))
+            return future
+        return ticket.future
+
+    def has_pending_commands(self):
+        """是否有排队中或正在执行的命令"""
+        with self._ticket_lock:
+            return any(not ticket.done for ticket in self.tickets.values())
+
+    def _remember_ticket(self, ticket):
+        """保存票据供之后查询，只保留最近的ticket_history条"""
+        with self._ticket_lock:
+            self.tickets[ticket.ticket_id] = ticket
+            while len(self.tickets) > self.ticket_history:
+                self.tickets.popitem(last=False)
+
+    def get_ticket(self, ticket_id):
+        """按ticket_id查询命令票据"""
+        with self._ticket_lock:
+            return self.tickets.get(ticket_id)
+
+    def set_pose(self, angles):
+        """
+        一次设置全部六个舵机的目标角度（小拇指,无名指,中指,食指,大拇指,手腕）
+        固件只执行一次并行移动；角度不合法时抛出ValueError
+        """
+        return self.send_command(make_pose_command(angles))
+
+    def cancel_pending(self):
+        """
+        取消所有排队中的普通命令（停止），正在执行的动作会做完
+        返回被取消的命令列表
+        """
+        dropped = self.command_queue.clear()
+        for ticket in dropped:
+            ticket.finish('cancelled')
+        current = self.current_ticket
+        if current is not None and not current.done and current.target_pose is not None:
+            self.hand_state.accept(current.target_pose)
+        elif self.command_queue.qsize() == 0:
+            self.hand_state.rollback()
+        if dropped:
+            logger.info(f"⏹️ 已取消排队命令: {[ticket.command for ticket in dropped]}")
+        return dropped
+
+# 常见的Arduino串口，会和系统枚举到的串口一起探测
+COMMON_PORTS = [
+    '/dev/tty.usbserial-210',  # 你的Arduino设备
+    '/dev/ttyUSB0',
+    '/dev/ttyUSB1', 
+    '/dev/ttyACM0',
+    '/dev/ttyACM1',
+    'COM1',
+    'COM2',
+    'COM3',
+    'COM4'
+]
+
+# 常见Arduino / USB转串口芯片的厂商ID，优先探测
+ARDUINO_VIDS = {
+    0x2341,  # Arduino
+    0x2A03,  # Arduino.org
+    0x1A86,  # CH340
+    0x0403,  # FTDI
+    0x10C4,  # CP210x
+}
+
+# 上次成功连接的端口缓存
+PORT_CACHE_FILE = os.environ.get(
+    'HAND_GATEWAY_PORT_CACHE',
+    os.path.join(os.path.expanduser('~'), '.hand_gateway_port.json')
+)
+
+# 固件启动时输出的标志文字（各版本固件都包含）
+BANNER_MARKER = '机械手控制器'
+# 握手命令：各版本固件都会回显"收到命令: PING"，以此确认对端是我们的机械手
+HANDSHAKE_COMMAND = 'PING'
+# 打开端口后没有任何输出多久才发送握手命令（板子会复位时要等过bootloader，避免干扰）
+HANDSHAKE_QUIET_TIME = 2.0
+HANDSHAKE_QUIET_TIME_NO_RESET = 0.2
+# 单个端口的探测超时（秒），需要覆盖板子复位和setup()的时间
+PROBE_TIMEOUT = 4.0
+
+
+class PortProbe:
+    """端口探测结果，识别成功时保持串口打开供ArduinoController接管"""
+
+    def __init__(self, port, serial_connection, identified_by, lines, decoder):
+        self.port = port
+        self.serial_connection = serial_connection
+        self.identified_by = identified_by  # banner / handshake / None（未识别）
+        self.lines = lines
+        self.decoder = decoder
+
+    def close(self):
+        try:
+            self.serial_connection.close()
+        except Exception:
+            pass
+
+
+def load_port_cache():
+    """读取上次成功连接的端口信息"""
+    try:
+        with open(PORT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_port_cache(port):
+    """保存成功连接的端口及其VID:PID，下次启动优先尝试"""
+    info = {"port": port, "saved_at": time.time()}
+    for port_info in list_ports.comports():
+        if port_info.device == port and port_info.vid is not None:
+            info.update({
+                "vid": port_info.vid,
+                "pid": port_info.pid,
+                "serial_number": port_info.serial_number
+            })
+            break
+    try:
+        with open(PORT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+    except OSError as e:
+        logger.warning(f"保存端口缓存失败: {e}")
+
+
+def list_candidate_ports():
+    """
+    列出候选端口，顺序：缓存的端口 > 与缓存VID:PID相同的设备 > 常见Arduino芯片 > 其他串口 > 常见端口列表
+    """
+    cache = load_port_cache()
+    cached_id = (cache.get('vid'), cache.get('pid'), cache.get('serial_number'))
+
+    def rank(port_info):
+        if cache.get('vid') is not None and (
+                port_info.vid, port_info.pid, port_info.serial_number) == cached_id:
+            return 0
+        if port_info.vid in ARDUINO_VIDS:
+            return 1
+        return 2
+
+    candidates = []
+    if cache.get('port'):
+        candidates.append(cache['port'])
+    try:
+        enumerated = sorted(list_ports.comports(), key=rank)
+    except Exception as e:
+        logger.warning(f"枚举串口失败: {e}")
+        enumerated = []
+    candidates.extend(port_info.device for port_info in enumerated)
+    candidates.extend(COMMON_PORTS)
+
+    # 去重并保持顺序
+    return list(OrderedDict.fromkeys(candidates))
+
+
+def open_serial_port(port, baudrate=9600, timeout=0.1, reset=True):
+    """
+    打开串口
+    reset 为False时在打开前关闭DTR/RTS，尽量避免Arduino自动复位（取决于驱动和操作系统）
+    """
+    serial_connection = serial.Serial()
+    serial_connection.port = port
+    serial_connection.baudrate = baudrate
+    serial_connection.timeout = timeout
+    # 独占打开：同一个串口只能有一个进程在用，第二个网关实例会直接打开失败
+    serial_connection.exclusive = True
+    if not reset:
+        serial_connection.dtr = False
+        serial_connection.rts = False
+    serial_connection.open()
+    return serial_connection
+
+
+def probe_port(port, baudrate=9600, timeout=PROBE_TIMEOUT, cancel_event=None, reset=True, keep_open=False):
+    """
+    探测端口上是否是我们的机械手
+    先等待固件启动标志，一段时间没有输出（板子没有复位）则发送握手命令
+    识别成功返回PortProbe（串口保持打开），否则返回None；
+    keep_open 为True时即使未识别也返回identified_by为None的PortProbe
+    """
+    try:
+        serial_connection = open_serial_port(port, baudrate, timeout=0.1, reset=reset)
+    except Exception:
+        return None
+
+    quiet_time = HANDSHAKE_QUIET_TIME if reset else HANDSHAKE_QUIET_TIME_NO_RESET
+    decoder = SerialLineDecoder()
+    lines = []
+    opened_at = last_data_at = time.time()
+    handshake_sent = False
+    try:
+        while time.time() - opened_at < timeout:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            data = serial_connection.read(serial_connection.in_waiting or 1)
+            if data:
+                last_data_at = time.time()
+                for line in decoder.feed(data):
+                    lines.append(line)
+                    if BANNER_MARKER in line:
+                        return PortProbe(port, serial_connection, 'banner', lines, decoder)
+                    if handshake_sent and parse_serial_line(line).detail == HANDSHAKE_COMMAND:
+                        return PortProbe(port, serial_connection, 'handshake', lines, decoder)
+            elif not handshake_sent and time.time() - last_data_at >= quiet_time:
+                serial_connection.write(f"{HANDSHAKE_COMMAND}\n".encode('utf-8'))
+                serial_connection.flush()
+                handshake_sent = True
+    except Exception as e:
+        logger.debug(f"探测端口 {port} 出错: {e}")
+
+    if keep_open and serial_connection.is_open:
+        return PortProbe(port, serial_connection, None, lines, decoder)
+    serial_connection.close()
+    return None
+
+
+def discover_arduino(candidates=None, baudrate=9600, timeout=PROBE_TIMEOUT, reset=True):
+    """
+    并行探测候选端口，返回第一个识别成功的PortProbe，找不到时返回None
+    缓存的端口会先单独尝试，失败后再并行探测所有端口
+    """
+    if candidates is None:
+        candidates = list_candidate_ports()
+    if not candidates:
+        return None
+
+    cached_port = load_port_cache().get('port')
+    if cached_port and cached_port in candidates:
+        logger.info(f"优先尝试上次使用的端口: {cached_port}")
+        probe = probe_port(cached_port, baudrate, timeout, reset=reset)
+        if probe is not None:
+            return probe
+        candidates = [port for port in candidates if port != cached_port]
+        if not candidates:
+            return None
+
+    logger.info(f"并行探测端口: {', '.join(candidates)}")
+    cancel_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="port-probe")
+    futures = [executor.submit(probe_port, port, baudrate, timeout, cancel_event, reset) for port in candidates]
+    winner = None
+    for future in as_completed(futures):
+        probe = future.result()
+        if probe is None:
+            continue
+        if winner is None:
+            winner = probe
+            cancel_event.set()
+        else:
+            probe.close()
+    executor.shutdown(wait=False)
+    return winner
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手势会话（去抖、平滑和提前预测）
+每帧单独识别时，手在两个手势之间时结果每帧来回跳（石头 0.6 / 剪刀 0.7），
+客户端把结果转发给 /rps 就会让机械手来回动。按客户端保存最近几帧的识别结果，
+用滑动窗口投票加滞回得到稳定的手势：
+
+    投票分数: 窗口内该手势各帧置信度之和 / 窗口长度（等待识别、未知不投票）
+    进入: 分数 >= enter_confidence，且连续 min_dwell 帧都是票数最多的手势
+    保持: 当前稳定手势的分数 >= exit_confidence 时不切换
+    稳定手势变为新的手势时 changed 为True，客户端只在这时发送动作命令
+
+客户端在请求头 X-Hand-Session（或查询参数 session）中带上会话ID即可，
+UDP按客户端ID区分会话；同一会话的关键点在识别前先做平滑（见 hand_filter.py），
+并根据手指伸展轨迹提前预测手势（见 hand_predict.py）；一段时间没有新帧的会话会被清理
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+
+from hand_filter import LandmarkFilterBank
+from hand_predict import GesturePredictor, PREDICTION_HORIZON, MIN_PROBABILITY, hand_extension
+
+SESSION_HEADER = 'X-Hand-Session'
+SESSION_TIMEOUT = 10.0
+MAX_SESSIONS = 1024
+
+VOTE_WINDOW = 8
+ENTER_CONFIDENCE = 0.6
+EXIT_CONFIDENCE = 0.35
+MIN_DWELL = 3
+
+# 参与投票的手势；其他结果（等待识别...、未知）只占窗口位置
+VOTING_GESTURES = ("石头", "剪刀", "布")
+NO_GESTURE = "等待识别..."
+
+
+class GestureDebouncer:
+    """一个会话的滑动窗口投票和滞回"""
+
+    def __init__(self, window=VOTE_WINDOW, enter_confidence=ENTER_CONFIDENCE,
+                 exit_confidence=EXIT_CONFIDENCE, min_dwell=MIN_DWELL):
+        self.window = window
+        self.enter_confidence = enter_confidence
+        self.exit_confidence = exit_confidence
+        self.min_dwell = min_dwell
+        self.votes = deque(maxlen=window)
+        self.gesture = None
+        self.confidence = 0.0
+        self.changes = 0
+        self._leader = None
+        self._dwell = 0
+
+    def update(self, gesture, confidence):
+        """加入一帧的识别结果，返回稳定手势是否变为新的手势"""
+        self.votes.append((gesture, confidence) if gesture in VOTING_GESTURES else (None, 0.0))
+        scores = {}
+        for voted, weight in self.votes:
+            if voted is not None:
+                scores[voted] = scores.get(voted, 0.0) + weight
+        for voted in scores:
+            scores[voted] /= self.window
+
+        leader = max(scores, key=scores.get) if scores else None
+        if leader is not None and leader == self._leader:
+            self._dwell += 1
+        else:
+            self._leader = leader
+            self._dwell = 1 if leader is not None else 0
+
+        if self.gesture is not None and scores.get(self.gesture, 0.0) >= self.exit_confidence:
+            self.confidence = scores[self.gesture]
+            return False
+
+        if (leader is not None and scores[leader] >= self.enter_confidence
+                and self._dwell >= self.min_dwell):
+            changed = leader != self.gesture
+            self.gesture = leader
+            self.confidence = scores[leader]
+            self.changes += changed
+            return changed
+
+        self.gesture = None
+        self.confidence = 0.0
+        return False
+
+    def reset(self):
+        self.votes.clear()
+        self.gesture = None
+        self.confidence = 0.0
+        self._leader = None
+        self._dwell = 0
+
+
+class HandSessions:
+    """
+    按会话ID保存去抖状态和关键点滤波槽位，线程安全
+    新建会话时清理超时的会话；超过 max_sessions 时丢弃最久没有更新的会话
+    """
+
+    def __init__(self, timeout=SESSION_TIMEOUT, max_sessions=MAX_SESSIONS, smoothing=True,
+                 prediction_horizon=PREDICTION_HORIZON, min_prediction_probability=MIN_PROBABILITY,
+                 **debounce_options):
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.debounce_options = debounce_options
+        self.prediction_options = {"horizon": prediction_horizon, "min_probability": min_prediction_probability}
+        # 每个会话在滤波器中占一个槽位（smoothing=False 时不平滑关键点）
+        self.filters = LandmarkFilterBank(max_sessions) if smoothing else None
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "frames": 0,
+            "changes": 0,
+            "evicted": 0
+        }
+
+    def smooth(self, session_id, hand, now=None):
+        """
+        按会话平滑一帧关键点（hand_landmarks.DenseHand），并记录手指伸展轨迹用于提前预测
+        在识别之前调用，返回平滑后的关键点
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            session = self._session(session_id, now)
+            if self.filters is not None:
+                hand = self.filters.smooth_hand(session['slot'], hand, now)
+            extension = hand_extension(hand)
+            if extension is not None:
+                session['predictor'].observe(extension, now)
+            return hand
+
+    def update(self, session_id, gesture, confidence, now=None):
+        """加入一帧识别结果，返回稳定手势字典"""
+        now = time.time() if now is None else now
+        with self._lock:
+            session = self._session(session_id, now)
+            debouncer = session['debouncer']
+            changed = debouncer.update(gesture, confidence)
+            predicted, probability = session['predictor'].predict(now)
+            # 回到没有手势的状态（手放下或离开画面）后是新的一局，可以再针对同样的手势出招
+            if debouncer.gesture is None and predicted is None:
+                session['countered'] = None
+            self.stats["frames"] += 1
+            self.stats["changes"] += changed
+            return {
+                "session": session_id,
+                "stable_gesture": debouncer.gesture or NO_GESTURE,
+                "stable_confidence": round(debouncer.confidence, 3),
+                "gesture_changed": changed,
+                "predicted_gesture": predicted or NO_GESTURE,
+                "prediction_probability": round(probability, 3)
+            }
+
+    def claim_counter(self, session_id, gesture):
+        """
+        提前出招时记录机械手已经针对哪个手势出招
+        这个会话上一次出招针对的不是 gesture 时返回True；回到没有手势的状态后重新记录
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session['countered'] == gesture:
+                return False
+            session['countered'] = gesture
+            return True
+
+    def _session(self, session_id, now):
+        session = self._sessions.get(session_id)
+        if session is not None and now - session['updated_at'] > self.timeout:
+            session['debouncer'].reset()
+            session['predictor'].reset()
+            session['countered'] = None
+            if self.filters is not None:
+                self.filters.reset(session['slot'])
+        if session is None:
+            self._evict_idle(now)
+            while len(self._sessions) >= self.max_sessions:
+                self._remove(next(iter(self._sessions)))
+            session = {
+                'debouncer': GestureDebouncer(**self.debounce_options),
+                'predictor': GesturePredictor(**self.prediction_options),
+                'slot': self.filters.acquire() if self.filters is not None else None,
+                'countered': None
+            }
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session['updated_at'] = now
+        return session
+
+    def _remove(self, session_id):
+        session = self._sessions.pop(session_id)
+        if self.filters is not None:
+            self.filters.release(session['slot'])
+        self.stats["evicted"] += 1
+
+    def evict_idle(self, now=None):
+        """清理长时间没有新帧的会话"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._evict_idle(now)
+
+    def _evict_idle(self, now):
+        # 会话按更新时间排列，最旧的在前面
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session['updated_at'] <= self.timeout:
+                break
+            self._remove(session_id)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                **self.stats,
+                "smoothing": self.filters.to_dict() if self.filters is not None else None
+            }
+
+
+def session_result(result, sessions, session_id, now=None):
+    """识别成功且带有会话ID时，在 /analyze_hand 的响应中加入稳定手势"""
+    if not session_id or not result.get('success'):
+        return result
+    return {**result, **sessions.update(session_id, result['gesture'], result['confidence'], now)}
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+手部关键点UDP数据报
+遥操作只关心最新一帧，不需要可靠传输；TCP在不稳定的Wi-Fi上丢一个包就会让后面的帧全部等待重传，
+UDP数据报丢了就丢了，迟到的旧帧直接丢弃
+
+数据报格式（小端）:
+    关键帧: 'HF' | 版本 | 标志 | 客户端ID(u32) | 帧序号(u32) | 21 x (x:i16, y:i16, 置信度:u8)
+    差分帧: 'HF' | 版本 | 标志(FLAG_DELTA) | 客户端ID(u32) | 帧序号(u32) | 关键帧序号(u32)
+            | 21 x (dx:i8, dy:i8, 置信度:u8)
+    关节顺序见 hand_landmarks.JOINT_NAMES；坐标为Vision的归一化坐标乘以 QUANT_SCALE，置信度乘以255，
+    置信度为0表示该关节未检测到
+    差分帧相对于最近的关键帧编码，丢失差分帧不影响后面的帧；接收端没有收到对应的关键帧时无法解码，直接丢弃
+    发送端每 KEYFRAME_INTERVAL 帧或差值超出i8范围时发送新的关键帧
+
+接收端回复JSON: {"client": 客户端ID, "frame": 帧序号, "gesture": 手势, "confidence": 置信度}
+传入 sessions（hand_session.HandSessions）时按客户端ID平滑关键点并去抖，回复中加入稳定手势（见 hand_session.py）
+接收端把关节直接还原为 hand_landmarks.DenseHand 交给识别函数（hand_recognition.analyze_dense_hand），不经过关节名
+"""
+
+import json
+import time
+import functools
+import socket
+import struct
+import logging
+import threading
+
+from hand_landmarks import JOINT_COUNT, JOINT_KEYS, DenseHand, normalize_hand
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'HF'
+VERSION = 1
+FLAG_DELTA = 0x01
+
+QUANT_SCALE = 4096
+KEYFRAME_INTERVAL = 30
+# 客户端超过该时间没有新帧时认为发送端已重启，帧序号重新开始计算
+CLIENT_TIMEOUT = 2.0
+
+HEADER = struct.Struct('<2sBBII')
+BASE_SEQ = struct.Struct('<I')
+KEY_JOINT = struct.Struct('<hhB')
+DELTA_JOINT = struct.Struct('<bbB')
+
+KEYFRAME_SIZE = HEADER.size + JOINT_COUNT * KEY_JOINT.size
+DELTA_FRAME_SIZE = HEADER.size + BASE_SEQ.size + JOINT_COUNT * DELTA_JOINT.size
+
+
+def quantize_hand(hand_data):
+    """把关键点字典（/analyze_hand 的请求体）量化为21个 (x, y, 置信度) 整数元组"""
+    hand = normalize_hand(hand_data)
+    joints = []
+    for x, y, confidence, present in zip(hand.xs, hand.ys, hand.confs, hand.present):
+        if not present:
+            joints.append((0, 0, 0))
+            continue
+        joints.append((
+            max(-32768, min(32767, round(float(x) * QUANT_SCALE))),
+            max(-32768, min(32767, round(float(y) * QUANT_SCALE))),
+            max(1, min(255, round(float(confidence) * 255)))
+        ))
+    return joints
+
+
+def dequantize_hand(joints):
+    """把量化的关节还原为关键点字典，未检测到的关节不出现在字典中"""
+    hand_data = {}
+    for key, (x, y, confidence) in zip(JOINT_KEYS, joints):
+        if confidence:
+            hand_data[key] = {
+                "x": x / QUANT_SCALE,
+                "y": y / QUANT_SCALE,
+                "confidence": confidence / 255
+            }
+    return hand_data
+
+
+def dequantize_dense(joints):
+    """把量化的关节还原为 DenseHand，置信度为0的关节标记为未检测到"""
+    xs, ys, confs, present = [], [], [], []
+    for x, y, confidence in joints:
+        xs.append(x / QUANT_SCALE)
+        ys.append(y / QUANT_SCALE)
+        confs.append(confidence / 255)
+        present.append(confidence > 0)
+    return DenseHand(xs, ys, confs, present)
+
+
+def encode_keyframe(client_id, seq, joints):
+    data = bytearray(HEADER.pack(MAGIC, VERSION, 0, client_id, seq))
+    for joint in joints:
+        data += KEY_JOINT.pack(*joint)
+    return bytes(data)
+
+
+def encode_delta(client_id, seq, base_seq, joints, base_joints):
+    """按关键帧编码差分帧，差值超出i8范围时返回None（需要发送新的关键帧）"""
+    data = bytearray(HEADER.pack(MAGIC, VERSION, FLAG_DELTA, client_id, seq))
+    data += BASE_SEQ.pack(base_seq)
+    for (x, y, confidence), (base_x, base_y, _) in zip(joints, base_joints):
+        dx, dy = x - base_x, y - base_y
+        if not (-128 <= dx <= 127 and -128 <= dy <= 127):
+            return None
+        data += DELTA_JOINT.pack(dx, dy, confidence)
+    return bytes(data)
+
+
+class Datagram:
+    """解析后的数据报；差分帧的 joints 是相对于关键帧 base_seq 的差值"""
+
+    def __init__(self, client_id, seq, joints, base_seq=None):
+        self.client_id = client_id
+        self.seq = seq
+        self.joints = joints
+        self.base_seq = base_seq
+
+    @property
+    def is_delta(self):
+        return self.base_seq is not None
+
+
+def decode_datagram(data):
+    """解析数据报，格式错误时抛出ValueError"""
+    if len(data) < HEADER.size:
+        raise ValueError(f"数据报过短: {len(data)}")
+    magic, version, flags, client_id, seq = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"未知的数据报: {magic!r} v{version}")
+    if flags & FLAG_DELTA:
+        if len(data) != DELTA_FRAME_SIZE:
+            raise ValueError(f"差分帧长度错误: {len(data)}")
+        base_seq, = BASE_SEQ.unpack_from(data, HEADER.size)
+        joints = list(DELTA_JOINT.iter_unpack(data[HEADER.size + BASE_SEQ.size:]))
+        return Datagram(client_id, seq, joints, base_seq)
+    if len(data) != KEYFRAME_SIZE:
+        raise ValueError(f"关键帧长度错误: {len(data)}")
+    return Datagram(client_id, seq, list(KEY_JOINT.iter_unpack(data[HEADER.size:])))
+
+
+class FrameEncoder:
+    """发送端：自动在关键帧和差分帧之间选择"""
+
+    def __init__(self, client_id, delta=True, keyframe_interval=KEYFRAME_INTERVAL):
+        self.client_id = client_id
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self._keyframe = None
+        self._since_keyframe = 0
+
+    def encode(self, hand_data):
+        joints = quantize_hand(hand_data)
+        self.seq += 1
+        data = None
+        if self.delta and self._keyframe is not None and self._since_keyframe < self.keyframe_interval:
+            data = encode_delta(self.client_id, self.seq, self._keyframe[0], joints, self._keyframe[1])
+        if data is None:
+            data = encode_keyframe(self.client_id, self.seq, joints)
+            self._keyframe = (self.seq, joints)
+            self._since_keyframe = 0
+        self._since_keyframe += 1
+        return data
+
+
+class LandmarkReceiver:
+    """
+    接收端：按客户端记录最新帧序号和最近的关键帧
+    乱序/重复的旧帧、关键帧缺失的差分帧和格式错误的数据报都会被丢弃并计数
+    analyze(hand, smooth=None) 识别一帧 DenseHand，返回 (手势, 置信度)
+    """
+
+    def __init__(self, analyze, client_timeout=CLIENT_TIMEOUT, sessions=None):
+        self.analyze = analyze
+        self.client_timeout = client_timeout
+        self.sessions = sessions
+        self._clients = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "received": 0,
+            "analyzed": 0,
+            "stale": 0,
+            "missing_base": 0,
+            "malformed": 0
+        }
+
+    def handle(self, data, now=None):
+        """处理一个数据报，返回识别结果字典；被丢弃时返回None"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.stats["received"] += 1
+            try:
+                datagram = decode_datagram(data)
+            except ValueError as e:
+                logger.debug(f"丢弃数据报: {e}")
+                self.stats["malformed"] += 1
+                return None
+
+            client = self._clients.get(datagram.client_id)
+            if client is not None and now - client['updated_at'] > self.client_timeout:
+                client = None
+            if client is not None and datagram.seq <= client['seq']:
+                self.stats["stale"] += 1
+                return None
+
+            joints = datagram.joints
+            if datagram.is_delta:
+                if client is None or client['keyframe_seq'] != datagram.base_seq:
+                    self.stats["missing_base"] += 1
+                    return None
+                joints = [
+                    (base_x + dx, base_y + dy, confidence)
+                    for (dx, dy, confidence), (base_x, base_y, _) in zip(joints, client['keyframe'])
+                ]
+                client['seq'] = datagram.seq
+                client['updated_at'] = now
+            else:
+                self._clients[datagram.client_id] = {
+                    'seq': datagram.seq,
+                    'keyframe_seq': datagram.seq,
+                    'keyframe': joints,
+                    'updated_at': now
+                }
+
+        if self.sessions is not None:
+            session_id = f"udp:{datagram.client_id}"
+            gesture, confidence = self.analyze(dequantize_dense(joints),
+                                               smooth=functools.partial(self.sessions.smooth, session_id, now=now))
+        else:
+            gesture, confidence = self.analyze(dequantize_dense(joints))
+        with self._lock:
+            self.stats["analyzed"] += 1
+        result = {
+            "client": datagram.client_id,
+            "frame": datagram.seq,
+            "gesture": gesture,
+            "confidence": confidence
+        }
+        if self.sessions is not None:
+            result.update(self.sessions.update(session_id, gesture, confidence, now))
+        return result
+
+    def evict_idle(self, now=None):
+        """清理长时间没有新帧的客户端"""
+        now = time.time() if now is None else now
+        with self._lock:
+            for client_id in [client_id for client_id, client in self._clients.items()
+                              if now - client['updated_at'] > self.client_timeout]:
+                del self._clients[client_id]
+
+    def to_dict(self):
+        with self._lock:
+            return {"clients": len(self._clients), **self.stats}
+
+
+class UdpLandmarkListener:
+    """在后台线程中接收关键点数据报，识别结果回复给发送端"""
+
+    def __init__(self, analyze, host='0.0.0.0', port=8082, sessions=None):
+        self.host = host
+        self.port = port
+        self.receiver = LandmarkReceiver(analyze, sessions=sessions)
+        self._socket = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((self.host, self.port))
+        self._socket.settimeout(0.5)
+        self.port = self._socket.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name="udp-landmarks", daemon=True)
+        self._thread.start()
+        logger.info(f"📡 UDP关键点监听: {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _serve(self):
+        last_eviction = time.time()
+        while self._running:
+            try:
+                data, address = self._socket.recvfrom(2048)
+            except socket.timeout:
+                data = None
+            except OSError:
+                break
+            if data is not None:
+                result = self.receiver.handle(data)
+                if result is not None:
+                    try:
+                        self._socket.sendto(json.dumps(result, ensure_ascii=False).encode('utf-8'), address)
+                    except OSError as e:
+                        logger.debug(f"回复数据报失败: {e}")
+            if time.time() - last_eviction > CLIENT_TIMEOUT:
+                self.receiver.evict_idle()
+                last_eviction = time.time()
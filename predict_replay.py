@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提前预测手势的回放测量
+在录制的（或合成的）关键点序列上比较 hand_predict.py 的提前预测和逐帧识别，
+统计提前时间和猜错次数，用来选择 horizon 和 min_probability
+
+用法:
+    python3 predict_replay.py frames.jsonl --fps 30 --horizon 0.1 0.2 0.3 --min-probability 0.7 0.8 0.9
+    python3 predict_replay.py --synthetic 600 --jitter 0.01
+"""
+
+import sys
+import argparse
+import functools
+
+import numpy as np
+
+from hand_recognition import analyze_hand_pose
+from hand_predict import PREDICTED_GESTURES, PREDICTION_HORIZON, MIN_PROBABILITY
+from hand_session import HandSessions
+from synthetic_hands import jitter_frames, synthetic_frames
+from udp_replay import load_frames
+
+
+def gesture_events(gestures, min_run=3):
+    """逐帧识别结果中持续至少 min_run 帧的石头/剪刀/布，返回 [(开始帧, 手势)]，相邻的相同手势合并"""
+    events = []
+    start = 0
+    for i in range(1, len(gestures) + 1):
+        if i == len(gestures) or gestures[i] != gestures[start]:
+            gesture = gestures[start]
+            if gesture in PREDICTED_GESTURES and i - start >= min_run:
+                if not events or events[-1][1] != gesture:
+                    events.append((start, gesture))
+            start = i
+    return events
+
+
+def measure_lead_time(frames, fps=30, horizon=PREDICTION_HORIZON, min_probability=MIN_PROBABILITY,
+                      smoothing=True):
+    """
+    在帧序列上比较提前预测和逐帧识别
+    逐帧识别（analyze_hand_pose，不平滑）中每个持续出现的手势记为一次出手；
+    出手前最后一段连续预测为这个手势的第一帧与逐帧识别出现这个手势的时间之差为提前量，
+    与去抖后的稳定手势出现的时间之差为 stable_lead_ms
+    返回统计字典：events 出手次数，predicted 提前预测到的次数，lead_ms 平均提前时间，false_alarms 猜错的次数
+    """
+    baseline = [analyze_hand_pose(hand)[0] for hand in frames]
+    sessions = HandSessions(smoothing=smoothing, prediction_horizon=horizon,
+                            min_prediction_probability=min_probability)
+    predictions, stable = [], []
+    for i, hand in enumerate(frames):
+        now = i / fps
+        gesture, confidence = analyze_hand_pose(hand, smooth=functools.partial(sessions.smooth, "replay", now=now))
+        result = sessions.update("replay", gesture, confidence, now)
+        predictions.append(result['predicted_gesture'])
+        stable.append(result['stable_gesture'])
+
+    events = gesture_events(baseline)
+    leads, stable_leads = [], []
+    false_alarms = 0
+    previous_start, previous_gesture = 0, None
+    for n, (start, gesture) in enumerate(events):
+        window = predictions[previous_start:start + 1]
+        # 出手之前最后一段连续预测为这个手势的帧，从这段的第一帧开始算提前量
+        frame = start
+        while frame > previous_start and predictions[frame] != gesture:
+            frame -= 1
+        first = start
+        if predictions[frame] == gesture:
+            first = frame
+            while first > previous_start and predictions[first - 1] == gesture:
+                first -= 1
+            leads.append((start - first) / fps)
+        # 相对去抖后的稳定手势（闭环对战原来出招的时刻）的提前量
+        end = events[n + 1][0] if n + 1 < len(events) else len(frames)
+        settled = next((i for i in range(start, end) if stable[i] == gesture), None)
+        if settled is not None:
+            stable_leads.append((settled - min(first, start)) / fps)
+        false_alarms += sum(1 for predicted in set(window) if predicted not in (gesture, previous_gesture)
+                            and predicted in PREDICTED_GESTURES)
+        previous_start, previous_gesture = start, gesture
+
+    return {
+        "frames": len(frames),
+        "events": len(events),
+        "predicted": sum(1 for lead in leads if lead > 0),
+        "lead_ms": float(np.mean(leads) * 1000) if leads else 0.0,
+        "max_lead_ms": float(max(leads) * 1000) if leads else 0.0,
+        "stable_lead_ms": float(np.mean(stable_leads) * 1000) if stable_leads else 0.0,
+        "false_alarms": false_alarms,
+        "horizon": horizon,
+        "min_probability": min_probability
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量提前预测手势的提前时间")
+    parser.add_argument('recording', nargs='?', help="录制文件（每行一个关键点JSON）")
+    parser.add_argument('--synthetic', type=int, default=0, help="生成N帧合成手势代替录制文件")
+    parser.add_argument('--jitter', type=float, default=0.0, help="给合成手势加上的关键点噪声")
+    parser.add_argument('--fps', type=float, default=30, help="录制帧率")
+    parser.add_argument('--horizon', type=float, nargs='+', default=[PREDICTION_HORIZON], help="外推时间（秒）")
+    parser.add_argument('--min-probability', type=float, nargs='+', default=[MIN_PROBABILITY],
+                        help="给出预测的最小概率")
+    args = parser.parse_args(argv)
+
+    if args.recording:
+        frames = load_frames(args.recording)
+    elif args.synthetic:
+        frames = jitter_frames(synthetic_frames(args.synthetic), args.jitter)
+    else:
+        parser.error("需要录制文件或 --synthetic")
+
+    print(f"📼 {len(frames)} 帧 ({args.fps:g} fps)")
+    for horizon in args.horizon:
+        for min_probability in args.min_probability:
+            stats = measure_lead_time(frames, args.fps, horizon, min_probability)
+            print(f"🔮 horizon {horizon:.2f}s, 概率 >= {min_probability:.2f}: "
+                  f"{stats['predicted']}/{stats['events']} 次提前预测, 平均提前 {stats['lead_ms']:.0f}ms "
+                  f"(最多 {stats['max_lead_ms']:.0f}ms), 比稳定手势提前 {stats['stable_lead_ms']:.0f}ms, "
+                  f"猜错 {stats['false_alarms']} 次")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
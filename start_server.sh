@@ -1,6 +1,9 @@
 #!/bin/bash
 
 # 机械臂网关服务器启动脚本
+# 默认以生产模式启动，参数会传给 gateway_server.py，例如:
+#   ./start_server.sh --threads 16
+#   ./start_server.sh --dev            # 开发模式（调试+自动重载）
 
 echo "🚀 启动机械臂网关服务器..."
 
@@ -29,4 +32,5 @@ echo ""
 echo "✅ 启动服务器..."
 echo "🔧 使用虚拟环境..."
 source venv/bin/activate
-python3 gateway_server.py
+export HAND_GATEWAY_MODE=${HAND_GATEWAY_MODE:-production}
+python3 gateway_server.py "$@"
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成手部关键点
+按每根手指的伸直程度生成21个关节的关键点字典，不需要手机和录制文件就能产生石头/剪刀/布的帧序列；
+测试和回放工具（udp_replay.py、predict_replay.py 的 --synthetic）共用
+"""
+
+import math
+import random
+
+from hand_landmarks import JOINT_KEYS
+
+# 合成手势：简化的手部骨架（手掌长度为1，y轴沿手指方向，拇指在-x一侧），
+# 手指弯曲时骨节转向摄像头，投影到画面上变短、反向，与Vision在手心朝向摄像头时看到的一样
+FINGER_JOINTS = {
+    'thumb': JOINT_KEYS[1:5],
+    'index': JOINT_KEYS[5:9],
+    'middle': JOINT_KEYS[9:13],
+    'ring': JOINT_KEYS[13:17],
+    'little': JOINT_KEYS[17:21],
+}
+# 手指根部（拇指为CMC，其余为MCP）的位置、张开角度（度）和三节骨节的长度
+FINGER_BASES = {
+    'thumb': ((-0.22, 0.18), None, (0.42, 0.32, 0.27)),
+    'index': ((-0.30, 0.95), -8, (0.45, 0.26, 0.20)),
+    'middle': ((0.00, 1.00), 0, (0.50, 0.30, 0.22)),
+    'ring': ((0.28, 0.93), 6, (0.46, 0.28, 0.20)),
+    'little': ((0.52, 0.82), 14, (0.36, 0.22, 0.18)),
+}
+# 完全弯曲时各关节的屈曲角度（度）；拇指第一节不屈曲，而是从张开(-50°)转到横过手掌(55°)
+CURL_FLEXION = (80, 100, 70)
+THUMB_FLEXION = (0, 40, 60)
+THUMB_ANGLES = (55, -50)
+SYNTHETIC_POSES = [
+    {'thumb': 0, 'index': 0, 'middle': 0, 'ring': 0, 'little': 0},   # 石头
+    {'thumb': 0, 'index': 1, 'middle': 1, 'ring': 0, 'little': 0},   # 剪刀
+    {'thumb': 1, 'index': 1, 'middle': 1, 'ring': 1, 'little': 1},   # 布
+]
+
+
+def synthetic_hand(extension, roll=0.0, scale=0.25, origin=(0.5, 0.85), confidence=0.9):
+    """
+    按每根手指的伸直程度（0弯曲-1伸直）生成21个关节的关键点字典
+    roll 为手在画面中的旋转角度（度），scale 为手掌长度（画面的比例），origin 为手腕位置
+    默认是手指朝上、位于画面中下部的手，与原来的指尖Y坐标阈值相符
+    """
+    cos_r, sin_r = math.cos(math.radians(roll)), math.sin(math.radians(roll))
+
+    def to_image(x, y):
+        return {
+            "x": origin[0] + scale * (x * cos_r - y * sin_r),
+            "y": origin[1] - scale * (x * sin_r + y * cos_r),
+            "confidence": confidence
+        }
+
+    hand = {JOINT_KEYS[0]: to_image(0.0, 0.0)}
+    for finger, keys in FINGER_JOINTS.items():
+        (x, y), angle, bones = FINGER_BASES[finger]
+        curl = 1.0 - extension[finger]
+        if finger == 'thumb':
+            angle = THUMB_ANGLES[0] + (THUMB_ANGLES[1] - THUMB_ANGLES[0]) * extension[finger]
+            flexions = THUMB_FLEXION
+        else:
+            flexions = CURL_FLEXION
+        hand[keys[0]] = to_image(x, y)
+        direction_x, direction_y = math.sin(math.radians(angle)), math.cos(math.radians(angle))
+        flexion = 0.0
+        for key, length, joint_flexion in zip(keys[1:], bones, flexions):
+            flexion += joint_flexion * curl
+            projected = length * math.cos(math.radians(flexion))
+            x += direction_x * projected
+            y += direction_y * projected
+            hand[key] = to_image(x, y)
+    return hand
+
+
+def synthetic_frames(count, frames_per_pose=30):
+    """在石头、剪刀、布之间平滑过渡的帧序列"""
+    frames = []
+    for n in range(count):
+        pose_index, step = divmod(n, frames_per_pose)
+        start = SYNTHETIC_POSES[pose_index % len(SYNTHETIC_POSES)]
+        end = SYNTHETIC_POSES[(pose_index + 1) % len(SYNTHETIC_POSES)]
+        t = min(step / (frames_per_pose / 2), 1.0)
+        frames.append(synthetic_hand({
+            finger: start[finger] + (end[finger] - start[finger]) * t for finger in start
+        }))
+    return frames
+
+
+def jitter_frames(frames, sigma, seed=627):
+    """给每个关节加上高斯噪声，模拟Vision关键点的抖动"""
+    rng = random.Random(seed)
+    return [
+        {key: dict(point, x=point['x'] + rng.gauss(0, sigma), y=point['y'] + rng.gauss(0, sigma))
+         for key, point in hand.items()}
+        for hand in frames
+    ]
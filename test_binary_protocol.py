@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试二进制串口协议
+编解码往返、校验失败后的重新同步，以及与模拟Arduino的能力协商和回退
+"""
+
+import time
+
+from arduino_simulator import SimulatedArduino
+from hand_serial import ArduinoController
+from hand_protocol import (
+    Frame, FrameDecoder, encode_frame, encode_command, decode_command, parse_capabilities,
+    FRAME_ACK, FRAME_DONE, STATUS_OK
+)
+
+
+def test_codec_round_trip():
+    """测试命令编码后能还原为原始命令"""
+    print("🧪 测试编解码往返")
+    print("=" * 50)
+
+    commands = [str(n) for n in range(10)] + [
+        "ROCK", "PAPER", "SCISSORS", "RESET", "OPENMAX", "CLOSEMAX", "PING",
+        "SERVO:0:0", "SERVO:5:180", "POSE:0,180,0,180,0,90"
+    ]
+    decoder = FrameDecoder()
+    for seq, command in enumerate(commands):
+        data = encode_command(command, seq)
+        frames = decoder.feed(data)
+        assert len(frames) == 1 and frames[0].seq == seq
+        assert decode_command(frames[0]) == command, f"往返失败: {command}"
+        text_size = len(command) + 1
+        print(f"📦 {command:24s} 文本 {text_size:2d} 字节 -> 二进制 {len(data):2d} 字节")
+
+    for command in ["HELLO", "SERVO:6:90", "SERVO:1:200", "POSE:1,2,3", "POSE:0,0,0,0,0,999"]:
+        try:
+            encode_command(command, 0)
+        except ValueError:
+            print(f"🚫 {command:24s} 不支持")
+        else:
+            raise AssertionError(f"应该拒绝: {command}")
+
+    caps, params = parse_capabilities("POSE,BIN1,BAUD=57600")
+    assert caps == {'POSE', 'BIN1'} and params == {'BAUD': '57600'}
+
+    print("✅ 编解码往返测试通过")
+
+
+def test_decoder_resync():
+    """测试分片、噪声和CRC错误后解码器能重新同步"""
+    print("\n🧪 测试解码器重新同步")
+    print("=" * 50)
+
+    ack = encode_frame(FRAME_ACK, 7)
+    done = encode_frame(FRAME_DONE, 7, [STATUS_OK])
+    corrupted = bytearray(encode_frame(FRAME_DONE, 8, [STATUS_OK]))
+    corrupted[-1] ^= 0xFF
+    stream = b"\x00\xff noise" + ack + bytes(corrupted) + done
+
+    decoder = FrameDecoder()
+    frames = []
+    for byte in stream:
+        frames.extend(decoder.feed(bytes([byte])))
+    print(f"📥 解析出 {len(frames)} 帧, CRC错误 {decoder.crc_errors} 次")
+    assert frames == [Frame(FRAME_ACK, 7), Frame(FRAME_DONE, 7, [STATUS_OK])]
+    assert decoder.crc_errors == 1
+
+    print("✅ 重新同步测试通过")
+
+
+def run_commands(controller, simulator, commands):
+    """发送命令并检查舵机状态镜像，返回每条命令的平均耗时"""
+    start = time.time()
+    for command in commands:
+        ticket = controller.send_command(command)
+        assert ticket.wait(5), f"命令超时: {command}"
+        assert ticket.status == 'completed', f"{command} -> {ticket.status} {ticket.error}"
+        assert list(controller.hand_state.current) == simulator.current_angle
+    return (time.time() - start) / len(commands)
+
+
+def test_binary_negotiation():
+    """测试与支持二进制协议的模拟器协商，并比较两种协议的耗时"""
+    print("\n⚡ 测试二进制协议协商")
+    print("=" * 50)
+
+    commands = ["ROCK", "SCISSORS", "7", "SERVO:5:45", "POSE:0,0,180,180,0,90", "PAPER"]
+    results = {}
+    for binary in (False, True):
+        with SimulatedArduino(time_warp=20) as simulator:
+            controller = ArduinoController(port=simulator.port, binary_protocol=binary)
+            assert controller.connect(), "连接模拟器失败"
+            try:
+                assert controller.protocol == ('binary' if binary else 'text')
+                assert 'BIN1' in controller.capabilities
+                sent_before = simulator.bytes_sent
+                average = run_commands(controller, simulator, commands)
+                results[controller.protocol] = (average, simulator.bytes_sent - sent_before)
+
+                if binary:
+                    ticket = controller.send_command("HELLO")
+                    print(f"📤 {'HELLO':12s} -> {ticket.status} ({ticket.error})")
+                    assert ticket.status == 'rejected'
+                    assert simulator.frames_received == len(commands) + 1  # 加上协商时的PING
+            finally:
+                controller.disconnect()
+            if binary:
+                # 断开时固件回到文本协议
+                assert not simulator.binary_mode and simulator.baudrate == 9600
+
+    for protocol, (average, received) in results.items():
+        print(f"📊 {protocol:6s}: 平均每条命令 {average * 1000:.1f}ms, 固件回复 {received} 字节")
+    assert results['binary'][1] < results['text'][1]
+
+    print("✅ 二进制协议协商测试通过")
+
+
+def test_legacy_fallback():
+    """测试第一版固件不回复 CAPS? 时回退到文本协议，收到命令的回显就结束命令"""
+    print("\n🔙 测试老固件回退")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20, firmware='v1') as simulator:
+        controller = ArduinoController(port=simulator.port, binary_protocol=True)
+        assert controller.connect(), "连接模拟器失败"
+        try:
+            print(f"🔌 协议: {controller.protocol}, 能力: {sorted(controller.capabilities)}")
+            assert controller.protocol == 'text'
+            assert not controller.capabilities and not controller.reports_completion
+            for command in ["0", "5"]:
+                start = time.time()
+                ticket = controller.send_command(command)
+                assert ticket.wait(5), f"命令超时: {command}"
+                elapsed = time.time() - start
+                print(f"📤 {command:12s} -> {ticket.status} ({elapsed * 1000:.0f}ms)")
+                assert ticket.status == 'sent' and ticket.acknowledged and ticket.error is None
+                assert elapsed < controller.completion_timeout / 2
+                # 没有完成提示，舵机状态镜像不确定
+                assert controller.hand_state.current is None
+        finally:
+            controller.disconnect()
+
+    print("✅ 老固件回退测试通过")
+
+
+def test_v2_fallback():
+    """测试v2固件把 CAPS? 当成数字手势回复"无效"：使用文本协议，仍然等待完成提示"""
+    print("\n🔙 测试v2固件回退")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20, firmware='v2') as simulator:
+        controller = ArduinoController(port=simulator.port, binary_protocol=True)
+        assert controller.connect(), "连接模拟器失败"
+        try:
+            print(f"🔌 协议: {controller.protocol}, 完成提示: {controller.reports_completion}")
+            assert controller.protocol == 'text'
+            assert not controller.capabilities and controller.reports_completion
+            for command in ["0", "5"]:
+                ticket = controller.send_command(command)
+                assert ticket.wait(5), f"命令超时: {command}"
+                print(f"📤 {command:12s} -> {ticket.status}")
+                assert ticket.status == 'completed'
+                assert list(controller.hand_state.current) == simulator.current_angle
+            # 文字命令同样被当成数字手势，固件回复"无效的数字手势"
+            ticket = controller.send_command("ROCK")
+            assert ticket.wait(5)
+            print(f"📤 {'ROCK':12s} -> {ticket.status}")
+            assert ticket.status == 'failed'
+        finally:
+            controller.disconnect()
+
+    print("✅ v2固件回退测试通过")
+
+
+if __name__ == "__main__":
+    test_codec_round_trip()
+    test_decoder_resync()
+    test_binary_negotiation()
+    test_legacy_fallback()
+    test_v2_fallback()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试asyncio版网关
+使用模拟Arduino验证串口读写由事件循环驱动，并在单个事件循环上同时处理大量请求
+"""
+
+import time
+import asyncio
+import threading
+
+import httpx
+from starlette.testclient import TestClient
+
+from arduino_simulator import SimulatedArduino
+from gateway_async import AsyncArduinoController, create_app
+from hand_recognition import analyze_hand_pose
+from gateway_common import COUNTER_GESTURES
+
+
+async def connect_controller(simulator, **kwargs):
+    controller = AsyncArduinoController(port=simulator.port, **kwargs)
+    assert await controller.connect(), "连接模拟器失败"
+    return controller
+
+
+def test_async_commands():
+    """测试命令执行结果、舵机状态镜像，以及与同步版相同的JSON响应"""
+    print("🤖 测试asyncio网关命令执行")
+    print("=" * 50)
+
+    async def run(simulator, features):
+        controller = await connect_controller(simulator)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(controller, False)),
+                                   base_url="http://gateway")
+        try:
+            print(f"🧩 固件能力: {sorted(controller.capabilities)}")
+            assert controller.uses_sequence_ids == ('SEQ' in features)
+            # 第一版固件没有完成提示，收到命令的回显就结束命令，舵机状态镜像不确定；
+            # 它把文字命令都当成数字手势而不执行，石头剪刀布只有回显
+            assert controller.reports_completion == bool(features)
+            finished = 'completed' if features else 'sent'
+            for gesture in ["石头", "剪刀", "布"]:
+                response = (await client.post('/rps', json={'gesture': gesture, 'wait': 5})).json()
+                print(f"📤 {gesture} -> {response['command_status']}")
+                assert response['success'] and response['command_status'] == finished
+                if features:
+                    assert list(controller.hand_state.current) == simulator.current_angle
+                else:
+                    assert controller.hand_state.current is None
+
+            # 第一版固件同样把不认识的文字命令当成数字手势，除了回显没有任何输出
+            response = (await client.post('/command', json={'command': 'HELLO', 'wait': 5})).json()
+            print(f"📤 HELLO -> {response['command_status']}")
+            assert response['command_status'] == ('failed' if features else 'sent')
+
+            ticket_id = (await client.post('/number', json={'number': '7'})).json()['ticket_id']
+            response = (await client.get(f'/command/{ticket_id}', params={'wait': 5})).json()
+            assert response['status'] == finished
+
+            status = (await client.get('/status')).json()
+            assert status['arduino_connected'] and status['arduino_ready']
+            assert status['protocol'] == 'text'
+        finally:
+            await client.aclose()
+            await controller.disconnect()
+
+    for firmware in ('v3', 'v1'):
+        with SimulatedArduino(time_warp=20, firmware=firmware) as simulator:
+            asyncio.run(run(simulator, simulator.features))
+
+    print("✅ asyncio网关命令测试通过")
+
+
+def test_async_concurrency():
+    """测试单个事件循环同时处理上千个等待结果的请求，不额外占用线程"""
+    print("\n⚡ 测试asyncio网关并发")
+    print("=" * 50)
+
+    requests = 1000
+
+    async def run(simulator):
+        controller = await connect_controller(simulator)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(controller, False)),
+                                   base_url="http://gateway")
+        try:
+            threads_before = threading.active_count()
+            gestures = ["石头", "剪刀", "布"]
+            start = time.time()
+            responses = await asyncio.gather(*[
+                client.post('/rps', json={'gesture': gestures[i % 3], 'wait': 8})
+                for i in range(requests)
+            ])
+            elapsed = time.time() - start
+            statuses = [response.json()['command_status'] for response in responses]
+            print(f"📊 {requests} 个请求耗时 {elapsed:.2f}s, 线程数 {threads_before} -> {threading.active_count()}")
+            print(f"📊 结果: { {status: statuses.count(status) for status in set(statuses)} }")
+            assert all(response.status_code == 200 for response in responses)
+            # 排队中的手势被最新手势合并，机械手只执行了其中几条
+            assert set(statuses) <= {'completed', 'coalesced', 'skipped'}
+            assert 'completed' in statuses
+            assert threading.active_count() <= threads_before
+            assert list(controller.hand_state.current) == simulator.current_angle
+        finally:
+            await client.aclose()
+            await controller.disconnect()
+
+    with SimulatedArduino(time_warp=20) as simulator:
+        asyncio.run(run(simulator))
+
+    print("✅ asyncio网关并发测试通过")
+
+
+HAND_FRAME = {
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKTCMC)": {"x": 0.5, "y": 0.3, "confidence": 0.9},
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKTTIP)": {"x": 0.4, "y": 0.7, "confidence": 0.85},
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKITIP)": {"x": 0.5, "y": 0.35, "confidence": 0.95},
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKMTIP)": {"x": 0.5, "y": 0.35, "confidence": 0.95},
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKRTIP)": {"x": 0.5, "y": 0.7, "confidence": 0.85},
+    "VNHumanHandPoseObservationJointName(_rawValue: VNHLKPTIP)": {"x": 0.5, "y": 0.7, "confidence": 0.85}
+}
+
+
+def test_hand_stream():
+    """测试WebSocket关键点流：逐帧按顺序返回识别结果，并推送Arduino事件"""
+    print("\n📡 测试WebSocket关键点流")
+    print("=" * 50)
+
+    frames = 200
+    expected, confidence = analyze_hand_pose(HAND_FRAME)
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = AsyncArduinoController(port=simulator.port)
+        with TestClient(create_app(controller, False)) as client:
+            # 控制器必须连接在应用所在的事件循环上
+            assert client.portal.call(controller.connect), "连接模拟器失败"
+            with client.websocket_connect('/ws/hand?events=1') as websocket:
+                start = time.time()
+                for frame in range(frames):
+                    websocket.send_json({"frame": frame, "hand": HAND_FRAME})
+                results = [websocket.receive_json() for _ in range(frames)]
+                elapsed = time.time() - start
+                print(f"📊 {frames} 帧耗时 {elapsed:.2f}s ({frames / elapsed:.0f} fps)")
+                assert [result['frame'] for result in results] == list(range(frames))
+                assert all(result['success'] and (result['gesture'], result['confidence']) == (expected, confidence)
+                           for result in results)
+
+                # 不带帧序号时与 /analyze_hand 的请求体相同
+                websocket.send_json(HAND_FRAME)
+                assert websocket.receive_json()['gesture'] == expected
+                websocket.send_text("not json")
+                assert websocket.receive_json()['success'] is False
+
+                # 上电姿态就是布，发石头才会真正动作
+                response = client.post('/rps', json={'gesture': '石头'})
+                assert response.json()['command_status'] != 'skipped'
+                kinds = []
+                while 'completed' not in kinds:
+                    message = websocket.receive_json()
+                    assert message['type'] == 'event'
+                    kinds.append(message['kind'])
+                print(f"📥 推送的串口事件: {kinds}")
+                assert 'received' in kinds
+
+            # 带会话ID时同一连接上的帧一起去抖，只有稳定手势第一次出现时 gesture_changed 为True
+            with client.websocket_connect('/ws/hand?session=ws-1') as websocket:
+                for frame in range(10):
+                    websocket.send_json({"frame": frame, "hand": HAND_FRAME})
+                results = [websocket.receive_json() for _ in range(10)]
+                assert all(result['session'] == 'ws-1' for result in results)
+                assert [result['gesture_changed'] for result in results].count(True) == 1
+                assert results[-1]['stable_gesture'] == expected
+
+            # 闭环对战：稳定手势出现的那一帧在同一条结果中返回机械手的动作
+            with client.websocket_connect('/ws/hand?session=ws-2&counter=1') as websocket:
+                for frame in range(10):
+                    websocket.send_json({"frame": frame, "hand": HAND_FRAME})
+                actuations = [websocket.receive_json()['actuation'] for _ in range(10)]
+                actuations = [actuation for actuation in actuations if actuation is not None]
+                assert [actuation['gesture'] for actuation in actuations] == [COUNTER_GESTURES[expected]]
+                assert actuations[0]['success']
+
+    print("✅ WebSocket关键点流测试通过")
+
+
+if __name__ == "__main__":
+    test_async_commands()
+    test_async_concurrency()
+    test_hand_stream()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试批量手势识别
+批量结果必须与逐帧的 analyze_hand_pose 完全相同（使用 test_scissors_accuracy.py 和
+test_pinky_finger.py 中的测试数据），并比较两者的吞吐量
+"""
+
+import ast
+import json
+import base64
+import time
+import random
+import logging
+
+from gateway_server import app
+from hand_recognition import analyze_hand_pose, analyze_compact_hand
+from hand_batch import analyze_hands
+from hand_landmarks import COMPACT_CONTENT_TYPE, JOINT_KEYS, encode_compact_payload
+from synthetic_hands import synthetic_frames
+
+
+def load_fixtures(*paths):
+    """读取测试脚本中 {"name": ..., "data": 关键点字典} 形式的测试数据"""
+    fixtures = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.List):
+                try:
+                    cases = ast.literal_eval(node.value)
+                except ValueError:
+                    continue
+                fixtures.extend(case for case in cases if isinstance(case, dict) and 'data' in case)
+    return fixtures
+
+
+def random_frames(count, seed=627):
+    """在各个阈值附近随机生成的帧，包括缺失指尖和低置信度"""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        hand = {}
+        for key in JOINT_KEYS:
+            if rng.random() < 0.03:
+                continue
+            hand[key] = {
+                "x": rng.choice([0.3, rng.uniform(0.2, 0.8)]),
+                "y": rng.choice([0.45, 0.6, 0.95, rng.uniform(0.1, 1.0)]),
+                "confidence": rng.choice([0.4, rng.uniform(0.2, 1.0)])
+            }
+        frames.append(hand)
+    frames.append({JOINT_KEYS[4]: "bad"})
+    frames.append("not a dict")
+    return frames
+
+
+def test_batch_matches_scalar():
+    """测试批量识别与逐帧识别结果相同"""
+    print("🧪 测试批量识别结果")
+    print("=" * 50)
+
+    fixtures = load_fixtures('test_scissors_accuracy.py', 'test_pinky_finger.py')
+    assert len(fixtures) >= 15
+    frames = [case['data'] for case in fixtures]
+    gestures, confidences = analyze_hands(frames)
+    for case, gesture, confidence in zip(fixtures, gestures, confidences):
+        print(f"🎯 {case['name']:28s} -> {gesture} ({confidence})")
+        assert (gesture, confidence) == analyze_hand_pose(case['data'])
+
+    frames = synthetic_frames(90) + random_frames(2000)
+    expected = [analyze_hand_pose(hand) for hand in frames]
+    assert list(zip(*analyze_hands(frames))) == expected
+    print(f"✅ {len(fixtures)} 个测试数据和 {len(frames)} 个随机帧结果一致")
+
+
+def test_batch_endpoint():
+    """测试 /analyze_hand_batch 的三种请求格式和吞吐量"""
+    print("\n⚡ 测试批量识别接口")
+    print("=" * 50)
+
+    client = app.test_client()
+    frames = random_frames(1000, seed=1)
+    arrays = [encode_compact_payload(hand) for hand in frames[:-2]]
+    packed = [encode_compact_payload(hand, packed=True) for hand in frames[:-2]]
+    requests = {
+        'dict': ({"frames": frames}, 'application/json',
+                 [analyze_hand_pose(hand) for hand in frames]),
+        'arrays': ({field: [payload[field] for payload in arrays] for field in ('x', 'y', 'conf')},
+                   COMPACT_CONTENT_TYPE, [analyze_compact_hand(payload) for payload in arrays]),
+        'f32': ({"f32": base64.b64encode(b''.join(base64.b64decode(payload['f32']) for payload in packed))
+                 .decode('ascii')}, COMPACT_CONTENT_TYPE, [analyze_compact_hand(payload) for payload in packed]),
+    }
+    for name, (payload, content_type, expected_results) in requests.items():
+        response = client.post('/analyze_hand_batch', data=json.dumps(payload), content_type=content_type)
+        result = response.get_json()
+        assert result['success'], result
+        assert result['count'] == len(expected_results)
+        assert list(zip(result['gestures'], result['confidences'])) == expected_results, name
+
+    response = client.post('/analyze_hand_batch', json={"frames": "nope"}).get_json()
+    assert response['success'] is False
+
+    # 吞吐量：逐帧识别会为每帧输出日志，计时时关闭
+    logging.disable(logging.INFO)
+    try:
+        frames = synthetic_frames(3000)
+        start = time.perf_counter()
+        for hand in frames:
+            analyze_hand_pose(hand)
+        scalar = len(frames) / (time.perf_counter() - start)
+        start = time.perf_counter()
+        analyze_hands(frames)
+        batch = len(frames) / (time.perf_counter() - start)
+    finally:
+        logging.disable(logging.NOTSET)
+    print(f"📊 逐帧 {scalar:,.0f} 帧/秒, 批量 {batch:,.0f} 帧/秒 ({batch / scalar:.1f}x)")
+    assert batch > scalar
+
+    print("✅ 批量识别接口测试通过")
+
+
+if __name__ == "__main__":
+    test_batch_matches_scalar()
+    test_batch_endpoint()
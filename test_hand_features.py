@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试手部几何特征
+旋转、缩放、平移后的合成手势都按几何特征识别正确；只有指尖或手掌关节不可靠时仍按指尖坐标识别
+"""
+
+import time
+import logging
+
+import numpy as np
+
+from hand_recognition import analyze_hand_pose, classify_fingertips
+from hand_batch import analyze_hands, stack_hands
+from hand_features import hand_features, fingers_extended
+from hand_landmarks import JOINT_KEYS, FINGERTIP_INDICES, normalize_hand
+from test_hand_batch import load_fixtures
+from synthetic_hands import synthetic_hand, synthetic_frames, SYNTHETIC_POSES
+
+EXPECTED = [("石头", 0.9), ("剪刀", 0.95), ("布", 0.9)]
+
+
+def fingertips_only(hand):
+    return {JOINT_KEYS[i]: hand[JOINT_KEYS[i]] for i in FINGERTIP_INDICES}
+
+
+def posed_frames():
+    """三种手势在不同旋转角度、大小和位置下的帧，返回 [(帧, 期望结果)]"""
+    frames = []
+    for pose, expected in zip(SYNTHETIC_POSES, EXPECTED):
+        for roll in range(-90, 91, 15):
+            for scale, origin in ((0.25, (0.5, 0.85)), (0.1, (0.3, 0.6)), (0.35, (0.6, 1.0)), (0.15, (0.5, 0.95))):
+                frames.append((synthetic_hand(pose, roll=roll, scale=scale, origin=origin), expected))
+    return frames
+
+
+def rotate_hand(hand, roll):
+    """把帧绕手腕旋转 roll 度"""
+    wrist = hand[JOINT_KEYS[0]]
+    cos_r, sin_r = np.cos(np.radians(roll)), np.sin(np.radians(roll))
+    rotated = {}
+    for key, point in hand.items():
+        dx, dy = point['x'] - wrist['x'], point['y'] - wrist['y']
+        rotated[key] = dict(point, x=wrist['x'] + dx * cos_r - dy * sin_r, y=wrist['y'] + dx * sin_r + dy * cos_r)
+    return rotated
+
+
+def test_invariant_recognition():
+    """测试几何特征识别与手的旋转、大小和位置无关"""
+    print("🧪 测试几何特征识别")
+    print("=" * 50)
+
+    logging.disable(logging.INFO)
+    try:
+        frames = posed_frames()
+        geometric = sum(analyze_hand_pose(hand) == expected for hand, expected in frames)
+        tips_only = sum(analyze_hand_pose(fingertips_only(hand)) == expected for hand, expected in frames)
+    finally:
+        logging.disable(logging.NOTSET)
+    print(f"🎯 {len(frames)} 帧: 几何特征正确 {geometric}, 只用指尖坐标正确 {tips_only}")
+    assert geometric == len(frames)
+    assert tips_only < geometric
+
+    # 批量识别使用相同的特征
+    hands = [hand for hand, _ in frames]
+    assert list(zip(*analyze_hands(hands))) == [expected for _, expected in frames]
+
+    # 特征本身与旋转和缩放无关
+    points, _, _ = stack_hands([synthetic_hand(SYNTHETIC_POSES[1], roll=roll, scale=scale)
+                                for roll, scale in ((0, 0.25), (60, 0.1), (-120, 0.4))])
+    curl, reach, thumb_spread, scale = hand_features(points)
+    assert np.allclose(curl, curl[0]) and np.allclose(reach, reach[0]) and np.allclose(thumb_spread, thumb_spread[0])
+    assert np.allclose(scale, [0.25, 0.1, 0.4])
+    print(f"📐 剪刀: 弯曲 {np.round(curl[0]).tolist()}°, 伸展 {np.round(reach[0], 2).tolist()}")
+
+    # 手势过渡中间的帧：几何特征得到的模糊结果（置信度低于0.9）更少
+    logging.disable(logging.INFO)
+    try:
+        sequence = [rotate_hand(hand, roll) for hand, roll in
+                    zip(synthetic_frames(180), np.linspace(-40, 40, 180))]
+        ambiguous = {
+            'geometric': sum(analyze_hand_pose(hand)[1] < 0.9 for hand in sequence),
+            'tips': sum(analyze_hand_pose(fingertips_only(hand))[1] < 0.9 for hand in sequence),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+    print(f"📊 {len(sequence)} 帧手势过渡中的模糊帧: 几何特征 {ambiguous['geometric']}, 指尖坐标 {ambiguous['tips']}")
+    assert ambiguous['geometric'] < ambiguous['tips']
+
+    points, present, _ = stack_hands(hands)
+    rounds = 20
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fingers_extended(points, present)
+    per_frame = (time.perf_counter() - start) / (rounds * len(hands)) * 1e6
+    print(f"⏱️ 批量特征计算 {per_frame:.2f}us/帧")
+
+    print("✅ 几何特征识别测试通过")
+
+
+def test_fingertip_fallback():
+    """测试只有指尖或手掌关节不可靠时按原来的指尖坐标识别"""
+    print("\n🧪 测试指尖坐标回退")
+    print("=" * 50)
+
+    for case in load_fixtures('test_scissors_accuracy.py', 'test_pinky_finger.py'):
+        tips = normalize_hand(case['data']).fingertips()
+        assert analyze_hand_pose(case['data']) == classify_fingertips(tips), case['name']
+
+    # 手掌关节置信度太低时不使用几何特征
+    hand = synthetic_hand(SYNTHETIC_POSES[1], roll=90)
+    hand[JOINT_KEYS[9]] = dict(hand[JOINT_KEYS[9]], confidence=0.1)
+    points, present, _ = stack_hands([hand])
+    _, _, geometric = fingers_extended(points, present)
+    assert not geometric[0]
+    assert analyze_hand_pose(hand) == classify_fingertips(normalize_hand(hand).fingertips())
+
+    # 指尖置信度太低的手指仍然算弯曲
+    hand = synthetic_hand(SYNTHETIC_POSES[2])
+    for i in FINGERTIP_INDICES[2:]:
+        hand[JOINT_KEYS[i]] = dict(hand[JOINT_KEYS[i]], confidence=0.3)
+    assert analyze_hand_pose(hand) == ("剪刀", 0.9)
+
+    print("✅ 指尖坐标回退测试通过")
+
+
+if __name__ == "__main__":
+    test_invariant_recognition()
+    test_fingertip_fallback()
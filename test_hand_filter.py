@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试关键点平滑
+静止的手抖动被滤掉、移动的手跟得上；槽位随会话分配和回收；
+加了抖动的合成手势序列平滑后误识别更少，稳定手势更快得到
+"""
+
+import logging
+import functools
+
+import numpy as np
+
+from hand_recognition import analyze_hand_pose
+from hand_filter import LandmarkFilterBank, MAX_GAP
+from hand_landmarks import JOINT_COUNT, normalize_hand
+from hand_session import HandSessions
+from synthetic_hands import jitter_frames, synthetic_frames
+
+FPS = 30
+
+
+def test_filter():
+    """测试抖动抑制、移动跟随和缺失关节"""
+    print("🧪 测试One-Euro滤波")
+    print("=" * 50)
+
+    rng = np.random.default_rng(627)
+    bank = LandmarkFilterBank(4)
+    slot = bank.acquire()
+    mask = np.ones(JOINT_COUNT, dtype=bool)
+
+    # 静止的手：输出接近真实位置
+    truth = rng.uniform(0.2, 0.8, (JOINT_COUNT, 2))
+    raw_error, filtered_error = [], []
+    for i in range(120):
+        noisy = truth + rng.normal(0, 0.01, truth.shape)
+        filtered = bank.filter(slot, noisy, mask, i / FPS)
+        if i >= 30:
+            raw_error.append(np.abs(noisy - truth).mean())
+            filtered_error.append(np.abs(filtered - truth).mean())
+    print(f"📉 静止: 原始误差 {np.mean(raw_error):.4f}, 平滑后 {np.mean(filtered_error):.4f}")
+    assert np.mean(filtered_error) < np.mean(raw_error) * 0.6
+
+    # 快速移动的手（每秒移动半个画面）：滞后不超过两帧的位移
+    lag = []
+    for i in range(120, 150):
+        moved = truth + 0.5 * (i - 120) / FPS
+        filtered = bank.filter(slot, moved, mask, i / FPS)
+        lag.append(np.abs(filtered - moved).mean())
+    print(f"🏃 移动: 平均滞后 {np.mean(lag[10:]):.4f} (每帧移动 {0.5 / FPS:.4f})")
+    assert np.mean(lag[10:]) < 2 * 0.5 / FPS
+
+    # 本帧没有的关节输出原始值，也不更新状态
+    before = bank.values[slot].copy()
+    mask[4] = False
+    filtered = bank.filter(slot, np.full((JOINT_COUNT, 2), 0.9), mask, 150 / FPS)
+    assert np.allclose(filtered[4], 0.9) and np.allclose(bank.values[slot][4], before[4])
+
+    # 间隔太久时从头开始
+    filtered = bank.filter(slot, truth, np.ones(JOINT_COUNT, dtype=bool), 150 / FPS + MAX_GAP + 1)
+    assert np.allclose(filtered, truth)
+
+    print("✅ One-Euro滤波测试通过")
+
+
+def test_session_slots():
+    """测试会话的滤波槽位分配、清理和复用"""
+    print("\n🧪 测试滤波槽位")
+    print("=" * 50)
+
+    sessions = HandSessions(timeout=5.0, max_sessions=2)
+    hand = normalize_hand(synthetic_frames(1)[0])
+    sessions.smooth("a", hand, now=1.0)
+    sessions.smooth("b", hand, now=1.0)
+    sessions.smooth("c", hand, now=2.0)      # 超过上限，丢弃最久的会话a
+    assert sessions.filters.in_use == 2
+    sessions.evict_idle(now=10.0)
+    assert sessions.filters.in_use == 0
+    smoothed = sessions.smooth("d", hand, now=10.0)
+    assert smoothed.xs == hand.xs and smoothed.present == hand.present
+    print(f"📊 {sessions.to_dict()}")
+
+    print("✅ 滤波槽位测试通过")
+
+
+def run_session(frames, smoothing):
+    """按30fps把帧送入一个会话，返回 (原始结果, 稳定手势)"""
+    sessions = HandSessions(smoothing=smoothing)
+    raw, stable = [], []
+    for i, hand in enumerate(frames):
+        smooth = functools.partial(sessions.smooth, "phone", now=i / FPS)
+        gesture, confidence = analyze_hand_pose(hand, smooth=smooth)
+        raw.append(gesture)
+        stable.append(sessions.update("phone", gesture, confidence, now=i / FPS)['stable_gesture'])
+    return raw, stable
+
+
+def decision_delays(truth, stable):
+    """每次真实手势变化后，稳定手势跟上所需的帧数"""
+    delays = []
+    for i in range(1, len(truth)):
+        if truth[i] != truth[i - 1]:
+            delay = next((j - i for j in range(i, len(truth)) if stable[j] == truth[i]), len(truth) - i)
+            delays.append(delay)
+    return delays
+
+
+def test_recognition_with_jitter():
+    """测试平滑对抖动手势序列识别的改善"""
+    print("\n🎯 测试抖动下的识别")
+    print("=" * 50)
+
+    clean = synthetic_frames(300)
+    logging.disable(logging.INFO)
+    try:
+        truth = [analyze_hand_pose(hand)[0] for hand in clean]
+        noisy = jitter_frames(clean, 0.015)
+        results = {smoothing: run_session(noisy, smoothing) for smoothing in (False, True)}
+    finally:
+        logging.disable(logging.NOTSET)
+
+    summary = {}
+    for smoothing, (raw, stable) in results.items():
+        errors = sum(gesture != expected for gesture, expected in zip(raw, truth))
+        delays = decision_delays(truth, stable)
+        summary[smoothing] = (errors, np.mean(delays))
+        print(f"📊 {'平滑' if smoothing else '不平滑'}: 误识别 {errors}/{len(truth)} 帧, "
+              f"稳定手势平均延迟 {np.mean(delays):.1f} 帧")
+    assert summary[True][0] < summary[False][0] / 2
+    assert summary[True][1] <= summary[False][1]
+
+    print("✅ 抖动下的识别测试通过")
+
+
+if __name__ == "__main__":
+    test_filter()
+    test_session_slots()
+    test_recognition_with_jitter()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试手部关键点格式
+关节名索引、紧凑格式（数组 / base64 float32）与Vision键字典的识别结果一致，请求体大小对比
+"""
+
+import json
+import time
+
+from gateway_server import app
+from hand_recognition import analyze_hand_pose, classify_fingertips
+from hand_landmarks import (
+    COMPACT_CONTENT_TYPE, JOINT_INDEX, JOINT_NAMES, JOINT_KEYS, JOINT_SHORT_NAMES,
+    encode_compact_payload, normalize_hand
+)
+from synthetic_hands import synthetic_frames
+
+
+def post_hand(client, payload, content_type='application/json'):
+    body = json.dumps(payload, separators=(',', ':'))
+    response = client.post('/analyze_hand', data=body, content_type=content_type)
+    return response.get_json(), len(body)
+
+
+def test_compact_payload():
+    """测试紧凑格式与Vision键字典的识别结果一致"""
+    print("🧪 测试紧凑关键点格式")
+    print("=" * 50)
+
+    client = app.test_client()
+    sizes = {'dict': 0, 'arrays': 0, 'f32': 0}
+    for hand in synthetic_frames(90)[::3]:
+        expected, _ = post_hand(client, hand)
+        assert expected['success'] and expected['gesture'] == analyze_hand_pose(hand)[0]
+        sizes['dict'] += post_hand(client, hand)[1]
+        for name, packed in (('arrays', False), ('f32', True)):
+            result, size = post_hand(client, encode_compact_payload(hand, packed), COMPACT_CONTENT_TYPE)
+            assert result == expected, f"{name}: {result} != {expected}"
+            sizes[name] += size
+
+    for name, size in sizes.items():
+        print(f"📦 {name:6s}: {size / 30:.0f} 字节/帧 ({sizes['dict'] / size:.1f}x)")
+    assert sizes['dict'] / sizes['f32'] > 4
+
+    # 只有部分关节时，缺失的指尖置信度为0，与字典中缺少键相同
+    hand = synthetic_frames(1)[0]
+    del hand[next(key for key in hand if key.endswith('VNHLKITIP)'))]
+    result, _ = post_hand(client, encode_compact_payload(hand), COMPACT_CONTENT_TYPE)
+    assert result['gesture'] == analyze_hand_pose(hand)[0] == "等待识别..."
+
+    for payload in ({"x": [0.5] * 3, "y": [0.5] * 3, "conf": [1] * 3}, {"f32": "not base64"}, [1, 2, 3]):
+        result, _ = post_hand(client, payload, COMPACT_CONTENT_TYPE)
+        print(f"🚫 {str(payload)[:30]:30s} -> {result['error']}")
+        assert result['success'] is False
+
+    print("✅ 紧凑关键点格式测试通过")
+
+
+def scan_fingertips(hand_data):
+    """原来的做法：每个键做多次子串匹配找五个指尖"""
+    tips = [None] * 5
+    names = ['thumbTip', 'indexTip', 'middleTip', 'ringTip', 'pinkyTip']
+    raw_names = ['VNHLKTTIP', 'VNHLKITIP', 'VNHLKMTIP', 'VNHLKRTIP', 'VNHLKPTIP']
+    for key, value in hand_data.items():
+        for i, (name, raw_name) in enumerate(zip(names, raw_names)):
+            if name in str(key) or f'VNHumanHandPoseObservationJointName(_rawValue: {raw_name})' in str(key):
+                tips[i] = value
+                break
+    return tips
+
+
+def test_joint_index():
+    """测试关节名索引：三种命名方式得到相同的关节，不认识的键只计数"""
+    print("\n🧪 测试关节名索引")
+    print("=" * 50)
+
+    for i, (name, key, short_name) in enumerate(zip(JOINT_NAMES, JOINT_KEYS, JOINT_SHORT_NAMES)):
+        assert JOINT_INDEX[name] == JOINT_INDEX[key] == JOINT_INDEX[short_name] == i
+    assert JOINT_INDEX['pinkyTip'] == JOINT_INDEX['littleTip']
+
+    frames = synthetic_frames(90)
+    for hand in frames:
+        by_short_name = {JOINT_SHORT_NAMES[JOINT_INDEX[key]]: point for key, point in hand.items()}
+        by_raw_name = {JOINT_NAMES[JOINT_INDEX[key]]: point for key, point in hand.items()}
+        expected = analyze_hand_pose(hand)
+        assert analyze_hand_pose(by_short_name) == expected
+        assert analyze_hand_pose(by_raw_name) == expected
+        assert normalize_hand(hand).fingertips() == scan_fingertips(hand)
+        assert classify_fingertips(normalize_hand(hand).fingertips()) == classify_fingertips(scan_fingertips(hand))
+
+    hand = dict(frames[0], timestamp=1.0, chirality="left")
+    assert normalize_hand(hand).unknown_keys == 2
+    assert analyze_hand_pose(hand) == analyze_hand_pose(frames[0])
+
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for hand in frames:
+            scan_fingertips(hand)
+    scan_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for hand in frames:
+            normalize_hand(hand).fingertips()
+    index_time = time.perf_counter() - start
+    per_frame = 1e6 / (rounds * len(frames))
+    print(f"⏱️ 子串匹配 {scan_time * per_frame:.1f}us/帧, 索引查找 {index_time * per_frame:.1f}us/帧")
+
+    print("✅ 关节名索引测试通过")
+
+
+if __name__ == "__main__":
+    test_compact_payload()
+    test_joint_index()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试提前预测手势
+手指伸展轨迹外推后能在手势做完之前给出预测；合成序列上比逐帧识别和稳定手势更早；
+闭环对战带 predict=1 时机械手在稳定手势出现之前出招，稳定手势出现时不再重复出招，
+手离开画面后下一局出同样的手势照样出招
+"""
+
+import sys
+import logging
+import functools
+
+import numpy as np
+import pytest
+
+from arduino_simulator import SimulatedArduino
+from gateway_server import app
+from hand_serial import ArduinoController
+from hand_recognition import analyze_hand_pose
+from gateway_common import counter_target
+from hand_landmarks import normalize_hand
+from hand_predict import GesturePredictor, gesture_probabilities, hand_extension, MAX_GAP
+from hand_session import HandSessions, SESSION_HEADER, NO_GESTURE
+from predict_replay import measure_lead_time
+from synthetic_hands import jitter_frames, synthetic_frames
+
+FPS = 30
+
+
+def test_predictor():
+    """测试伸展程度、模板概率和轨迹外推"""
+    print("🧪 测试手势预测")
+    print("=" * 50)
+
+    frames = synthetic_frames(31)
+    fist = hand_extension(normalize_hand(frames[0]))
+    scissors = hand_extension(normalize_hand(frames[30]))
+    print(f"✊ {fist.round(2)}  ✌️ {scissors.round(2)}")
+    assert gesture_probabilities(np.array([fist, scissors])).argmax(axis=1).tolist() == [0, 1]
+
+    # 食指和中指正在伸直，离剪刀还差一半时就预测为剪刀
+    predictor = GesturePredictor(horizon=0.2, min_probability=0.9)
+    assert predictor.predict() == (None, 0.0)
+    for i in range(5):
+        predictor.observe(np.array([0, 0.1 * i, 0.1 * i, 0, 0]), i / FPS)
+    gesture, probability = predictor.predict()
+    print(f"🔮 伸展到 0.4 时预测 {gesture} ({probability:.3f})")
+    assert gesture == "剪刀" and probability >= 0.9
+
+    # 不外推时还是石头和剪刀之间，概率不够
+    predictor.horizon = 0.0
+    assert predictor.predict()[0] is None
+
+    # 很久没有新的一帧时轨迹已经过时，间隔太久时从头开始
+    assert predictor.predict(now=4 / FPS + MAX_GAP + 1) == (None, 0.0)
+    predictor.observe(np.ones(5), 4 / FPS + MAX_GAP + 1)
+    assert predictor.count == 1 and predictor.predict() == (None, 0.0)
+
+    # 会话结果中带有预测
+    sessions = HandSessions()
+    for i, hand in enumerate(frames[:5]):
+        sessions.smooth("a", normalize_hand(hand), now=i / FPS)
+        result = sessions.update("a", "石头", 0.9, now=i / FPS)
+    assert result['predicted_gesture'] == "石头" and result['prediction_probability'] >= 0.9
+    assert sessions.update("b", "石头", 0.9, now=0.0)['predicted_gesture'] == NO_GESTURE
+
+    print("✅ 手势预测测试通过")
+
+
+def test_lead_time():
+    """测试合成序列上的提前量和概率阈值的取舍"""
+    print("\n⏱️ 测试提前量")
+    print("=" * 50)
+
+    frames = jitter_frames(synthetic_frames(300), 0.01)
+    stats = {min_probability: measure_lead_time(frames, FPS, horizon=0.2, min_probability=min_probability)
+             for min_probability in (0.7, 0.9)}
+    baseline = measure_lead_time(frames, FPS, horizon=0.0, min_probability=0.9)
+    for name, result in [("不外推", baseline), ("p>=0.7", stats[0.7]), ("p>=0.9", stats[0.9])]:
+        print(f"📊 {name}: {result['predicted']}/{result['events']} 次提前预测, 平均提前 {result['lead_ms']:.0f}ms, "
+              f"比稳定手势提前 {result['stable_lead_ms']:.0f}ms, 猜错 {result['false_alarms']} 次")
+
+    assert stats[0.9]['predicted'] > stats[0.9]['events'] / 2
+    assert stats[0.9]['lead_ms'] > baseline['lead_ms'] > 0
+    assert stats[0.9]['stable_lead_ms'] > stats[0.9]['lead_ms']
+    assert stats[0.9]['false_alarms'] <= stats[0.7]['false_alarms']
+    assert stats[0.9]['lead_ms'] <= stats[0.7]['lead_ms']
+
+    print("✅ 提前量测试通过")
+
+
+def test_repeated_gesture():
+    """测试连续两局出同样的手势：中间手离开画面，第二局照样提前出招"""
+    print("\n🔁 测试连续出同样的手势")
+    print("=" * 50)
+
+    # 从握拳伸出食指和中指到剪刀，两局之间有1秒没有手
+    scissors = synthetic_frames(30)[10:]
+    sessions = HandSessions()
+    claims, gap_predictions = [], set()
+    frame = 0
+    for round_frames in (scissors, [None] * FPS, scissors):
+        for hand in round_frames:
+            now = frame / FPS
+            if hand is None:
+                result = sessions.update("a", NO_GESTURE, 0.0, now)
+                gap_predictions.add(result['predicted_gesture'])
+            else:
+                gesture, confidence = analyze_hand_pose(hand, smooth=functools.partial(sessions.smooth, "a", now=now))
+                result = sessions.update("a", gesture, confidence, now)
+            human = counter_target(result, sessions)
+            if human is not None:
+                claims.append((frame, human))
+            frame += 1
+
+    print(f"🤖 出招: {claims}")
+    assert [human for _, human in claims] == ["剪刀", "剪刀"]
+    assert claims[1][0] > len(scissors) + FPS
+    # 手离开画面后不再沿用之前的轨迹预测
+    assert NO_GESTURE in gap_predictions
+
+    print("✅ 连续出同样的手势测试通过")
+
+
+def play(client, frames, session, predict):
+    """逐帧调用 /analyze_hand 闭环对战，返回 [(帧序号, 人的手势, 动作结果)] 和稳定手势变化的帧序号"""
+    url = '/analyze_hand?counter=1&wait=5' + ('&predict=1' if predict else '')
+    rounds, changes = [], []
+    for i, hand in enumerate(frames):
+        result = client.post(url, json=hand, headers={SESSION_HEADER: session}).get_json()
+        if result['gesture_changed']:
+            changes.append(i)
+        if result['actuation'] is not None:
+            human = result['stable_gesture'] if result['gesture_changed'] else result['predicted_gesture']
+            rounds.append((i, human, result['actuation']))
+    return rounds, changes
+
+
+def test_early_counter(gateway_controller):
+    """测试按预测提前出招"""
+    print("\n🎮 测试提前出招")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = ArduinoController(port=simulator.port)
+        assert controller.connect(), "连接模拟器失败"
+        gateway_controller(controller)
+        try:
+            client = app.test_client()
+            frames = synthetic_frames(90)
+            logging.disable(logging.INFO)
+            try:
+                stable_rounds, changes = play(client, frames, "stable", predict=False)
+                early_rounds, _ = play(client, frames, "early", predict=True)
+            finally:
+                logging.disable(logging.NOTSET)
+
+            for frame, human, actuation in early_rounds:
+                print(f"🤖 第 {frame} 帧预测人出 {human} -> 机械手出 {actuation['gesture']} "
+                      f"({actuation['command_status']})")
+            print(f"📊 稳定手势出招的帧: {[frame for frame, _, _ in stable_rounds]}")
+
+            # 每局在稳定手势出现之前最后一次出招针对的就是这一局的手势（猜错时中途改招），
+            # 之后稳定手势出现时不再重复出招
+            assert [frame for frame, _, _ in stable_rounds] == changes
+            for stable_frame, human, stable_actuation in stable_rounds:
+                frame, predicted, actuation = [early for early in early_rounds if early[0] <= stable_frame][-1]
+                assert frame < stable_frame and predicted == human
+                assert actuation['gesture'] == stable_actuation['gesture']
+            assert len(early_rounds) <= len(stable_rounds) + 1
+            assert all(actuation['success'] for _, _, actuation in early_rounds)
+            assert list(controller.hand_state.current) == simulator.current_angle
+        finally:
+            controller.disconnect()
+
+    print("✅ 提前出招测试通过")
+
+
+if __name__ == "__main__":
+    # test_early_counter 需要 conftest.py 中的夹具，通过pytest运行
+    sys.exit(pytest.main([__file__, "-s"]))
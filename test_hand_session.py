@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试手势会话去抖
+手在两个手势之间来回跳时稳定手势不变，每局只产生一次手势变化；会话互不影响并会超时清理
+"""
+
+import sys
+import random
+import functools
+
+import pytest
+
+from arduino_simulator import SimulatedArduino
+from gateway_server import app
+from hand_serial import ArduinoController
+from hand_recognition import analyze_hand_pose, analyze_dense_hand
+from gateway_common import GESTURE_MAPPING
+from hand_session import GestureDebouncer, HandSessions, SESSION_HEADER, NO_GESTURE
+from hand_udp import LandmarkReceiver, FrameEncoder, quantize_hand, dequantize_hand
+from synthetic_hands import synthetic_frames
+
+
+def game_rounds(moves, seed=627):
+    """模拟几局游戏的逐帧识别结果：手进入画面、在石头和剪刀之间犹豫、出手（夹杂误识别）、收回"""
+    rng = random.Random(seed)
+    frames = []
+    for move in moves:
+        frames += [("等待识别...", 0.0)] * 6
+        frames += [("石头", 0.6) if rng.random() < 0.5 else ("剪刀", 0.7) for _ in range(10)]
+        for _ in range(25):
+            if rng.random() < 0.2:
+                frames.append(rng.choice([("石头", 0.6), ("剪刀", 0.7), ("布", 0.9)]))
+            else:
+                frames.append((move, 0.95 if move == "剪刀" else 0.9))
+    frames += [("等待识别...", 0.0)] * 6
+    return frames
+
+
+def dequantized(frames):
+    return [dequantize_hand(quantize_hand(hand)) for hand in frames]
+
+
+def count_changes(gestures):
+    return sum(1 for before, after in zip(gestures, gestures[1:]) if after != before)
+
+
+def test_debounce():
+    """测试滑动窗口投票和滞回"""
+    print("🧪 测试手势去抖")
+    print("=" * 50)
+
+    moves = ["剪刀", "布", "布", "石头", "剪刀"]
+    frames = game_rounds(moves)
+    debouncer = GestureDebouncer()
+    stable = []
+    changed_to = []
+    for gesture, confidence in frames:
+        if debouncer.update(gesture, confidence):
+            changed_to.append(debouncer.gesture)
+        stable.append(debouncer.gesture)
+
+    raw_changes = count_changes([gesture for gesture, _ in frames])
+    print(f"📊 {len(moves)} 局 {len(frames)} 帧: 原始结果变化 {raw_changes} 次, 稳定手势发出 {len(changed_to)} 次")
+    assert changed_to == moves
+    assert raw_changes > 5 * len(moves)
+
+    # 犹豫阶段不会进入任何手势；手收回后稳定手势释放
+    assert stable[6 + 10 - 1] is None
+    assert stable[-1] is None
+
+    # 至少要连续 min_dwell 帧领先才能进入
+    debouncer = GestureDebouncer(window=4, enter_confidence=0.5, min_dwell=3)
+    assert [debouncer.update("布", 0.9) for _ in range(4)] == [False, False, True, False]
+
+    print("✅ 手势去抖测试通过")
+
+
+def test_sessions():
+    """测试会话隔离、超时清理和数量上限"""
+    print("\n🧪 测试手势会话")
+    print("=" * 50)
+
+    sessions = HandSessions(timeout=5.0, max_sessions=3)
+    for _ in range(8):
+        a = sessions.update("a", "剪刀", 0.95, now=1.0)
+        b = sessions.update("b", "石头", 0.9, now=1.0)
+    assert a['stable_gesture'] == "剪刀" and b['stable_gesture'] == "石头"
+
+    # 超时后会话从头开始
+    assert sessions.update("a", "剪刀", 0.95, now=10.0)['stable_gesture'] == NO_GESTURE
+    # 新建会话时清理超时的会话
+    sessions.update("c", "布", 0.9, now=10.0)
+    assert sessions.to_dict()['sessions'] == 2
+    sessions.update("d", "布", 0.9, now=10.0)
+    sessions.update("e", "布", 0.9, now=10.0)
+    stats = sessions.to_dict()
+    print(f"📊 {stats}")
+    assert stats['sessions'] == 3 and stats['evicted'] == 2
+
+    print("✅ 手势会话测试通过")
+
+
+def test_session_endpoints():
+    """测试 /analyze_hand 的会话ID和UDP按客户端去抖"""
+    print("\n⚡ 测试带会话的识别接口")
+    print("=" * 50)
+
+    client = app.test_client()
+    frames = synthetic_frames(90)
+    results = [client.post('/analyze_hand', json=hand, headers={SESSION_HEADER: "phone-1"}).get_json()
+               for hand in frames]
+    changes = [result['stable_gesture'] for result in results if result['gesture_changed']]
+    print(f"🔁 原始结果变化 {count_changes([result['gesture'] for result in results])} 次, 稳定手势变化 {changes}")
+    assert changes == ["石头", "剪刀", "布", "石头"]
+
+    # 查询参数也可以指定会话；不带会话ID时响应不变
+    result = client.post('/analyze_hand?session=phone-2', json=frames[0]).get_json()
+    assert result['session'] == "phone-2" and result['stable_gesture'] == NO_GESTURE
+    assert 'stable_gesture' not in client.post('/analyze_hand', json=frames[0]).get_json()
+    assert client.get('/status').get_json()['sessions']['sessions'] >= 2
+
+    # UDP按客户端ID平滑和去抖，与直接使用 HandSessions 的结果相同
+    receiver = LandmarkReceiver(analyze_dense_hand, sessions=HandSessions())
+    encoder = FrameEncoder(client_id=42)
+    replies = [receiver.handle(encoder.encode(hand), now=i / 30) for i, hand in enumerate(frames)]
+    sessions = HandSessions()
+    expected = []
+    for i, hand in enumerate(dequantized(frames)):
+        gesture, confidence = analyze_hand_pose(hand, smooth=functools.partial(sessions.smooth, "udp:42", now=i / 30))
+        expected.append((gesture, sessions.update("udp:42", gesture, confidence, now=i / 30)['stable_gesture']))
+    assert [(reply['gesture'], reply['stable_gesture']) for reply in replies] == expected
+
+    print("✅ 带会话的识别接口测试通过")
+
+
+def test_counter_actuation(gateway_controller):
+    """测试闭环对战：稳定手势出现的那一帧直接让机械手出克制它的手势"""
+    print("\n🎮 测试闭环对战")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = ArduinoController(port=simulator.port)
+        assert controller.connect(), "连接模拟器失败"
+        gateway_controller(controller)
+        try:
+            client = app.test_client()
+            rounds = []
+            for hand in synthetic_frames(90):
+                result = client.post('/analyze_hand?counter=1&wait=5', json=hand,
+                                     headers={SESSION_HEADER: "game"}).get_json()
+                if result['actuation'] is not None:
+                    actuation = result['actuation']
+                    print(f"🤖 人出 {result['stable_gesture']} -> 机械手出 {actuation['gesture']} "
+                          f"({actuation['arduino_command']}, {actuation['command_status']})")
+                    rounds.append((result['stable_gesture'], actuation))
+
+            assert [(human, actuation['gesture']) for human, actuation in rounds] == [
+                ("石头", "布"), ("剪刀", "石头"), ("布", "剪刀"), ("石头", "布")
+            ]
+            assert all(actuation['success'] for _, actuation in rounds)
+            # 上电姿态就是布，第一局不需要动作
+            assert [actuation['command_status'] for _, actuation in rounds] == [
+                'skipped', 'completed', 'completed', 'completed'
+            ]
+            assert list(controller.hand_state.current) == simulator.current_angle
+            assert rounds[-1][1]['arduino_command'] == GESTURE_MAPPING["布"]
+
+            # 没有会话ID时无法去抖，不动作
+            result = client.post('/analyze_hand?counter=1', json=synthetic_frames(1)[0]).get_json()
+            assert result['success'] and result['actuation']['success'] is False
+        finally:
+            controller.disconnect()
+
+    print("✅ 闭环对战测试通过")
+
+
+if __name__ == "__main__":
+    # test_counter_actuation 需要 conftest.py 中的夹具，通过pytest运行
+    sys.exit(pytest.main([__file__, "-s"]))
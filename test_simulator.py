@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+使用模拟Arduino测试网关
+不需要真实硬件，验证串口协议、舵机状态镜像以及网关吞吐量
+"""
+
+import sys
+import time
+
+import pytest
+
+from arduino_simulator import SimulatedArduino
+from gateway_server import app
+from hand_serial import ArduinoController, probe_port, COMMAND_POSES
+
+
+def connect_controller(simulator, **options):
+    """把ArduinoController连接到模拟器的虚拟串口"""
+    controller = ArduinoController(port=simulator.port, **options)
+    assert controller.connect(), "连接模拟器失败"
+    return controller
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.005)
+
+
+def test_simulated_commands():
+    """测试命令执行结果和舵机状态镜像"""
+    print("🤖 测试模拟器命令执行")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = connect_controller(simulator)
+        try:
+            for command in ["ROCK", "SCISSORS", "7", "SERVO:5:45", "PAPER"]:
+                ticket = controller.send_command(command)
+                assert ticket.wait(5), f"命令超时: {command}"
+                print(f"📤 {command:12s} -> {ticket.status}")
+                assert ticket.status == 'completed'
+                assert list(controller.hand_state.current) == simulator.current_angle
+
+            ticket = controller.send_command("PAPER")
+            print(f"📤 {'PAPER':12s} -> {ticket.status} (重复命令)")
+            assert ticket.status == 'skipped'
+
+            ticket = controller.send_command("HELLO")
+            ticket.wait(5)
+            print(f"📤 {'HELLO':12s} -> {ticket.status}")
+            assert ticket.status == 'failed'
+        finally:
+            controller.disconnect()
+
+    print("✅ 模拟器命令测试通过")
+
+
+def test_skip_only_when_idle():
+    """测试还有命令没执行完时不跳过与当前姿态相同的命令，安全命令从不跳过"""
+    print("\n⏭️ 测试跳过重复命令")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=5) as simulator:
+        controller = connect_controller(simulator)
+        try:
+            # ROCK在执行，SERVO和PAPER在排队；RESET的姿态等于上电姿态，也等于排队命令的最终目标
+            rock = controller.send_command("ROCK")
+            wait_until(lambda: rock.status == 'sent')
+            servo = controller.send_command("SERVO:1:30")
+            paper = controller.send_command("PAPER")
+            reset = controller.send_command("RESET")
+            print(f"📤 RESET -> {reset.status}, 插队清掉 {reset.preempted}")
+            assert reset.status != 'skipped'
+            assert reset.preempted == [servo.ticket_id, paper.ticket_id]
+            assert reset.wait(5) and reset.status == 'completed'
+            assert [servo.status, paper.status] == ['preempted', 'preempted']
+            assert simulator.current_angle == list(COMMAND_POSES['RESET'])
+            assert list(controller.hand_state.current) == simulator.current_angle
+
+            # 空闲时相同姿态的命令才跳过，RESET照样发送
+            assert controller.send_command("PAPER").status == 'skipped'
+            reset = controller.send_command("RESET")
+            assert reset.wait(5) and reset.status == 'completed'
+
+            # 排队中的PAPER让目标姿态回到当前姿态，同样姿态的"5"不能跳过（它会替换掉PAPER）
+            rock = controller.send_command("ROCK")
+            wait_until(lambda: rock.status == 'sent')
+            paper = controller.send_command("PAPER")
+            five = controller.send_command("5")
+            print(f"📤 5 -> {five.status}, 合并 {five.coalesced}")
+            assert five.status != 'skipped' and five.coalesced == [paper.ticket_id]
+            assert five.wait(5) and five.status == 'completed'
+            assert list(controller.hand_state.current) == simulator.current_angle == list(COMMAND_POSES['5'])
+        finally:
+            controller.disconnect()
+
+    print("✅ 跳过重复命令测试通过")
+
+
+def test_emergency_and_stop(gateway_controller):
+    """测试安全命令插队、/openmax 和 /stop 取消排队命令"""
+    print("\n⛔ 测试插队和停止")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=5) as simulator:
+        controller = gateway_controller(connect_controller(simulator))
+        try:
+            client = app.test_client()
+
+            # CLOSEMAX插队，清掉排队中的SERVO和SCISSORS
+            rock = controller.send_command("ROCK")
+            wait_until(lambda: rock.status == 'sent')
+            servo = controller.send_command("SERVO:0:30")
+            scissors = controller.send_command("SCISSORS")
+            close = controller.send_command("CLOSEMAX")
+            print(f"📤 CLOSEMAX -> 插队清掉 {close.preempted}")
+            assert close.preempted == [servo.ticket_id, scissors.ticket_id]
+            assert [servo.status, scissors.status] == ['preempted', 'preempted']
+            assert servo.superseded_by == scissors.superseded_by == close.ticket_id
+            assert close.wait(5) and close.status == 'completed'
+            assert simulator.current_angle == list(COMMAND_POSES['CLOSEMAX'])
+            assert list(controller.hand_state.current) == simulator.current_angle
+
+            # /openmax 同样插队
+            rock = controller.send_command("1")
+            wait_until(lambda: rock.status == 'sent')
+            paper = controller.send_command("PAPER")
+            result = client.post('/openmax', json={"wait": 5}).get_json()
+            print(f"📤 /openmax -> {result['command_status']}, 插队清掉 {result['preempted']}")
+            assert result['success'] and result['command_status'] == 'completed'
+            assert result['preempted'] == [paper.ticket_id] and paper.status == 'preempted'
+            assert simulator.current_angle == list(COMMAND_POSES['OPENMAX'])
+            assert list(controller.hand_state.current) == simulator.current_angle
+
+            # /stop 取消排队命令，目标姿态回到正在执行的动作
+            rock = controller.send_command("ROCK")
+            wait_until(lambda: rock.status == 'sent')
+            servo = controller.send_command("SERVO:1:30")
+            scissors = controller.send_command("SCISSORS")
+            assert controller.hand_state.target != COMMAND_POSES['ROCK']
+            result = client.post('/stop').get_json()
+            print(f"📤 /stop -> 取消 {result['cancelled']}")
+            assert result['success'] and result['cancelled'] == [servo.ticket_id, scissors.ticket_id]
+            assert [servo.status, scissors.status] == ['cancelled', 'cancelled']
+            assert controller.hand_state.target == COMMAND_POSES['ROCK']
+            assert rock.wait(5) and rock.status == 'completed'
+            assert controller.hand_state.current == controller.hand_state.target
+            assert list(controller.hand_state.current) == simulator.current_angle == list(COMMAND_POSES['ROCK'])
+
+            # 没有排队命令时 /stop 什么也不取消
+            assert client.post('/stop').get_json()['cancelled'] == []
+            assert controller.hand_state.target == COMMAND_POSES['ROCK']
+        finally:
+            controller.disconnect()
+
+    print("✅ 插队和停止测试通过")
+
+
+def test_mirror_confirmed_only():
+    """测试只有固件确认执行完成的命令才更新舵机状态镜像"""
+    print("\n🪞 测试舵机状态镜像")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = connect_controller(simulator, completion_timeout=0.5)
+        try:
+            ticket = controller.send_command("ROCK")
+            assert ticket.wait(5) and ticket.status == 'completed'
+
+            # 固件没有回显：命令很可能没有执行，目标姿态回退，再发同样的命令不会被跳过
+            simulator.unresponsive = True
+            ticket = controller.send_command("SCISSORS")
+            assert ticket.wait(5)
+            print(f"📤 SCISSORS -> {ticket.status} ({ticket.error})")
+            assert ticket.status == 'sent' and not ticket.acknowledged
+            assert controller.hand_state.current == controller.hand_state.target == COMMAND_POSES['ROCK']
+            simulator.unresponsive = False
+            ticket = controller.send_command("SCISSORS")
+            assert ticket.wait(5) and ticket.status == 'completed'
+            assert list(controller.hand_state.current) == simulator.current_angle
+
+            # 收到回显但等完成提示超时：舵机停在哪里未知，同样的命令也不会被跳过
+            simulator.time_warp = 1
+            ticket = controller.send_command("PAPER")
+            assert ticket.wait(5)
+            print(f"📤 PAPER -> {ticket.status}, 镜像: {controller.hand_state.to_dict()['current_angles']}")
+            assert ticket.status == 'sent' and ticket.acknowledged
+            assert controller.hand_state.current is None
+            time.sleep(1.5)
+            simulator.time_warp = 20
+            ticket = controller.send_command("PAPER")
+            assert ticket.status != 'skipped'
+            assert ticket.wait(5) and ticket.status == 'completed'
+            assert list(controller.hand_state.current) == simulator.current_angle
+        finally:
+            controller.disconnect()
+
+    print("✅ 舵机状态镜像测试通过")
+
+
+def test_circuit_breaker():
+    """测试串口熔断器：连续没有回显后熔断，熔断期间拒绝命令，半开状态试探恢复"""
+    print("\n⛔ 测试串口熔断")
+    print("=" * 50)
+
+    reset_timeout = 1.0
+    with SimulatedArduino(time_warp=20) as simulator:
+        controller = connect_controller(simulator, completion_timeout=0.3, failure_threshold=3,
+                                        breaker_reset_timeout=reset_timeout)
+        breaker = controller.circuit_breaker
+        try:
+            ticket = controller.send_command("ROCK")
+            assert ticket.wait(5) and ticket.status == 'completed'
+
+            # 固件卡死：连续3条命令没有回显后熔断
+            simulator.unresponsive = True
+            for command in ["SCISSORS", "PAPER", "5"]:
+                ticket = controller.send_command(command)
+                assert ticket.wait(5) and ticket.status == 'sent' and not ticket.acknowledged
+            print(f"🔌 熔断器: {breaker.to_dict()}")
+            assert breaker.state == breaker.OPEN and breaker.trip_count == 1
+
+            # 熔断期间命令直接被拒绝，并给出重试等待时间
+            ticket = controller.send_command("1")
+            print(f"📤 1 -> {ticket.status} ({ticket.error})")
+            assert ticket.status == 'rejected' and 0 < ticket.retry_after <= reset_timeout
+            assert ticket.to_dict()['retry_after'] == ticket.retry_after
+
+            # 半开状态只放行一条试探命令，试探失败重新熔断
+            time.sleep(reset_timeout)
+            trial = controller.send_command("SCISSORS")
+            assert trial.status != 'rejected'
+            assert breaker.state == breaker.HALF_OPEN
+            ticket = controller.send_command("PAPER")
+            assert ticket.status == 'rejected' and ticket.retry_after > 0
+            assert trial.wait(5) and not trial.acknowledged
+            assert breaker.state == breaker.OPEN and breaker.trip_count == 2
+
+            # 固件恢复后试探命令成功，熔断器关闭
+            simulator.unresponsive = False
+            time.sleep(breaker.retry_after())
+            trial = controller.send_command("SCISSORS")
+            assert trial.wait(5) and trial.status == 'completed'
+            assert breaker.state == breaker.CLOSED and breaker.consecutive_failures == 0
+            ticket = controller.send_command("PAPER")
+            assert ticket.wait(5) and ticket.status == 'completed'
+            assert list(controller.hand_state.current) == simulator.current_angle
+        finally:
+            controller.disconnect()
+
+    print("✅ 串口熔断测试通过")
+
+
+def test_legacy_firmware():
+    """
+    测试第一版固件（没有完成提示）：收到回显就结束命令，不会每条都等到超时；
+    文字命令的 toInt() 为0，被当成数字手势而不执行，网关也只能看到回显
+    """
+    print("\n🔙 测试第一版固件")
+    print("=" * 50)
+
+    commands = ["0", "5", "2", "ROCK", "1"]
+    gestures = [command for command in commands if command.isdigit()]
+    with SimulatedArduino(time_warp=20, firmware='v1') as simulator:
+        controller = connect_controller(simulator)
+        try:
+            assert not controller.reports_completion
+            start = time.time()
+            for command in commands:
+                ticket = controller.send_command(command)
+                assert ticket.wait(5), f"命令超时: {command}"
+                assert ticket.status == 'sent' and ticket.acknowledged, f"{command} -> {ticket.status}"
+            elapsed = time.time() - start
+            wait_until(lambda: simulator.moves_executed == len(gestures))
+            print(f"📊 {len(commands)} 条命令耗时 {elapsed:.3f}s (完成超时 {controller.completion_timeout}s)")
+            assert elapsed < controller.completion_timeout
+            # ROCK 没有动作，机械手停在最后一个数字手势
+            assert simulator.moves_executed == len(gestures)
+            assert simulator.current_angle == list(COMMAND_POSES[gestures[-1]])
+        finally:
+            controller.disconnect()
+
+    print("✅ 第一版固件测试通过")
+
+
+def test_gateway_throughput(gateway_controller):
+    """测试HTTP接口的入队吞吐量和手势合并"""
+    print("\n⚡ 测试网关吞吐量")
+    print("=" * 50)
+
+    with SimulatedArduino(time_warp=5) as simulator:
+        controller = gateway_controller(connect_controller(simulator))
+        try:
+            client = app.test_client()
+            gestures = ["ROCK", "PAPER", "SCISSORS"]
+            count = 300
+            start = time.time()
+            results = [
+                client.post('/rps', json={"gesture": gestures[i % 3]}).get_json()
+                for i in range(count)
+            ]
+            elapsed = time.time() - start
+
+            coalesced = sum(len(result["coalesced"]) for result in results)
+            print(f"📊 {count} 个请求耗时 {elapsed:.3f}s ({count / elapsed:.0f} 请求/秒)")
+            print(f"🔀 合并的手势: {coalesced}")
+            assert all(result["success"] for result in results)
+
+            last = controller.get_ticket(results[-1]["ticket_id"])
+            assert last.wait(10)
+            print(f"🤖 固件实际执行动作数: {simulator.moves_executed}")
+            print(f"📉 接收缓冲区溢出字节: {simulator.rx_overflow_bytes}")
+            assert simulator.rx_overflow_bytes == 0
+        finally:
+            controller.disconnect()
+
+    print("✅ 吞吐量测试完成")
+
+
+def test_pipelined_commands():
+    """测试带序号的流水线发送：多条命令同时在途，结果按序号对应"""
+    print("\n🚄 测试命令流水线")
+    print("=" * 50)
+
+    # 单舵机命令不参与手势合并，每条都会发送
+    commands = ["SERVO:0:90", "SERVO:1:90", "SERVO:2:90", "SERVO:3:90",
+                "SERVO:4:90", "SERVO:5:0", "SERVO:0:0", "SERVO:5:90"]
+    elapsed = {}
+    for binary in (False, True):
+        for depth in (1, 4):
+            # USB转串口芯片通常有几毫秒到16毫秒的延迟，流水线可以把它隐藏掉
+            with SimulatedArduino(time_warp=10, link_latency=0.1) as simulator:
+                controller = ArduinoController(port=simulator.port, binary_protocol=binary,
+                                               pipeline_depth=depth)
+                assert controller.connect(), "连接模拟器失败"
+                try:
+                    assert controller.uses_sequence_ids
+                    start = time.time()
+                    futures = [controller.submit(command) for command in commands]
+                    tickets = [future.result(timeout=10) for future in futures]
+                    label = f"{controller.protocol}/depth={depth}"
+                    elapsed[label] = time.time() - start
+
+                    assert [ticket.status for ticket in tickets] == ['completed'] * len(commands)
+                    assert [ticket.command for ticket in tickets] == commands
+                    assert all(ticket.seq is not None for ticket in tickets)
+                    assert list(controller.hand_state.current) == simulator.current_angle
+                    assert simulator.rx_overflow_bytes == 0
+                    service = sum(ticket.service_time for ticket in tickets) / len(tickets)
+                    print(f"📊 {label:16s} 总耗时 {elapsed[label]:.3f}s, "
+                          f"平均固件执行时间 {service * 1000:.1f}ms")
+                finally:
+                    controller.disconnect()
+
+    assert elapsed["text/depth=4"] < elapsed["text/depth=1"]
+    assert elapsed["binary/depth=4"] < elapsed["binary/depth=1"]
+    print("✅ 命令流水线测试通过")
+
+
+def test_handshake_without_reset():
+    """测试板子没有复位（看不到启动标志）时，各版本固件都能靠 PING 的回显识别"""
+    print("\n🤝 测试免复位握手")
+    print("=" * 50)
+
+    for firmware in ('v1', 'v2', 'v3'):
+        with SimulatedArduino(time_warp=10, boot=False, firmware=firmware) as simulator:
+            probe = probe_port(simulator.port, reset=False)
+            try:
+                print(f"🔍 {firmware}: {probe and probe.identified_by} {probe and probe.lines}")
+                assert probe is not None and probe.identified_by == 'handshake'
+            finally:
+                if probe is not None:
+                    probe.close()
+
+    print("✅ 免复位握手测试通过")
+
+
+def test_auto_reconnect():
+    """测试串口断开后自动重连并恢复姿态"""
+    print("\n🔌 测试自动重连")
+    print("=" * 50)
+
+    first = SimulatedArduino(time_warp=10)
+    first.start()
+    controller = connect_controller(first)
+    second = SimulatedArduino(time_warp=10, boot=False)
+    second.start()
+    try:
+        ticket = controller.send_command("SCISSORS")
+        assert ticket.wait(5) and ticket.status == 'completed'
+
+        # 模拟USB断开，新设备出现在另一个端口上
+        controller.candidate_ports = [second.port]
+        start = time.time()
+        first.stop()
+        while controller.reconnect_count == 0 and time.time() - start < 10:
+            time.sleep(0.05)
+        print(f"⏱️ 重连耗时: {time.time() - start:.2f}s")
+        assert controller.reconnect_count == 1
+        assert controller.port == second.port
+
+        # 断线前的姿态会被重新发送
+        deadline = time.time() + 5
+        while controller.move_in_flight or controller.command_queue.qsize():
+            assert time.time() < deadline
+            time.sleep(0.05)
+        print(f"🤖 恢复后的舵机角度: {second.current_angle}")
+        assert second.current_angle == [180, 180, 0, 0, 180, 90]
+    finally:
+        controller.disconnect()
+        second.stop()
+
+    print("✅ 自动重连测试通过")
+
+
+if __name__ == "__main__":
+    # 部分测试需要 conftest.py 中的夹具，通过pytest运行
+    sys.exit(pytest.main([__file__, "-s"]))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试UDP关键点数据报
+量化编解码、差分帧、乱序/旧帧丢弃，以及用回放工具测试网关的UDP监听
+"""
+
+from hand_recognition import analyze_hand_pose, analyze_dense_hand
+from hand_udp import (
+    FrameEncoder, LandmarkReceiver, UdpLandmarkListener, decode_datagram, quantize_hand, dequantize_hand,
+    dequantize_dense, encode_keyframe, QUANT_SCALE, KEYFRAME_SIZE, DELTA_FRAME_SIZE
+)
+from udp_replay import replay
+from synthetic_hands import synthetic_frames, synthetic_hand, SYNTHETIC_POSES
+
+
+def test_quantization():
+    """测试量化误差和识别结果不受量化影响"""
+    print("🧪 测试关键点量化")
+    print("=" * 50)
+
+    for pose in SYNTHETIC_POSES:
+        hand = synthetic_hand(pose)
+        restored = dequantize_hand(quantize_hand(hand))
+        assert restored.keys() == hand.keys()
+        for key, point in hand.items():
+            assert abs(restored[key]['x'] - point['x']) <= 0.5 / QUANT_SCALE
+            assert abs(restored[key]['y'] - point['y']) <= 0.5 / QUANT_SCALE
+            assert abs(restored[key]['confidence'] - point['confidence']) <= 0.5 / 255
+        assert analyze_hand_pose(restored) == analyze_hand_pose(hand)
+        # 接收端不经过关节名，直接还原为 DenseHand
+        assert analyze_dense_hand(dequantize_dense(quantize_hand(hand))) == analyze_hand_pose(hand)
+
+    # 缺失的关节不出现在还原后的字典中
+    hand = synthetic_hand(SYNTHETIC_POSES[0])
+    missing = next(iter(hand))
+    del hand[missing]
+    assert missing not in dequantize_hand(quantize_hand(hand))
+    assert dequantize_dense(quantize_hand(hand)).present.count(False) == 1
+
+    print(f"📦 关键帧 {KEYFRAME_SIZE} 字节, 差分帧 {DELTA_FRAME_SIZE} 字节")
+    print("✅ 关键点量化测试通过")
+
+
+def test_stale_and_delta_frames():
+    """测试差分帧解码，以及旧帧、缺少关键帧的差分帧和错误数据报被丢弃"""
+    print("\n🧪 测试差分帧和旧帧丢弃")
+    print("=" * 50)
+
+    frames = synthetic_frames(40)
+    encoder = FrameEncoder(client_id=7)
+    datagrams = [encoder.encode(hand) for hand in frames]
+    assert decode_datagram(datagrams[1]).is_delta
+
+    receiver = LandmarkReceiver(analyze_dense_hand)
+    results = [receiver.handle(data, now=1.0) for data in datagrams]
+    assert all(results)
+    assert [result['gesture'] for result in results] == [analyze_hand_pose(hand)[0] for hand in frames]
+
+    assert receiver.handle(datagrams[10], now=1.0) is None            # 迟到的旧帧
+    assert receiver.handle(b"garbage", now=1.0) is None               # 格式错误
+
+    # 没收到关键帧的客户端无法解码差分帧
+    other = FrameEncoder(client_id=8)
+    other.encode(frames[0])
+    assert receiver.handle(other.encode(frames[1]), now=1.0) is None
+
+    # 发送端重启后帧序号从头开始，超时后重新接受
+    restarted = encode_keyframe(7, 1, quantize_hand(frames[0]))
+    assert receiver.handle(restarted, now=1.0) is None
+    assert receiver.handle(restarted, now=10.0) is not None
+
+    print(f"📊 {receiver.to_dict()}")
+    assert receiver.stats['stale'] == 2
+    assert receiver.stats['malformed'] == 1
+    assert receiver.stats['missing_base'] == 1
+    print("✅ 差分帧和旧帧丢弃测试通过")
+
+
+def test_udp_listener():
+    """测试UDP监听：用回放工具发送合成手势，比较关键帧和差分帧"""
+    print("\n📡 测试UDP监听")
+    print("=" * 50)
+
+    listener = UdpLandmarkListener(analyze_dense_hand, '127.0.0.1', 0).start()
+    try:
+        frames = synthetic_frames(90)
+        results = {}
+        for delta in (False, True):
+            stats = replay(frames, port=listener.port, fps=0, delta=delta)
+            results[delta] = stats
+            print(f"📊 {'差分' if delta else '关键帧'}: 发送 {stats['sent']} 帧, 回复 {stats['replies']}, "
+                  f"{stats['bytes_per_frame']:.1f} 字节/帧, p50 {stats['rtt_p50_ms']:.2f}ms")
+            assert stats['replies'] == stats['sent'] == len(frames)
+            assert stats['gestures'] == [analyze_hand_pose(hand)[0] for hand in frames]
+        assert results[True]['bytes_per_frame'] < results[False]['bytes_per_frame']
+
+        # 丢包时仍然能解码大部分帧
+        stats = replay(frames, port=listener.port, fps=0, loss=0.2)
+        print(f"📊 20%丢包: 发送 {stats['sent']} 帧, 回复 {stats['replies']}")
+        assert stats['replies'] > 0
+        print(f"📊 监听统计: {listener.receiver.to_dict()}")
+    finally:
+        listener.stop()
+
+    print("✅ UDP监听测试通过")
+
+
+if __name__ == "__main__":
+    test_quantization()
+    test_stale_and_delta_frames()
+    test_udp_listener()
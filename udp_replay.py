@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UDP关键点回放工具
+把录制的手部关键点帧按固定帧率发给网关的UDP监听端口，统计回复数量和往返时间，
+不需要手机就可以测试UDP链路
+
+录制文件每行一个 /analyze_hand 的请求体（JSON），或 {"hand": 请求体}
+没有录制文件时用 --synthetic 生成石头/剪刀/布之间来回变化的合成手势，--jitter 给关键点加上噪声
+
+用法:
+    python3 gateway_server.py --production --udp-port 8082
+    python3 udp_replay.py frames.jsonl --port 8082 --fps 60
+    python3 udp_replay.py --synthetic 600 --loss 0.1
+    python3 udp_replay.py --synthetic 600 --jitter 0.01
+"""
+
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+
+from hand_udp import FrameEncoder, KEYFRAME_SIZE, DELTA_FRAME_SIZE
+from synthetic_hands import jitter_frames, synthetic_frames
+
+
+def load_frames(path):
+    frames = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                frame = json.loads(line)
+                frames.append(frame.get('hand', frame))
+    return frames
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def replay(frames, host='127.0.0.1', port=8082, fps=60, client_id=None, delta=True, loss=0.0,
+           reply_timeout=0.5):
+    """
+    按帧率发送帧序列并收集回复
+    loss 为模拟丢包率（跳过发送）；返回统计字典
+    """
+    client_id = random.getrandbits(32) if client_id is None else client_id
+    encoder = FrameEncoder(client_id, delta=delta)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(0.1)
+    sent_at = {}
+    round_trips = []
+    replies = []
+    stats = {"sent": 0, "skipped": 0, "bytes": 0, "keyframes": 0}
+    done = threading.Event()
+
+    def receive():
+        while not done.is_set():
+            try:
+                data, _ = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            reply = json.loads(data)
+            if reply.get('client') != client_id:
+                continue
+            started = sent_at.get(reply['frame'])
+            if started is not None:
+                round_trips.append(time.perf_counter() - started)
+            replies.append(reply)
+
+    receiver = threading.Thread(target=receive, daemon=True)
+    receiver.start()
+    interval = 1.0 / fps if fps else 0
+    next_send = time.perf_counter()
+    try:
+        for hand in frames:
+            data = encoder.encode(hand)
+            if loss and random.random() < loss:
+                stats["skipped"] += 1
+            else:
+                sent_at[encoder.seq] = time.perf_counter()
+                sock.sendto(data, (host, port))
+                stats["sent"] += 1
+                stats["bytes"] += len(data)
+                stats["keyframes"] += len(data) == KEYFRAME_SIZE
+            if interval:
+                next_send += interval
+                time.sleep(max(next_send - time.perf_counter(), 0))
+        deadline = time.time() + reply_timeout
+        while len(replies) < stats["sent"] and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        done.set()
+        receiver.join(timeout=1)
+        sock.close()
+
+    stats.update({
+        "client": client_id,
+        "replies": len(replies),
+        "bytes_per_frame": stats["bytes"] / max(stats["sent"], 1),
+        "rtt_p50_ms": percentile(round_trips, 0.5) * 1000,
+        "rtt_p95_ms": percentile(round_trips, 0.95) * 1000,
+        "gestures": [reply['gesture'] for reply in replies]
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UDP关键点回放工具")
+    parser.add_argument('recording', nargs='?', help="录制文件（每行一个关键点JSON）")
+    parser.add_argument('--synthetic', type=int, default=0, help="生成N帧合成手势代替录制文件")
+    parser.add_argument('--jitter', type=float, default=0.0, help="给合成手势加上的关键点噪声")
+    parser.add_argument('--host', default='127.0.0.1', help="网关地址")
+    parser.add_argument('--port', type=int, default=8082, help="网关UDP端口")
+    parser.add_argument('--fps', type=float, default=60, help="发送帧率，0表示尽快发送")
+    parser.add_argument('--no-delta', dest='delta', action='store_false', help="只发送关键帧")
+    parser.add_argument('--loss', type=float, default=0.0, help="模拟丢包率 (0-1)")
+    parser.add_argument('--client-id', type=int, help="客户端ID，默认随机")
+    args = parser.parse_args(argv)
+
+    if args.recording:
+        frames = load_frames(args.recording)
+    elif args.synthetic:
+        frames = jitter_frames(synthetic_frames(args.synthetic), args.jitter)
+    else:
+        parser.error("需要录制文件或 --synthetic")
+
+    print(f"📤 回放 {len(frames)} 帧到 {args.host}:{args.port} ({args.fps:g} fps, "
+          f"{'差分' if args.delta else '仅关键帧'}, 关键帧 {KEYFRAME_SIZE} 字节 / 差分帧 {DELTA_FRAME_SIZE} 字节)")
+    stats = replay(frames, args.host, args.port, args.fps, args.client_id, args.delta, args.loss)
+    print(f"📊 发送 {stats['sent']} 帧（模拟丢弃 {stats['skipped']}，关键帧 {stats['keyframes']}），"
+          f"平均 {stats['bytes_per_frame']:.1f} 字节/帧")
+    print(f"📥 收到 {stats['replies']} 个回复，往返时间 p50 {stats['rtt_p50_ms']:.2f}ms / "
+          f"p95 {stats['rtt_p95_ms']:.2f}ms")
+    return 0 if stats['replies'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())